@@ -1,15 +1,32 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory, session, flash, Response, stream_with_context, g
 from flask_caching import Cache
 from main import Catalogo, Produto, Pedido, Usuario
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 import logging
 import traceback
 import base64
+import uuid
+import hashlib
+from werkzeug.http import is_resource_modified
 from dotenv import load_dotenv
-from utils import setup_logger, carregar_json_com_cache, salvar_json_com_cache, limpar_cache, hash_password, verify_password
+from utils import setup_logger, hash_password, verify_password, assinatura_arquivo, anexar_jsonl, ler_jsonl, truncar_arquivo, parse_data_br
+from utils import LimitadorTaxa, FilaSenhasCheia
+from armazenamento import criar_armazenamento, GravadorAgrupado
+from sessoes import criar_armazem_sessoes, InterfaceSessaoServidor
 import re
+import atexit
+import gzip
+import threading
+import csv
+import io
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele as respostas são comprimidas só com gzip
+    brotli = None
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -22,14 +39,79 @@ app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'vortex-catalogo-segredo-2025')
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=int(os.getenv('SESSION_LIFETIME', '8')))
+# Validade no navegador dos arquivos estáticos e imagens (em segundos)
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = int(os.getenv('STATIC_MAX_AGE', '86400'))
+
+# Sessões: 'cookie' (padrão do Flask, assinadas no navegador), 'memoria' (no servidor, um processo)
+# ou 'sqlite' (no servidor, compartilhadas entre workers). Sessões no servidor podem ser revogadas.
+SESSOES = os.getenv('SESSOES', 'cookie')
+armazem_sessoes = criar_armazem_sessoes(
+    SESSOES,
+    os.getenv('SESSOES_SQLITE_FILE', 'sessoes.db'),
+    int(os.getenv('SESSOES_MAX_ITENS', '10000'))
+)
+if armazem_sessoes is not None:
+    app.session_interface = InterfaceSessaoServidor(armazem_sessoes)
 
 # Configuração de cache
-cache = Cache(config={
+config_cache = {
     'CACHE_TYPE': os.getenv('CACHE_TYPE', 'SimpleCache'),
     'CACHE_DEFAULT_TIMEOUT': int(os.getenv('CACHE_DEFAULT_TIMEOUT', '300'))
-})
+}
+# Opções dos backends FileSystemCache e RedisCache
+if os.getenv('CACHE_DIR'):
+    config_cache['CACHE_DIR'] = os.getenv('CACHE_DIR')
+if os.getenv('CACHE_REDIS_URL'):
+    config_cache['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL')
+cache = Cache(config=config_cache)
 cache.init_app(app)
 
+# Invalidação por tags sobre o Flask-Caching. Cada tag tem uma versão guardada no próprio
+# cache e as chaves das entradas incluem a versão das suas tags. Invalidar uma tag é trocar
+# a versão, o que funciona em qualquer backend (não depende de apagar chaves por padrão).
+# Se a versão de uma tag for descartada pelo backend, uma nova é gerada e as entradas
+# antigas apenas deixam de ser encontradas.
+def _versoes_tags(tags):
+    """Versões atuais das tags, criando as que ainda não existem"""
+    chaves = [f'tag:{tag}' for tag in tags]
+    versoes = cache.get_many(*chaves)
+    for i, versao in enumerate(versoes):
+        if versao is None:
+            cache.add(chaves[i], uuid.uuid4().hex, timeout=0)
+            versoes[i] = cache.get(chaves[i])
+    return versoes
+
+def invalidar_tags(*tags):
+    """Invalida todas as entradas de cache marcadas com qualquer uma das tags"""
+    for tag in tags:
+        cache.set(f'tag:{tag}', uuid.uuid4().hex, timeout=0)
+
+def em_cache(chave, tags, timeout=None):
+    """
+    Decorador que guarda a resposta (apenas 200) de uma rota de leitura no cache com tags.
+    
+    Args:
+        chave (callable): Recebe os argumentos da rota e retorna a chave base da entrada
+        tags (callable): Recebe os argumentos da rota e retorna as tags da entrada
+        timeout (int, optional): Validade da entrada em segundos
+    """
+    def decorador(f):
+        def decorated_function(*args, **kwargs):
+            versoes = _versoes_tags(tags(**kwargs))
+            chave_entrada = f"{chave(**kwargs)}@{'.'.join(str(v) for v in versoes)}"
+            entrada = cache.get(chave_entrada)
+            if entrada is not None:
+                corpo, status, cabecalhos = entrada
+                return app.response_class(corpo, status=status, headers=cabecalhos)
+            resposta = app.make_response(f(*args, **kwargs))
+            if resposta.status_code == 200:
+                cache.set(chave_entrada, (resposta.get_data(), resposta.status_code, list(resposta.headers.items())),
+                          timeout=timeout)
+            return resposta
+        decorated_function.__name__ = f.__name__
+        return decorated_function
+    return decorador
+
 catalogo = Catalogo()
 
 # Arquivos para armazenamento
@@ -37,42 +119,479 @@ PRODUTOS_FILE = 'produtos.json'
 PEDIDOS_FILE = 'pedidos.json'
 USUARIOS_FILE = 'usuarios.json'
 
-def salvar_produtos():
-    """Salva produtos em arquivo JSON com cache"""
+# Backend de armazenamento: 'json' (um arquivo por coleção) ou 'sqlite' (tabelas indexadas)
+ARMAZENAMENTO = os.getenv('ARMAZENAMENTO', 'json')
+SQLITE_FILE = os.getenv('SQLITE_FILE', 'catalogo.db')
+armazenamento = criar_armazenamento(
+    ARMAZENAMENTO,
+    {'produtos': PRODUTOS_FILE, 'pedidos': PEDIDOS_FILE, 'usuarios': USUARIOS_FILE},
+    SQLITE_FILE
+)
+
+# Journal append-only de eventos de pedidos (criação, status, exclusão).
+# O pedidos.json passa a ser um snapshot, reescrito apenas na compactação.
+# Não é usado com backends que já gravam por registro.
+PEDIDOS_JOURNAL_FILE = 'pedidos.journal.jsonl'
+PEDIDOS_JOURNAL = os.getenv('PEDIDOS_JOURNAL', '1') == '1'
+JOURNAL_COMPACTAR_A_CADA = int(os.getenv('JOURNAL_COMPACTAR_A_CADA', '500'))
+_eventos_journal_pendentes = 0
+
+def _journal_ativo():
+    """Retorna True se os eventos de pedidos devem ir para o journal"""
+    return PEDIDOS_JOURNAL and not armazenamento.suporta_por_registro
+
+# Gravação agrupada (group commit) de produtos e pedidos: as alterações são gravadas no máximo
+# uma vez a cada GRAVACAO_INTERVALO segundos ou a cada GRAVACAO_MAX_PENDENTES alterações.
+# 0 desativa (grava a cada alteração). Use apenas com um único processo: alterações ainda
+# pendentes em um worker não são vistas pelos outros.
+GRAVACAO_INTERVALO = float(os.getenv('GRAVACAO_INTERVALO', '0'))
+GRAVACAO_MAX_PENDENTES = int(os.getenv('GRAVACAO_MAX_PENDENTES', '100'))
+gravador = None
+
+# Tamanho máximo de página aceito em GET /api/pedidos e nas listagens de produtos
+LIMITE_MAXIMO_PEDIDOS = int(os.getenv('LIMITE_MAXIMO_PEDIDOS', '200'))
+LIMITE_MAXIMO_PRODUTOS = int(os.getenv('LIMITE_MAXIMO_PRODUTOS', '100'))
+
+# Modo em que a memória é a fonte de verdade: os dados são lidos na inicialização
+# e só são recarregados quando o armazenamento for alterado externamente
+MEMORIA_AUTORITATIVA = os.getenv('MEMORIA_AUTORITATIVA', '1') == '1'
+_assinaturas_colecoes = {}
+
+# Versão das coleções para ETag/Last-Modified: a assinatura do armazenamento (a mesma em
+# todos os processos) mais as alterações feitas em memória que aguardam gravação agrupada
+_alteracoes_nao_gravadas = {}
+_modificacao_colecoes = {}
+
+def _assinatura_colecao(colecao):
+    """Assinatura atual da coleção no armazenamento (inclui o journal de pedidos)"""
+    assinatura = armazenamento.assinatura(colecao)
+    if colecao == 'pedidos' and _journal_ativo():
+        assinatura = (assinatura, assinatura_arquivo(PEDIDOS_JOURNAL_FILE))
+    return assinatura
+
+def _registrar_assinatura(colecao, assinatura=None):
+    """Registra a assinatura da coleção correspondente ao estado em memória"""
+    assinatura = assinatura if assinatura is not None else _assinatura_colecao(colecao)
+    if _assinaturas_colecoes.get(colecao) != assinatura:
+        _modificacao_colecoes[colecao] = datetime.now(timezone.utc)
+    _assinaturas_colecoes[colecao] = assinatura
+
+def _versao_colecao(colecao):
+    """
+    Versão atual da coleção em memória.
+    
+    Returns:
+        tuple: (etag, data da última modificação)
+    """
+    versao = repr((_assinaturas_colecoes.get(colecao), _alteracoes_nao_gravadas.get(colecao, 0)))
+    etag = hashlib.sha1(f'{colecao}:{versao}'.encode('utf-8')).hexdigest()[:20]
+    return etag, _modificacao_colecoes.get(colecao)
+
+def _recarregar_se_modificado(colecao, carregar):
+    """
+    Recarrega a coleção apenas se ela mudou desde a última carga ou gravação.
+    Fora do modo de memória autoritativa, sempre recarrega.
+    Coleções com gravações agrupadas pendentes nunca são recarregadas, pois a memória é mais recente.
+    """
+    if gravador is not None and gravador.pendente(colecao):
+        return True
+    if not MEMORIA_AUTORITATIVA:
+        return carregar()
+    if colecao in _assinaturas_colecoes and _assinaturas_colecoes[colecao] == _assinatura_colecao(colecao):
+        return True
+    logger.info(f"Coleção {colecao} alterada externamente, recarregando")
+    armazenamento.descartar_cache(colecao)
+    # Não se sabe quais registros mudaram: invalidar todas as entradas da coleção
+    invalidar_tags(colecao)
+    return carregar()
+
+def sincronizar_produtos():
+    """Garante que os produtos em memória refletem o armazenamento"""
+    return _recarregar_se_modificado('produtos', carregar_produtos)
+
+def sincronizar_pedidos():
+    """Garante que os pedidos em memória refletem o armazenamento"""
+    return _recarregar_se_modificado('pedidos', carregar_pedidos)
+
+def sincronizar_usuarios():
+    """Garante que os usuários em memória refletem o armazenamento"""
+    return _recarregar_se_modificado('usuarios', carregar_usuarios)
+
+_SINCRONIZADORES = {
+    'produtos': sincronizar_produtos,
+    'pedidos': sincronizar_pedidos,
+    'usuarios': sincronizar_usuarios,
+}
+
+def transacional(*colecoes):
+    """
+    Decorador para rotas que alteram dados.
+    Executa a rota com as coleções bloqueadas entre processos (vários workers WSGI) e,
+    antes de executá-la, recarrega as coleções que outro processo tenha alterado.
+    Assim o ciclo carregar-alterar-salvar não perde atualizações concorrentes.
+    """
+    def decorador(f):
+        def decorated_function(*args, **kwargs):
+            with armazenamento.bloquear(colecoes):
+                for colecao in colecoes:
+                    _SINCRONIZADORES[colecao]()
+                return f(*args, **kwargs)
+        decorated_function.__name__ = f.__name__
+        return decorated_function
+    return decorador
+
+def sincronizado(*colecoes):
+    """
+    Decorador para rotas de leitura em cache: sincroniza as coleções antes de consultar o cache,
+    para que uma alteração feita por outro processo invalide as entradas (via invalidar_tags)
+    em vez de a rota servir a versão antiga até o fim do timeout.
+    """
+    def decorador(f):
+        def decorated_function(*args, **kwargs):
+            for colecao in colecoes:
+                _SINCRONIZADORES[colecao]()
+            return f(*args, **kwargs)
+        decorated_function.__name__ = f.__name__
+        return decorated_function
+    return decorador
+
+def condicional(f):
+    """
+    Decorador para rotas de leitura que respondem a requisições condicionais.
+    Fica por fora do cache: a resposta (em cache ou não) é comparada com If-None-Match e
+    If-Modified-Since e, se o cliente já tiver a versão atual, vira um 304 sem corpo.
+    """
+    def decorated_function(*args, **kwargs):
+        resposta = app.make_response(f(*args, **kwargs))
+        if resposta.status_code == 200:
+            return resposta.make_conditional(request)
+        return resposta
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def versionado(colecao):
+    """
+    Decorador para rotas de leitura de uma coleção.
+    Sincroniza a coleção e compara a versão dela com If-None-Match / If-Modified-Since antes
+    de executar a rota: se o cliente já tiver a versão atual, responde 304 sem serializar nada.
+    As respostas levam ETag fraca, Last-Modified e Cache-Control: no-cache (sempre revalidar).
+    """
+    def decorador(f):
+        def decorated_function(*args, **kwargs):
+            _SINCRONIZADORES[colecao]()
+            etag, modificado_em = _versao_colecao(colecao)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=modificado_em):
+                resposta = app.response_class(status=304)
+            else:
+                resposta = app.make_response(f(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+            resposta.set_etag(etag, weak=True)
+            resposta.last_modified = modificado_em
+            resposta.headers['Cache-Control'] = 'no-cache'
+            return resposta
+        decorated_function.__name__ = f.__name__
+        return decorated_function
+    return decorador
+
+def _persistir(colecao, objetos, alterados=None, removidos=None):
+    """
+    Persiste uma coleção no armazenamento.
+    Se o backend grava por registro e os registros alterados/removidos forem informados,
+    grava apenas eles; caso contrário, reescreve a coleção inteira.
+    """
+    if alterados is not None:
+        # Um registro pode ter sido removido da memória entre a alteração e a gravação
+        alterados = [o for o in alterados if o is not None]
+    if armazenamento.suporta_por_registro and (alterados is not None or removidos is not None):
+        ok = True
+        if alterados:
+            ok = armazenamento.salvar_registros(colecao, [o.to_dict() for o in alterados]) and ok
+        if removidos:
+            ok = armazenamento.remover_registros(colecao, removidos) and ok
+        return ok
+    return armazenamento.salvar(colecao, [o.to_dict() for o in objetos])
+
+def _salvar_agrupado(colecao, alterados, removidos, duravel):
+    """
+    Encaminha a gravação para o gravador agrupado.
+    
+    Returns:
+        bool: True se a gravação foi agendada (ou feita, se duravel), False se o agrupamento está desativado
+    """
+    if gravador is None:
+        return False
+    if alterados is not None:
+        alterados = [o for o in alterados if o is not None]
+    gravador.marcar(colecao, alterados, removidos)
+    _alteracoes_nao_gravadas[colecao] = _alteracoes_nao_gravadas.get(colecao, 0) + 1
+    _modificacao_colecoes[colecao] = datetime.now(timezone.utc)
+    # A memória já reflete a alteração, então as respostas em cache ficam obsoletas
+    _invalidar_cache_colecao(colecao, alterados, removidos)
+    if duravel:
+        gravador.descarregar([colecao])
+    return True
+
+def _invalidar_cache_colecao(colecao, alterados=None, removidos=None):
+    """
+    Invalida as respostas em cache afetadas por uma gravação.
+    Com alterados/removidos, invalida apenas as entradas desses registros; sem eles
+    (gravação completa), invalida todas as entradas da coleção.
+    """
+    if colecao == 'produtos':
+        invalidar_snapshot_produtos()
+    if alterados is None and removidos is None:
+        invalidar_tags(colecao)
+        return
+    ids = [registro.id for registro in (alterados or []) if registro is not None] + list(removidos or [])
+    invalidar_tags(*[f'{colecao}:{registro_id}' for registro_id in ids])
+
+# Compressão das respostas (brotli ou gzip, conforme Accept-Encoding) a partir de um tamanho
+# mínimo. As versões comprimidas de respostas com ETag ficam em um cache LRU em memória,
+# por URL, ETag e codificação, para que a mesma versão não seja comprimida de novo.
+COMPRESSAO_MINIMO = int(os.getenv('COMPRESSAO_MINIMO', '1024'))
+COMPRESSAO_CACHE_ITENS = int(os.getenv('COMPRESSAO_CACHE_ITENS', '256'))
+_TIPOS_COMPRIMIVEIS = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/html', 'text/css', 'text/plain'
+}
+_cache_comprimido = OrderedDict()
+_trava_compressao = threading.Lock()
+
+def _escolher_codificacao():
+    """Codificação preferida aceita pelo cliente, ou None"""
+    if brotli is not None and request.accept_encodings.quality('br') > 0:
+        return 'br'
+    if request.accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+def _comprimir(dados, codificacao):
+    """Comprime os dados na codificação informada"""
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=5)
+    return gzip.compress(dados, compresslevel=6, mtime=0)
+
+@app.after_request
+def comprimir_resposta(resposta):
+    """Comprime respostas de texto/JSON grandes conforme o Accept-Encoding do cliente"""
+    if (resposta.status_code != 200 or resposta.direct_passthrough or resposta.is_streamed
+            or 'Content-Encoding' in resposta.headers or resposta.mimetype not in _TIPOS_COMPRIMIVEIS):
+        return resposta
+    resposta.vary.add('Accept-Encoding')
+    codificacao = _escolher_codificacao()
+    if codificacao is None:
+        return resposta
+    dados = resposta.get_data()
+    if len(dados) < COMPRESSAO_MINIMO:
+        return resposta
+    
+    etag, fraca = resposta.get_etag()
+    chave = (request.full_path, etag, codificacao) if etag else None
+    comprimido = None
+    if chave:
+        with _trava_compressao:
+            comprimido = _cache_comprimido.get(chave)
+            if comprimido is not None:
+                _cache_comprimido.move_to_end(chave)
+    if comprimido is None:
+        comprimido = _comprimir(dados, codificacao)
+        if chave:
+            with _trava_compressao:
+                _cache_comprimido[chave] = comprimido
+                while len(_cache_comprimido) > COMPRESSAO_CACHE_ITENS:
+                    _cache_comprimido.popitem(last=False)
+    
+    resposta.set_data(comprimido)
+    resposta.headers['Content-Encoding'] = codificacao
+    # Os bytes mudam com a codificação: uma ETag forte passa a ser fraca
+    if etag and not fraca:
+        resposta.set_etag(etag, weak=True)
+    return resposta
+
+# Snapshot pré-serializado da lista completa de produtos (JSON e, opcionalmente, gzip),
+# reconstruído apenas quando a versão da coleção muda
+SNAPSHOT_GZIP = os.getenv('SNAPSHOT_GZIP', '1') == '1'
+_snapshot_produtos = None
+_trava_snapshot = threading.Lock()
+
+def _obter_snapshot_produtos():
+    """
+    Retorna o snapshot da lista de produtos na versão atual, reconstruindo-o se necessário.
+    
+    Returns:
+        dict: {'versao': etag da coleção, 'json': bytes, 'gzip': bytes ou None}
+    """
+    global _snapshot_produtos
+    versao, _ = _versao_colecao('produtos')
+    snapshot = _snapshot_produtos
+    if snapshot is not None and snapshot['versao'] == versao:
+        return snapshot
+    with _trava_snapshot:
+        snapshot = _snapshot_produtos
+        if snapshot is None or snapshot['versao'] != versao:
+            corpo = app.json.dumps(catalogo.listar_produtos()).encode('utf-8')
+            snapshot = {
+                'versao': versao,
+                'json': corpo,
+                'gzip': gzip.compress(corpo, compresslevel=6, mtime=0) if SNAPSHOT_GZIP else None
+            }
+            _snapshot_produtos = snapshot
+            logger.debug("Snapshot de produtos reconstruído (%d bytes)", len(corpo))
+    return snapshot
+
+def invalidar_snapshot_produtos():
+    """Descarta o snapshot da lista de produtos"""
+    global _snapshot_produtos
+    _snapshot_produtos = None
+
+def salvar_produtos(alterados=None, removidos=None, duravel=False):
+    """
+    Salva produtos no armazenamento.
+    
+    Args:
+        alterados (list, optional): Produtos criados ou alterados
+        removidos (list, optional): IDs de produtos removidos
+        duravel (bool, optional): Se True, grava em disco antes de retornar mesmo com gravação agrupada
+    """
+    if _salvar_agrupado('produtos', alterados, removidos, duravel):
+        return True
+    return _gravar_produtos(alterados, removidos)
+
+def _gravar_produtos(alterados=None, removidos=None):
+    """Grava produtos no armazenamento imediatamente"""
     try:
-        dados = {'produtos': [produto.to_dict() for produto in catalogo.produtos]}
-        salvar_json_com_cache(PRODUTOS_FILE, dados)
-        # Limpar cache da API para forçar atualização nas próximas requisições
-        cache.delete('api_produtos')
-        cache.delete_many('api_produto_*')
-        logger.info("Produtos salvos com sucesso")
+        invalidar_snapshot_produtos()
+        if not _persistir('produtos', catalogo.produtos, alterados, removidos):
+            return False
+        _registrar_assinatura('produtos')
+        # Invalidar apenas as respostas em cache dos produtos gravados
+        _invalidar_cache_colecao('produtos', alterados, removidos)
+        logger.debug("Produtos salvos com sucesso")
         return True
     except Exception as e:
         logger.error(f"Erro ao salvar produtos: {e}")
         logger.error(traceback.format_exc())
         return False
 
-def salvar_pedidos():
-    """Salva pedidos em arquivo JSON com cache"""
+def salvar_pedidos(alterados=None, removidos=None, duravel=False):
+    """
+    Salva pedidos no armazenamento.
+    Uma gravação completa é um snapshot de todos os pedidos em memória, então o journal é esvaziado em seguida.
+    
+    Args:
+        alterados (list, optional): Pedidos criados ou alterados
+        removidos (list, optional): IDs de pedidos removidos
+        duravel (bool, optional): Se True, grava em disco antes de retornar mesmo com gravação agrupada
+    """
+    if _salvar_agrupado('pedidos', alterados, removidos, duravel):
+        return True
+    return _gravar_pedidos(alterados, removidos)
+
+def _gravar_pedidos(alterados=None, removidos=None):
+    """Grava pedidos no armazenamento imediatamente"""
+    global _eventos_journal_pendentes
     try:
-        dados = {'pedidos': [pedido.to_dict() for pedido in catalogo.pedidos]}
-        salvar_json_com_cache(PEDIDOS_FILE, dados)
-        # Limpar cache da API para forçar atualização nas próximas requisições
-        cache.delete('api_pedidos')
-        cache.delete_many('api_pedido_*')
-        logger.info("Pedidos salvos com sucesso")
+        if not _persistir('pedidos', catalogo.pedidos, alterados, removidos):
+            return False
+        if _journal_ativo() and os.path.exists(PEDIDOS_JOURNAL_FILE):
+            truncar_arquivo(PEDIDOS_JOURNAL_FILE)
+        _eventos_journal_pendentes = 0
+        _registrar_assinatura('pedidos')
+        _invalidar_cache_colecao('pedidos', alterados, removidos)
+        logger.debug("Pedidos salvos com sucesso")
         return True
     except Exception as e:
         logger.error(f"Erro ao salvar pedidos: {e}")
         logger.error(traceback.format_exc())
         return False
 
-def salvar_usuarios():
-    """Salva usuários em arquivo JSON com cache"""
+def registrar_evento_pedido(evento):
+    """
+    Persiste um evento de pedido.
+    Com backends que gravam por registro, grava apenas o pedido afetado. Com JSON, anexa o
+    evento ao journal append-only (custo O(1) em disco) e, quando o journal acumula
+    JOURNAL_COMPACTAR_A_CADA eventos, compacta em um novo snapshot.
+    
+    Args:
+        evento (dict): {'op': 'criar', 'pedido': {...}}, {'op': 'status', 'id': ..., 'status': ...}
+            ou {'op': 'excluir', 'id': ...}
+    """
+    global _eventos_journal_pendentes
+    if armazenamento.suporta_por_registro:
+        if evento['op'] == 'excluir':
+            return salvar_pedidos(removidos=[evento['id']])
+        pedido_id = evento['pedido']['id'] if evento['op'] == 'criar' else evento['id']
+        return salvar_pedidos(alterados=[catalogo._obter_pedido_obj(pedido_id)])
+    if not PEDIDOS_JOURNAL:
+        return salvar_pedidos()
     try:
-        dados = {'usuarios': [usuario.to_dict() for usuario in catalogo.usuarios]}
-        salvar_json_com_cache(USUARIOS_FILE, dados)
-        logger.info("Usuários salvos com sucesso")
+        anexar_jsonl(PEDIDOS_JOURNAL_FILE, evento)
+        _registrar_assinatura('pedidos')
+        _eventos_journal_pendentes += 1
+        if _eventos_journal_pendentes >= JOURNAL_COMPACTAR_A_CADA:
+            logger.info(f"Compactando journal de pedidos ({_eventos_journal_pendentes} eventos)")
+            return salvar_pedidos()
+        return True
+    except Exception as e:
+        logger.error(f"Erro ao registrar evento de pedido: {e}")
+        logger.error(traceback.format_exc())
+        # Sem journal, persiste o estado completo
+        return salvar_pedidos()
+
+def _gravar_colecao_agrupada(colecao, alterados, removidos):
+    """Callback do gravador agrupado: grava a coleção com o bloqueio entre processos"""
+    gravar = {'produtos': _gravar_produtos, 'pedidos': _gravar_pedidos}[colecao]
+    with armazenamento.bloquear([colecao]):
+        return gravar(alterados, removidos)
+
+if GRAVACAO_INTERVALO > 0:
+    gravador = GravadorAgrupado(_gravar_colecao_agrupada, GRAVACAO_INTERVALO, GRAVACAO_MAX_PENDENTES)
+    # Gravar alterações pendentes ao encerrar o processo
+    atexit.register(gravador.parar)
+
+def _aplicar_evento_pedido(evento):
+    """
+    Aplica um evento do journal aos pedidos em memória.
+    Os eventos são idempotentes, então reaplicar um evento já presente no snapshot é seguro.
+    """
+    op = evento.get('op')
+    if op == 'criar':
+        pedido = Pedido.from_dict(evento['pedido'])
+        with catalogo._trava:
+            existente = catalogo._obter_pedido_obj(pedido.id)
+            if existente:
+                catalogo.pedidos.remove(existente)
+                catalogo._desindexar_pedido(existente)
+            catalogo.pedidos.append(pedido)
+            catalogo._indexar_pedido(pedido)
+    elif op == 'status':
+        pedido = catalogo._obter_pedido_obj(evento['id'])
+        if pedido:
+            catalogo._alterar_status_pedido(pedido, evento['status'])
+    elif op == 'excluir':
+        with catalogo._trava:
+            pedido = catalogo._obter_pedido_obj(evento['id'])
+            if pedido:
+                catalogo.pedidos.remove(pedido)
+                catalogo._desindexar_pedido(pedido)
+    else:
+        logger.warning(f"Evento de pedido desconhecido no journal: {op}")
+
+def salvar_usuarios(alterados=None, removidos=None):
+    """
+    Salva usuários no armazenamento.
+    
+    Args:
+        alterados (list, optional): Usuários criados ou alterados
+        removidos (list, optional): IDs de usuários removidos
+    """
+    try:
+        if not _persistir('usuarios', catalogo.usuarios, alterados, removidos):
+            return False
+        _invalidar_versoes_usuarios(alterados, removidos)
+        _registrar_assinatura('usuarios')
+        logger.debug("Usuários salvos com sucesso")
         return True
     except Exception as e:
         logger.error(f"Erro ao salvar usuários: {e}")
@@ -80,23 +599,28 @@ def salvar_usuarios():
         return False
 
 def carregar_produtos():
-    """Carrega produtos do arquivo JSON com cache"""
+    """Carrega produtos do armazenamento"""
     try:
-        dados = carregar_json_com_cache(PRODUTOS_FILE)
-        if dados and 'produtos' in dados:
+        assinatura = _assinatura_colecao('produtos')
+        registros = armazenamento.carregar('produtos')
+        _registrar_assinatura('produtos', assinatura)
+        if registros is not None:
             catalogo.produtos = []  # Limpa a lista atual
-            for produto_data in dados.get('produtos', []):
+            for produto_data in registros:
                 try:
                     produto = Produto.from_dict(produto_data)
                     catalogo.produtos.append(produto)
                 except Exception as e:
                     logger.error(f"Erro ao carregar produto {produto_data.get('nome', 'desconhecido')}: {e}")
                     continue
-            logger.info(f"Carregados {len(catalogo.produtos)} produtos")
-            # Atualizar índices após carregar todos os produtos
-            catalogo._atualizar_indices()
+            logger.info("Carregados %d produtos", len(catalogo.produtos))
+            # Reindexar apenas os produtos (pedidos e usuários não mudaram)
+            catalogo._indexar_produtos()
+        elif armazenamento.existe('produtos'):
+            # Arquivo ilegível: não reinicializar para não sobrescrever os dados existentes
+            logger.error("Produtos ilegíveis no armazenamento, mantendo produtos em memória")
         else:
-            logger.info("Arquivo produtos.json não encontrado ou vazio, usando produtos padrão")
+            logger.info("Produtos não encontrados no armazenamento, usando produtos padrão")
             # Adicionar produtos padrão se não existirem
             if not catalogo.produtos:
                 catalogo.adicionar_produto(
@@ -128,50 +652,151 @@ def carregar_produtos():
         logger.error(traceback.format_exc())
         return False
 
+# Status antigos que devem ser convertidos para os status atuais
+STATUS_LEGADOS = {'Processado': 'Concluído'}
+
+def migrar_status_pedidos(pedidos):
+    """
+    Converte status legados dos pedidos para os status atuais.
+    
+    Returns:
+        int: Quantidade de pedidos alterados
+    """
+    alterados = 0
+    for pedido in pedidos:
+        if pedido.status in STATUS_LEGADOS:
+            catalogo._alterar_status_pedido(pedido, STATUS_LEGADOS[pedido.status])
+            alterados += 1
+    return alterados
+
+def _reaplicar_journal_pedidos():
+    """Reaplica os eventos do journal sobre o snapshot carregado"""
+    global _eventos_journal_pendentes
+    eventos = ler_jsonl(PEDIDOS_JOURNAL_FILE) if _journal_ativo() else []
+    for evento in eventos:
+        try:
+            _aplicar_evento_pedido(evento)
+        except Exception as e:
+            logger.error(f"Erro ao reaplicar evento do journal de pedidos: {e}")
+    _eventos_journal_pendentes = len(eventos)
+    if eventos:
+        logger.info(f"Reaplicados {len(eventos)} eventos do journal de pedidos")
+
 def carregar_pedidos():
-    """Carrega pedidos do arquivo JSON com cache"""
+    """Carrega pedidos do armazenamento e reaplica o journal de eventos"""
     try:
-        dados = carregar_json_com_cache(PEDIDOS_FILE)
-        if dados and 'pedidos' in dados:
+        assinatura = _assinatura_colecao('pedidos')
+        registros = armazenamento.carregar('pedidos')
+        if registros is not None:
             catalogo.pedidos = []  # Limpa a lista atual
-            for pedido_data in dados.get('pedidos', []):
+            for pedido_data in registros:
                 pedido = Pedido.from_dict(pedido_data)
-                # Corrigir status de pedidos existentes
-                if pedido.status == 'Processado':
-                    pedido.status = 'Concluído'
                 catalogo.pedidos.append(pedido)
-            logger.info(f"Carregados {len(catalogo.pedidos)} pedidos")
-            # Atualizar índices após carregar todos os pedidos
-            catalogo._atualizar_indices()
-            # Salvar correções se houver
+            logger.info("Carregados %d pedidos", len(catalogo.pedidos))
+            # Reindexar apenas os pedidos (produtos e usuários não mudaram)
+            catalogo._indexar_pedidos()
+            _reaplicar_journal_pedidos()
+            _registrar_assinatura('pedidos', assinatura)
+            # Corrigir status legados e salvar apenas se algum pedido mudou
+            corrigidos = migrar_status_pedidos(catalogo.pedidos)
+            if corrigidos:
+                logger.info(f"Status de {corrigidos} pedidos migrados")
+                salvar_pedidos()
+        elif not armazenamento.existe('pedidos'):
+            logger.info("Pedidos não encontrados no armazenamento, criando novo")
+            catalogo.pedidos = []
+            catalogo._indexar_pedidos()
+            _reaplicar_journal_pedidos()
             salvar_pedidos()
+            return True
         else:
-            logger.info("Arquivo pedidos.json não encontrado ou vazio, criando novo")
-            salvar_pedidos()
+            logger.warning("Pedidos vazios ou inválidos no armazenamento, mantendo pedidos em memória")
+            _registrar_assinatura('pedidos', assinatura)
         return True
     except Exception as e:
         logger.error(f"Erro ao carregar pedidos: {e}")
         logger.error(traceback.format_exc())
         return False
 
+# Versão dos dados de autorização de cada usuário (tipo, nome e hash da senha), por ID.
+# A sessão guarda o tipo do usuário junto com essa versão; quando ela muda, o tipo é relido.
+_versoes_usuarios = {}
+
+def _versao_usuario(usuario):
+    """Retorna a versão dos dados de autorização do usuário (igual em todos os processos)."""
+    versao = _versoes_usuarios.get(usuario.id)
+    if versao is None:
+        conteudo = f'{usuario.tipo}\0{usuario.nome}\0{usuario.senha_hash}'.encode('utf-8')
+        versao = _versoes_usuarios[usuario.id] = hashlib.sha1(conteudo).hexdigest()[:12]
+    return versao
+
+def _invalidar_versoes_usuarios(alterados=None, removidos=None):
+    """Descarta as versões dos usuários alterados/removidos (todas, se nenhum for informado)."""
+    if alterados is None and removidos is None:
+        _versoes_usuarios.clear()
+        return
+    for usuario in alterados or []:
+        _versoes_usuarios.pop(usuario.id, None)
+    for usuario_id in removidos or []:
+        _versoes_usuarios.pop(usuario_id, None)
+
+def revogar_sessoes_usuario(usuario_id):
+    """Encerra todas as sessões do usuário (apenas com sessões guardadas no servidor)."""
+    if armazem_sessoes is None:
+        return 0
+    revogadas = armazem_sessoes.revogar_usuario(usuario_id)
+    logger.info(f"{revogadas} sessões do usuário {usuario_id} revogadas")
+    return revogadas
+
+def _registrar_usuario_na_sessao(usuario):
+    """Grava na sessão o ID, o nome e o tipo do usuário, com a versão correspondente."""
+    session['usuario_id'] = usuario.id
+    session['usuario_nome'] = usuario.nome
+    session['usuario_tipo'] = usuario.tipo
+    session['usuario_versao'] = _versao_usuario(usuario)
+
+def usuario_atual():
+    """
+    Retorna o objeto Usuario da sessão, buscado uma vez por requisição pelo índice de IDs.
+    Antes, sincroniza os usuários (uma verificação de assinatura; só recarrega se outro processo
+    os alterou), para que rebaixamentos e exclusões feitos em outro worker valham de imediato.
+    Se os dados do usuário mudaram desde que a sessão foi gravada, atualiza o tipo e o nome na sessão.
+    
+    Returns:
+        Usuario: Usuário logado ou None
+    """
+    if 'usuario' not in g:
+        sincronizar_usuarios()
+        usuario = catalogo._obter_usuario_obj(session.get('usuario_id'))
+        if usuario and session.get('usuario_versao') != _versao_usuario(usuario):
+            _registrar_usuario_na_sessao(usuario)
+        g.usuario = usuario
+    return g.usuario
+
 def carregar_usuarios():
-    """Carrega usuários do arquivo JSON com cache"""
+    """Carrega usuários do armazenamento"""
     try:
-        dados = carregar_json_com_cache(USUARIOS_FILE)
-        if dados and 'usuarios' in dados:
+        assinatura = _assinatura_colecao('usuarios')
+        registros = armazenamento.carregar('usuarios')
+        _registrar_assinatura('usuarios', assinatura)
+        if registros is not None:
             catalogo.usuarios = []  # Limpa a lista atual
-            for usuario_data in dados.get('usuarios', []):
+            for usuario_data in registros:
                 try:
                     usuario = Usuario.from_dict(usuario_data)
                     catalogo.usuarios.append(usuario)
                 except Exception as e:
                     logger.error(f"Erro ao carregar usuário {usuario_data.get('nome', 'desconhecido')}: {e}")
                     continue
-            logger.info(f"Carregados {len(catalogo.usuarios)} usuários")
-            # Atualizar índices após carregar todos os usuários
-            catalogo._atualizar_indices()
+            logger.info("Carregados %d usuários", len(catalogo.usuarios))
+            # Reindexar apenas os usuários (produtos e pedidos não mudaram)
+            catalogo._indexar_usuarios()
+            _invalidar_versoes_usuarios()
+        elif armazenamento.existe('usuarios'):
+            # Arquivo ilegível: não recriar o gerente padrão sobre os dados existentes
+            logger.error("Usuários ilegíveis no armazenamento, mantendo usuários em memória")
         else:
-            logger.info("Arquivo usuarios.json não encontrado ou vazio, criando usuário gerente padrão")
+            logger.info("Usuários não encontrados no armazenamento, criando usuário gerente padrão")
             # Criar o usuário gerente padrão
             if not catalogo.usuarios:
                 catalogo.adicionar_usuario(
@@ -239,13 +864,16 @@ garantir_diretorio_imagens()
 # Funções auxiliares para manipulação de usuários
 def _get_usuario_object(usuario_id):
     """Obtém um objeto Usuario pelo ID"""
-    return next((u for u in catalogo.usuarios if u.id == usuario_id), None)
+    return catalogo._obter_usuario_obj(usuario_id)
 
 def _atualizar_senha_usuario(usuario_dict, nova_senha):
     """Atualiza a senha de um usuário a partir do dicionário"""
     usuario = _get_usuario_object(usuario_dict['id'])
     if usuario:
+        # O token de redefinição é limpo, então os índices precisam ser refeitos
+        catalogo._desindexar_usuario(usuario)
         usuario.atualizar_senha(nova_senha)
+        catalogo._indexar_usuario(usuario)
         return True
     return False
 
@@ -253,7 +881,10 @@ def _gerar_token_usuario(usuario_dict):
     """Gera um token de redefinição para um usuário a partir do dicionário"""
     usuario = _get_usuario_object(usuario_dict['id'])
     if usuario:
-        return usuario.gerar_token_redefinicao()
+        catalogo._desindexar_usuario(usuario)
+        token = usuario.gerar_token_redefinicao()
+        catalogo._indexar_usuario(usuario)
+        return token
     return None
 
 @app.route('/static/images/<path:filename>')
@@ -274,10 +905,47 @@ def servir_imagem(filename):
         logger.error(traceback.format_exc())
         return '', 404
 
+# Cache das páginas renderizadas. As páginas são cascas estáticas (os dados vêm da API pelo
+# navegador) que só variam com o usuário da sessão, então o HTML é renderizado uma vez por
+# template e usuário. Em modo debug os templates podem mudar e o cache não é usado.
+PAGINAS_CACHE_ITENS = int(os.getenv('PAGINAS_CACHE_ITENS', '512'))
+_cache_paginas = OrderedDict()
+_trava_paginas = threading.Lock()
+
+def renderizar_pagina(template):
+    """
+    Renderiza uma página reaproveitando o HTML já renderizado para o mesmo usuário.
+    A resposta leva ETag forte e Cache-Control privado com revalidação, pois varia com a sessão.
+    
+    Args:
+        template (str): Nome do template
+        
+    Returns:
+        Response: Página (ou 304 se o navegador já tiver a versão atual)
+    """
+    chave = (template, session.get('usuario_id'), session.get('usuario_nome'), session.get('usuario_tipo'))
+    with _trava_paginas:
+        pagina = _cache_paginas.get(chave)
+        if pagina is not None:
+            _cache_paginas.move_to_end(chave)
+    if pagina is None or app.debug:
+        html = render_template(template).encode('utf-8')
+        pagina = (html, hashlib.sha1(html).hexdigest())
+        if not app.debug:
+            with _trava_paginas:
+                _cache_paginas[chave] = pagina
+                while len(_cache_paginas) > PAGINAS_CACHE_ITENS:
+                    _cache_paginas.popitem(last=False)
+    
+    resposta = app.response_class(pagina[0], mimetype='text/html')
+    resposta.set_etag(pagina[1])
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta.make_conditional(request)
+
 @app.route('/')
 def index():
     try:
-        return render_template('index.html')
+        return renderizar_pagina('index.html')
     except Exception as e:
         logger.error(f"Erro na página inicial: {str(e)}")
         logger.error(traceback.format_exc())
@@ -285,71 +953,158 @@ def index():
 
 @app.route('/pedidos')
 def lista_pedidos():
-    return render_template('pedidos.html')
+    return renderizar_pagina('pedidos.html')
 
 @app.route('/estoque')
 def estoque():
     try:
-        logger.info("Acessando página de estoque")
-        return render_template('estoque.html')
+        return renderizar_pagina('estoque.html')
     except Exception as e:
         logger.error(f"Erro ao renderizar página de estoque: {str(e)}")
         logger.error(traceback.format_exc())
         return render_template('erro.html', mensagem="Erro ao carregar a página de estoque")
 
 @app.route('/api/produtos')
-@cache.cached(timeout=60, key_prefix='api_produtos')
+@versionado('produtos')
 def listar_produtos():
+    """
+    Lista os produtos. Sem parâmetros, retorna o catálogo completo a partir do snapshot pré-serializado.
+    
+    Parâmetros de consulta opcionais: ordenacao (id, nome, preco, estoque ou data_atualizacao,
+    com '-' para ordem decrescente), limite, cursor e campos (lista separada por vírgulas).
+    O total vai no cabeçalho X-Total-Count e o cursor da próxima página em X-Proximo-Cursor.
+    """
     try:
-        # Recarregar produtos antes de listar para garantir dados atualizados
-        logger.info("Requisição recebida para listar produtos")
-        carregar_produtos()
-        logger.info(f"Produtos carregados: {len(catalogo.produtos)} encontrados")
-        
-        produtos = catalogo.listar_produtos()
-        logger.info(f"Retornando {len(produtos)} produtos em formato JSON")
-        
-        # Log dos primeiros 3 produtos para depuração
-        if produtos and len(produtos) > 0:
-            for i, produto in enumerate(produtos[:3]):
-                logger.info(f"Produto {i+1}: ID={produto.get('id')} Nome={produto.get('nome')} Preço={produto.get('preco')}")
+        # A sincronização com o armazenamento é feita pelo decorador versionado
+        if request.args:
+            campos = request.args.get('campos')
+            produtos, total, proximo_cursor = catalogo.consultar_produtos(
+                ordenacao=request.args.get('ordenacao') or None,
+                cursor=request.args.get('cursor') or None,
+                limite=_ler_limite(LIMITE_MAXIMO_PRODUTOS),
+                campos=[c.strip() for c in campos.split(',') if c.strip()] if campos else None
+            )
+            return _resposta_paginada(produtos, total, proximo_cursor)
         
-        return jsonify(produtos)
+        snapshot = _obter_snapshot_produtos()
+        if snapshot['gzip'] is not None and request.accept_encodings.quality('gzip') > 0:
+            resposta = app.response_class(snapshot['gzip'], mimetype='application/json')
+            resposta.headers['Content-Encoding'] = 'gzip'
+        else:
+            resposta = app.response_class(snapshot['json'], mimetype='application/json')
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
     except Exception as e:
         logger.error(f"Erro ao listar produtos: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"erro": "Erro ao processar a requisição"}), 500
 
+def _ler_limite(maximo, padrao=None):
+    """
+    Lê o parâmetro de consulta 'limite', restrito ao intervalo de 1 a maximo.
+    
+    Raises:
+        ValueError: Se o limite não for um número inteiro
+    """
+    limite = request.args.get('limite')
+    if limite is None:
+        return padrao
+    try:
+        return min(max(int(limite), 1), maximo)
+    except ValueError:
+        raise ValueError('Limite deve ser um número inteiro')
+
+def _resposta_paginada(itens, total, proximo_cursor):
+    """
+    Resposta JSON de uma página com o total em X-Total-Count e o cursor em X-Proximo-Cursor.
+    Total None (não calculado) omite X-Total-Count.
+    """
+    resposta = jsonify(itens)
+    if total is not None:
+        resposta.headers['X-Total-Count'] = str(total)
+    if proximo_cursor:
+        resposta.headers['X-Proximo-Cursor'] = proximo_cursor
+    return resposta
+
+@app.route('/api/produtos/busca', methods=['GET'])
+def buscar_produtos_api():
+    """
+    Busca produtos por nome e descrição (parâmetro q), com paginação por limite e cursor.
+    Cada palavra de q casa por prefixo, sem diferenciar acentos e maiúsculas.
+    """
+    try:
+        sincronizar_produtos()
+        limite = _ler_limite(LIMITE_MAXIMO_PRODUTOS, padrao=LIMITE_MAXIMO_PRODUTOS)
+        produtos, total, proximo_cursor = catalogo.buscar_produtos(
+            request.args.get('q', ''),
+            cursor=request.args.get('cursor') or None,
+            limite=limite
+        )
+        return _resposta_paginada(produtos, total, proximo_cursor)
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro ao buscar produtos: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'erro': 'Erro ao processar a requisição'}), 500
+
 @app.route('/api/pedidos', methods=['GET'])
+@versionado('pedidos')
 def listar_pedidos_api():
+    """
+    Lista pedidos com filtros, ordenação e paginação opcionais.
+    
+    Parâmetros de consulta: status, data_inicial e data_final (AAAA-MM-DD), cliente,
+    valor_min, valor_max, ordenacao (data-recente, data-antiga, valor-alto, valor-baixo),
+    limite e cursor. O total filtrado vai no cabeçalho X-Total-Count e o cursor da
+    próxima página em X-Proximo-Cursor. Com filtro de cliente ou de faixa no campo que
+    não é o da ordenação, X-Total-Count só é enviado quando todos os pedidos couberam
+    na primeira página, para não percorrer todos os pedidos a cada página.
+    """
     try:
-        carregar_pedidos()  # Recarrega os pedidos antes de listar
-        pedidos = catalogo.listar_pedidos()
-        
-        # Não precisamos mais atualizar as informações dos produtos nos pedidos
-        # pois agora armazenamos todas as informações relevantes no momento do pedido
+        limite = _ler_limite(LIMITE_MAXIMO_PEDIDOS)
+        pedidos, total, proximo_cursor = catalogo.consultar_pedidos(
+            status=request.args.get('status') or None,
+            data_inicial=request.args.get('data_inicial') or None,
+            data_final=request.args.get('data_final') or None,
+            cliente=request.args.get('cliente') or None,
+            valor_min=request.args.get('valor_min'),
+            valor_max=request.args.get('valor_max'),
+            ordenacao=request.args.get('ordenacao') or 'data-recente',
+            cursor=request.args.get('cursor') or None,
+            limite=limite
+        )
         
-        return jsonify(pedidos)
+        return _resposta_paginada(pedidos, total, proximo_cursor)
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
     except Exception as e:
-        print(f"Erro ao listar pedidos: {str(e)}")
+        logger.error(f"Erro ao listar pedidos: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'erro': str(e)}), 500
+
+@app.route('/api/pedidos/<pedido_id>', methods=['GET'])
+@versionado('pedidos')
+def obter_pedido_api(pedido_id):
+    try:
+        pedido = catalogo.obter_pedido(pedido_id)
+        if not pedido:
+            return jsonify({'erro': 'Pedido não encontrado'}), 404
+        return jsonify(pedido)
+    except Exception as e:
+        logger.error(f"Erro ao obter pedido {pedido_id}: {str(e)}")
+        logger.error(traceback.format_exc())
         return jsonify({'erro': str(e)}), 500
 
 @app.route('/api/pedidos', methods=['POST'])
+@transacional('produtos', 'pedidos')
 def criar_pedido_api():
     try:
         dados = request.get_json()
         
-        # Validar estoque antes de criar o pedido
-        for item in dados['produtos']:
-            produto = next((p for p in catalogo.produtos if p.id == item['id']), None)
-            if not produto:
-                return jsonify({'erro': f'Produto com ID {item["id"]} não encontrado'}), 400
-            if produto.quantidade_estoque < item['quantidade']:
-                return jsonify({
-                    'erro': f'Produto {produto.nome} não possui estoque suficiente. Disponível: {produto.quantidade_estoque}'
-                }), 400
-        
-        # Criar o pedido
+        # Criar o pedido (o catálogo valida e reserva o estoque de todos os itens de uma vez)
         pedido = catalogo.criar_pedido(
             produtos=dados['produtos'],
             cliente_nome=dados['cliente_nome'],
@@ -358,8 +1113,8 @@ def criar_pedido_api():
         )
         
         # Salvar as alterações
-        salvar_pedidos()
-        salvar_produtos()
+        registrar_evento_pedido({'op': 'criar', 'pedido': pedido})
+        salvar_produtos(alterados=[catalogo._obter_produto_obj(item['id']) for item in pedido['produtos']])
         
         # Obter o dicionário do pedido
         pedido_dict = pedido
@@ -379,21 +1134,19 @@ def criar_pedido_api():
         return jsonify({'erro': str(e)}), 500
 
 @app.route('/api/pedidos/<pedido_id>/status', methods=['PUT'])
+@transacional('pedidos')
 def atualizar_status_pedido(pedido_id):
     try:
-        # Recarregar pedidos para garantir dados atualizados
-        carregar_pedidos()
-        
         # Encontrar o pedido pelo ID
-        pedido = next((p for p in catalogo.pedidos if p.id == pedido_id), None)
+        pedido = catalogo._obter_pedido_obj(pedido_id)
         if not pedido:
             return jsonify({'erro': 'Pedido não encontrado'}), 404
             
         # Atualizar o status
-        pedido.status = "Concluído"  # Mudar para Concluído
+        catalogo._alterar_status_pedido(pedido, "Concluído")  # Mudar para Concluído
         
         # Salvar as alterações
-        salvar_pedidos()
+        registrar_evento_pedido({'op': 'status', 'id': pedido.id, 'status': pedido.status})
         
         return jsonify(pedido.to_dict())
     except Exception as e:
@@ -428,6 +1181,7 @@ def debug_pedidos():
         })
 
 @app.route('/api/produtos/<produto_id>', methods=['PUT'])
+@transacional('produtos')
 def atualizar_produto_api(produto_id):
     try:
         logger.info(f"Tentando atualizar produto ID: {produto_id}")
@@ -438,11 +1192,7 @@ def atualizar_produto_api(produto_id):
             return jsonify({'erro': 'Dados do produto não fornecidos'}), 400
             
         # Encontrar o produto a ser atualizado
-        produto = None
-        for p in catalogo.produtos:
-            if p.id == produto_id:
-                produto = p
-                break
+        produto = catalogo._obter_produto_obj(produto_id)
                 
         if not produto:
             logger.error(f"Produto com ID {produto_id} não encontrado")
@@ -456,15 +1206,17 @@ def atualizar_produto_api(produto_id):
         if 'preco' in dados:
             produto.preco = float(dados['preco'])
         if 'quantidade_estoque' in dados:
-            produto.quantidade_estoque = int(dados['quantidade_estoque'])
+            with catalogo._trava:
+                produto.quantidade_estoque = int(dados['quantidade_estoque'])
         if 'imagem_url' in dados:
             produto.imagem_url = dados['imagem_url']
             
         # Atualizar a data de atualização
         produto.data_atualizacao = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        catalogo._reindexar_produto(produto)
             
         # Salvar as alterações
-        salvar_produtos()
+        salvar_produtos(alterados=[produto])
         
         logger.info(f"Produto {produto_id} atualizado com sucesso")
         return jsonify(produto.to_dict())
@@ -474,14 +1226,20 @@ def atualizar_produto_api(produto_id):
         return jsonify({'erro': str(e)}), 500
 
 @app.route('/api/produtos/<produto_id>', methods=['GET'])
-@cache.cached(timeout=60, key_prefix=lambda: f'api_produto_{request.view_args["produto_id"]}')
+@condicional
+@sincronizado('produtos')
+@em_cache(chave=lambda produto_id: f'api_produto_{produto_id}',
+          tags=lambda produto_id: ['produtos', f'produtos:{produto_id}'], timeout=60)
 def obter_produto(produto_id):
     try:
-        logger.info(f"Requisição para obter produto {produto_id}")
         produto = catalogo.buscar_produto(produto_id)
         if produto:
-            logger.info(f"Produto encontrado: {produto_id}")
-            return jsonify(produto.to_dict())
+            resposta = jsonify(produto.to_dict())
+            # ETag forte pelo conteúdo e Last-Modified pela data de atualização do produto
+            resposta.add_etag()
+            data_atualizacao = parse_data_br(produto.data_atualizacao) if produto.data_atualizacao else None
+            resposta.last_modified = data_atualizacao.astimezone() if data_atualizacao else None
+            return resposta
         else:
             logger.warning(f"Produto não encontrado: {produto_id}")
             return jsonify({"erro": "Produto não encontrado"}), 404
@@ -491,18 +1249,13 @@ def obter_produto(produto_id):
         return jsonify({"erro": "Erro ao processar a requisição"}), 500
 
 @app.route('/api/produtos/<produto_id>', methods=['DELETE'])
+@transacional('produtos', 'pedidos')
 def excluir_produto_api(produto_id):
     try:
         logger.info(f"Tentando excluir produto ID: {produto_id}")
         
         # Encontrar o produto a ser excluído
-        produto = None
-        index_to_remove = -1
-        for i, p in enumerate(catalogo.produtos):
-            if p.id == produto_id:
-                produto = p
-                index_to_remove = i
-                break
+        produto = catalogo._obter_produto_obj(produto_id)
                 
         if not produto:
             logger.error(f"Produto com ID {produto_id} não encontrado")
@@ -517,11 +1270,11 @@ def excluir_produto_api(produto_id):
                         return jsonify({'erro': 'Este produto está em pedidos pendentes e não pode ser excluído'}), 400
         
         # Remover o produto
-        if index_to_remove >= 0:
-            del catalogo.produtos[index_to_remove]
+        catalogo.produtos.remove(produto)
+        catalogo._desindexar_produto(produto)
             
         # Salvar as alterações
-        salvar_produtos()
+        salvar_produtos(removidos=[produto_id])
         
         logger.info(f"Produto {produto_id} excluído com sucesso")
         return jsonify({'mensagem': 'Produto excluído com sucesso'})
@@ -531,6 +1284,7 @@ def excluir_produto_api(produto_id):
         return jsonify({'erro': str(e)}), 500
 
 @app.route('/api/produtos', methods=['POST'])
+@transacional('produtos')
 def criar_produto_api():
     try:
         logger.info("Tentando criar novo produto")
@@ -557,9 +1311,10 @@ def criar_produto_api():
         )
         
         catalogo.produtos.append(novo_produto)
+        catalogo._indexar_produto(novo_produto)
         
         # Salvar as alterações
-        salvar_produtos()
+        salvar_produtos(alterados=[novo_produto])
         
         logger.info(f"Novo produto criado com ID: {novo_produto.id}")
         return jsonify(novo_produto.to_dict()), 201
@@ -569,20 +1324,13 @@ def criar_produto_api():
         return jsonify({'erro': str(e)}), 500
 
 @app.route('/api/pedidos/<pedido_id>', methods=['DELETE'])
+@transacional('pedidos')
 def excluir_pedido_api(pedido_id):
     try:
         logger.info(f"Tentando excluir pedido ID: {pedido_id}")
         
         # Encontrar o pedido pelo ID
-        carregar_pedidos()  # Garantir dados atualizados
-        
-        index_to_remove = -1
-        pedido = None
-        for i, p in enumerate(catalogo.pedidos):
-            if p.id == pedido_id:
-                pedido = p
-                index_to_remove = i
-                break
+        pedido = catalogo._obter_pedido_obj(pedido_id)
                 
         if not pedido:
             logger.error(f"Pedido com ID {pedido_id} não encontrado")
@@ -593,12 +1341,13 @@ def excluir_pedido_api(pedido_id):
             logger.error(f"Tentativa de excluir pedido pendente {pedido_id}")
             return jsonify({'erro': 'Pedidos pendentes não podem ser excluídos. Conclua o pedido antes de excluí-lo.'}), 400
             
-        # Remover o pedido
-        if index_to_remove >= 0:
-            del catalogo.pedidos[index_to_remove]
+        # Remover o pedido (sob a trava, para não interromper uma consulta paginada em andamento)
+        with catalogo._trava:
+            catalogo.pedidos.remove(pedido)
+            catalogo._desindexar_pedido(pedido)
             
         # Salvar as alterações
-        salvar_pedidos()
+        registrar_evento_pedido({'op': 'excluir', 'id': pedido.id})
         
         logger.info(f"Pedido {pedido_id} excluído com sucesso")
         return jsonify({'mensagem': 'Pedido excluído com sucesso'})
@@ -631,26 +1380,55 @@ def gerente_required(f):
             logger.warning("gerente_required: usuário não está na sessão")
             return redirect(url_for('login', proximo=request.url))
         
-        logger.info(f"gerente_required: verificando permissões para usuário ID: {session['usuario_id']}, tipo: {session.get('usuario_tipo', 'não definido')}")
-        
-        usuario = catalogo.obter_usuario_por_id(session['usuario_id'])
+        usuario = usuario_atual()
         if not usuario:
-            logger.error(f"gerente_required: usuário ID {session['usuario_id']} não encontrado")
+            logger.error("gerente_required: usuário ID %s não encontrado", session['usuario_id'])
             flash('Erro ao verificar usuário', 'danger')
             return redirect(url_for('index'))
         
-        logger.info(f"gerente_required: usuário encontrado - {usuario.get('nome', 'N/A')}, tipo: {usuario.get('tipo', 'N/A')}")
-        
-        if usuario['tipo'] != "gerente" and usuario['tipo'] != "dev":
-            logger.warning(f"gerente_required: acesso negado para usuário {usuario.get('nome', 'N/A')} (tipo: {usuario.get('tipo', 'N/A')})")
+        if usuario.tipo != "gerente" and usuario.tipo != "dev":
+            logger.warning("gerente_required: acesso negado para usuário %s (tipo: %s)", usuario.id, usuario.tipo)
             flash('Acesso restrito a gerentes e desenvolvedores', 'danger')
             return redirect(url_for('index'))
         
-        logger.info(f"gerente_required: acesso concedido para usuário {usuario.get('nome', 'N/A')} (tipo: {usuario.get('tipo', 'N/A')})")
         return f(*args, **kwargs)
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+# Limite de tentativas de login (token bucket), verificado antes do bcrypt:
+#   LOGIN_LIMITE_CREDENCIAL tentativas por email/telefone a cada LOGIN_JANELA_CREDENCIAL segundos
+#   LOGIN_LIMITE_IP tentativas por endereço IP a cada LOGIN_JANELA_IP segundos
+# Os contadores são por processo; com vários workers o limite efetivo é multiplicado por eles.
+limitador_login_credencial = LimitadorTaxa(
+    int(os.getenv('LOGIN_LIMITE_CREDENCIAL', '5')), float(os.getenv('LOGIN_JANELA_CREDENCIAL', '300')))
+limitador_login_ip = LimitadorTaxa(
+    int(os.getenv('LOGIN_LIMITE_IP', '20')), float(os.getenv('LOGIN_JANELA_IP', '60')))
+
+def _recusar_login(proximo, mensagem, status, espera):
+    """Renderiza a página de login com a mensagem de erro e o cabeçalho Retry-After."""
+    flash(mensagem, 'danger')
+    resposta = app.make_response((render_template('login.html', proximo=proximo), status))
+    resposta.headers['Retry-After'] = str(max(1, int(espera + 0.999)))
+    return resposta
+
+def _persistir_hash_senha(usuario, hash_antigo):
+    """
+    Grava o hash de senha regerado no login (custo do bcrypt alterado).
+    Se outro processo tiver trocado a senha nesse meio tempo, a alteração dele prevalece.
+    """
+    novo_hash = usuario.senha_hash
+    try:
+        with armazenamento.bloquear(['usuarios']):
+            sincronizar_usuarios()
+            atual = _get_usuario_object(usuario.id)
+            if not atual or atual.senha_hash not in (hash_antigo, novo_hash):
+                return
+            atual.senha_hash = novo_hash
+            salvar_usuarios(alterados=[atual])
+    except Exception as e:
+        logger.error(f"Erro ao gravar hash de senha regerado: {str(e)}")
+        logger.error(traceback.format_exc())
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     # Se já estiver logado, redirecionar para a página inicial
@@ -667,12 +1445,24 @@ def login():
             flash('Por favor, informe suas credenciais', 'warning')
             return render_template('login.html', proximo=proximo)
         
-        usuario = catalogo.autenticar_usuario(credencial, senha)
+        # Limitar tentativas antes de gastar CPU com o bcrypt
+        chave_credencial = credencial.strip().lower()
+        espera = max(limitador_login_ip.consumir(request.remote_addr or ''),
+                     limitador_login_credencial.consumir(chave_credencial))
+        if espera:
+            logger.warning(f"Login bloqueado temporariamente para credencial {credencial} (IP {request.remote_addr})")
+            return _recusar_login(proximo, 'Muitas tentativas de login. Aguarde alguns instantes e tente novamente.', 429, espera)
         
-        if usuario:
-            session['usuario_id'] = usuario['id']
-            session['usuario_nome'] = usuario['nome']
-            session['usuario_tipo'] = usuario['tipo']
+        try:
+            usuario = catalogo.autenticar_usuario(credencial, senha, ao_atualizar_hash=_persistir_hash_senha)
+        except FilaSenhasCheia:
+            logger.warning("Login recusado: fila de verificação de senhas cheia")
+            return _recusar_login(proximo, 'Servidor ocupado. Tente novamente em instantes.', 503, 1)
+        
+        usuario_obj = _get_usuario_object(usuario['id']) if usuario else None
+        if usuario_obj:
+            limitador_login_credencial.liberar(chave_credencial)
+            _registrar_usuario_na_sessao(usuario_obj)
             session.permanent = True
             
             logger.info(f"Login bem-sucedido: {usuario['nome']} ({usuario['tipo']})")
@@ -697,6 +1487,7 @@ def logout():
     return redirect(url_for('login'))
 
 @app.route('/esqueci-senha', methods=['GET', 'POST'])
+@transacional('usuarios')
 def esqueci_senha():
     if request.method == 'POST':
         credencial = request.form.get('credencial')
@@ -721,7 +1512,7 @@ def esqueci_senha():
             # Para fins de demonstração, apenas exibiremos o link na tela
             
             # Salvar as alterações
-            salvar_usuarios()
+            salvar_usuarios(alterados=[_get_usuario_object(usuario['id'])])
             
             flash('Um link para redefinição de senha foi enviado. Por favor, verifique seu email ou telefone.', 'success')
             flash(f'Link de redefinição (demonstração): /redefinir-senha/{token}', 'info')
@@ -735,6 +1526,7 @@ def esqueci_senha():
     return render_template('esqueci_senha.html')
 
 @app.route('/redefinir-senha/<token>', methods=['GET', 'POST'])
+@transacional('usuarios')
 def redefinir_senha(token):
     # Verificar se o token é válido
     usuario = catalogo.obter_usuario_por_token(token)
@@ -763,7 +1555,7 @@ def redefinir_senha(token):
         # Atualizar a senha
         if _atualizar_senha_usuario(usuario, senha):
             # Salvar as alterações
-            salvar_usuarios()
+            salvar_usuarios(alterados=[_get_usuario_object(usuario['id'])])
         
             flash('Senha redefinida com sucesso. Você já pode fazer login com sua nova senha.', 'success')
             logger.info(f"Senha redefinida para usuário: {usuario['id']} - {usuario['nome']}")
@@ -804,6 +1596,7 @@ def listar_usuarios_api():
 
 @app.route('/api/usuarios', methods=['POST'])
 @gerente_required
+@transacional('usuarios')
 def criar_usuario_api():
     try:
         dados = request.json
@@ -880,7 +1673,7 @@ def criar_usuario_api():
             )
             
             # Salvar as alterações
-            salvar_usuarios()
+            salvar_usuarios(alterados=[_get_usuario_object(usuario['id'])])
             
             # Remover informações sensíveis
             usuario_dict = usuario
@@ -897,6 +1690,7 @@ def criar_usuario_api():
 
 @app.route('/api/usuarios/<usuario_id>', methods=['DELETE'])
 @gerente_required
+@transacional('usuarios')
 def excluir_usuario_api(usuario_id):
     try:
         # Não permitir exclusão do desenvolvedor/administrador
@@ -909,7 +1703,8 @@ def excluir_usuario_api(usuario_id):
         
         if catalogo.excluir_usuario(usuario_id):
             # Salvar as alterações
-            salvar_usuarios()
+            salvar_usuarios(removidos=[usuario_id])
+            revogar_sessoes_usuario(usuario_id)
             
             return jsonify({'mensagem': 'Usuário excluído com sucesso'})
         else:
@@ -922,6 +1717,7 @@ def excluir_usuario_api(usuario_id):
         return jsonify({'erro': str(e)}), 500
 
 @app.route('/api/produtos/<produto_id>/estoque', methods=['PUT'])
+@transacional('produtos')
 def atualizar_estoque_api(produto_id):
     try:
         dados = request.json
@@ -932,11 +1728,7 @@ def atualizar_estoque_api(produto_id):
             return jsonify({'erro': 'É necessário fornecer a quantidade a ser adicionada'}), 400
             
         # Encontrar o produto
-        produto = None
-        for p in catalogo.produtos:
-            if p.id == produto_id:
-                produto = p
-                break
+        produto = catalogo._obter_produto_obj(produto_id)
                 
         if not produto:
             logger.error(f"Produto com ID {produto_id} não encontrado")
@@ -951,9 +1743,9 @@ def atualizar_estoque_api(produto_id):
             
         # Atualizar o estoque
         try:
-            produto.atualizar_estoque(quantidade)
+            catalogo.atualizar_estoque(produto_id, quantidade)
             # Salvar as alterações
-            salvar_produtos()
+            salvar_produtos(alterados=[produto])
             
             logger.info(f"Estoque do produto {produto_id} atualizado com sucesso. Nova quantidade: {produto.quantidade_estoque}")
             return jsonify({
@@ -970,6 +1762,141 @@ def atualizar_estoque_api(produto_id):
         logger.error(traceback.format_exc())
         return jsonify({'erro': str(e)}), 500
 
+FORMATOS_LOTE = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+TAMANHO_BLOCO_EXPORTACAO = 500
+
+def _formato_lote(padrao='jsonl'):
+    """Determina o formato (csv ou jsonl) pelo parâmetro ?formato= ou pelo tipo do conteúdo."""
+    formato = (request.args.get('formato') or '').strip().lower()
+    if formato:
+        if formato not in FORMATOS_LOTE:
+            raise ValueError("Formato deve ser 'csv' ou 'jsonl'")
+        return formato
+    nome_arquivo = request.files['arquivo'].filename if 'arquivo' in request.files else ''
+    if 'csv' in request.mimetype or (nome_arquivo or '').lower().endswith('.csv'):
+        return 'csv'
+    return padrao
+
+def _abrir_texto_upload():
+    """
+    Abre o corpo da requisição como texto, sem carregá-lo inteiro na memória.
+    Aceita um arquivo enviado no campo 'arquivo' (multipart) ou o próprio corpo.
+    """
+    if request.mimetype == 'multipart/form-data':
+        if 'arquivo' not in request.files:
+            raise ValueError("Envie o arquivo no campo 'arquivo'")
+        bruto = request.files['arquivo'].stream
+    else:
+        bruto = request.stream
+    if isinstance(bruto, io.RawIOBase):
+        bruto = io.BufferedReader(bruto)
+    return io.TextIOWrapper(bruto, encoding='utf-8-sig', newline='')
+
+def _ler_registros_lote(texto, formato):
+    """
+    Gera os registros do arquivo linha a linha.
+    Linhas JSONL inválidas geram None, para serem reportadas com o número da linha.
+    """
+    if formato == 'csv':
+        for linha in csv.DictReader(texto):
+            yield {
+                (chave or '').strip(): valor.strip() if isinstance(valor, str) else valor
+                for chave, valor in linha.items()
+                if valor not in (None, '')
+            }
+    else:
+        for linha in texto:
+            if not linha.strip():
+                continue
+            try:
+                yield json.loads(linha)
+            except ValueError:
+                yield None
+
+@app.route('/api/produtos/importar', methods=['POST'])
+@gerente_required
+@transacional('produtos')
+def importar_produtos_api():
+    """
+    Importa produtos em lote a partir de um arquivo CSV ou JSONL.
+    Todas as linhas são validadas antes de qualquer alteração; a importação é aplicada
+    de uma vez e gravada com um único salvamento.
+    
+    Returns:
+        Response: Quantidade de produtos criados, atualizados e inalterados, ou a lista de linhas inválidas
+    """
+    try:
+        formato = _formato_lote()
+        texto = _abrir_texto_upload()
+        try:
+            criados, atualizados, inalterados, erros = catalogo.importar_produtos(_ler_registros_lote(texto, formato))
+        finally:
+            texto.detach()
+        
+        if erros:
+            return jsonify({'erro': 'Importação cancelada: há linhas inválidas', 'erros': erros}), 400
+        
+        if criados or atualizados:
+            salvar_produtos(alterados=criados + atualizados)
+        logger.info(f"Importação de produtos concluída: {len(criados)} criados, {len(atualizados)} atualizados, "
+                    f"{len(inalterados)} inalterados")
+        return jsonify({'criados': len(criados), 'atualizados': len(atualizados), 'inalterados': len(inalterados)})
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        logger.error(f"Erro ao ler arquivo de importação: {str(e)}")
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro ao importar produtos: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'erro': str(e)}), 500
+
+@app.route('/api/produtos/exportar', methods=['GET'])
+@gerente_required
+def exportar_produtos_api():
+    """
+    Exporta todos os produtos em CSV ou JSONL, enviando o arquivo em blocos.
+    
+    Returns:
+        Response: Arquivo produtos.csv ou produtos.jsonl
+    """
+    try:
+        formato = _formato_lote()
+        sincronizar_produtos()
+        with catalogo._trava:
+            produtos = list(catalogo.produtos)
+        
+        def gerar():
+            buffer = io.StringIO()
+            escritor = None
+            if formato == 'csv':
+                escritor = csv.DictWriter(buffer, fieldnames=Catalogo.CAMPOS_PRODUTO, extrasaction='ignore')
+                escritor.writeheader()
+            for inicio in range(0, len(produtos), TAMANHO_BLOCO_EXPORTACAO):
+                for produto in produtos[inicio:inicio + TAMANHO_BLOCO_EXPORTACAO]:
+                    if escritor:
+                        escritor.writerow(produto.to_dict())
+                    else:
+                        buffer.write(json.dumps(produto.to_dict(), ensure_ascii=False))
+                        buffer.write('\n')
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode('utf-8')
+        
+        resposta = Response(stream_with_context(gerar()), mimetype=FORMATOS_LOTE[formato])
+        resposta.headers['Content-Disposition'] = f'attachment; filename=produtos.{formato}'
+        resposta.headers['Cache-Control'] = 'no-store'
+        return resposta
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro ao exportar produtos: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'erro': str(e)}), 500
+
 @app.route('/api/usuarios/verificar-senha', methods=['POST'])
 @gerente_required
 def verificar_senha_gerente():
@@ -981,11 +1908,13 @@ def verificar_senha_gerente():
             return jsonify({'erro': 'Senha não fornecida'}), 400
         
         # Verificar a senha do gerente logado
-        usuario_obj = _get_usuario_object(session['usuario_id'])
+        usuario_obj = usuario_atual()
         if usuario_obj and usuario_obj.verificar_senha(senha):
             return jsonify({'sucesso': True}), 200
         else:
             return jsonify({'erro': 'Senha incorreta'}), 401
+    except FilaSenhasCheia:
+        return jsonify({'erro': 'Servidor ocupado. Tente novamente em instantes.'}), 503, {'Retry-After': '1'}
     except Exception as e:
         logger.error(f"Erro ao verificar senha: {str(e)}")
         logger.error(traceback.format_exc())
@@ -1011,6 +1940,7 @@ def obter_senha_usuario(usuario_id):
 
 @app.route('/api/usuarios/<usuario_id>', methods=['PUT'])
 @gerente_required
+@transacional('usuarios')
 def atualizar_usuario_api(usuario_id):
     try:
         # Não permitir edição do desenvolvedor/administrador
@@ -1028,13 +1958,13 @@ def atualizar_usuario_api(usuario_id):
             if campo not in dados:
                 return jsonify({'erro': f'Campo {campo} é obrigatório'}), 400
         
-        # Obter o usuário atual para verificar se já é um desenvolvedor
-        usuario_atual = catalogo.obter_usuario_por_id(usuario_id)
-        if not usuario_atual:
+        # Obter o usuário editado para verificar se já é um desenvolvedor
+        usuario_alvo = catalogo.obter_usuario_por_id(usuario_id)
+        if not usuario_alvo:
             return jsonify({'erro': 'Usuário não encontrado'}), 404
         
         # Impedir que qualquer usuário altere o tipo de um desenvolvedor
-        if usuario_atual['tipo'] == 'dev' and dados['tipo'] != 'dev':
+        if usuario_alvo['tipo'] == 'dev' and dados['tipo'] != 'dev':
             return jsonify({'erro': 'Não é permitido alterar o tipo de um desenvolvedor'}), 403
             
         # Apenas desenvolvedores podem alterar um usuário para desenvolvedor
@@ -1091,29 +2021,30 @@ def atualizar_usuario_api(usuario_id):
                 return jsonify({'erro': 'A senha deve conter pelo menos uma letra e um número'}), 400
                 
         # Verificar se email já está em uso por outro usuário
-        for u in catalogo.usuarios:
-            if u.id != usuario_id and u.email == email:
-                return jsonify({'erro': 'Email já cadastrado para outro usuário'}), 400
+        u = catalogo._usuarios_por_email.get(email)
+        if u and u.id != usuario_id:
+            return jsonify({'erro': 'Email já cadastrado para outro usuário'}), 400
                 
         # Verificar se telefone já está em uso por outro usuário
-        for u in catalogo.usuarios:
-            if u.id != usuario_id and u.telefone == telefone:
-                return jsonify({'erro': 'Telefone já cadastrado para outro usuário'}), 400
-        
-        # Atualizar dados do usuário
-        for u in catalogo.usuarios:
-            if u.id == usuario_id:
-                u.nome = nome
-                u.email = email
-                u.telefone = telefone
-                u.tipo = tipo
+        u = catalogo._usuarios_por_telefone.get(telefone)
+        if u and u.id != usuario_id:
+            return jsonify({'erro': 'Telefone já cadastrado para outro usuário'}), 400
+        
+        # Atualizar dados do usuário (reindexando email e telefone)
+        u = catalogo._obter_usuario_obj(usuario_id)
+        catalogo._desindexar_usuario(u)
+        u.nome = nome
+        u.email = email
+        u.telefone = telefone
+        u.tipo = tipo
+        catalogo._indexar_usuario(u)
         
         # Atualizar senha apenas se fornecida
         if 'senha' in dados and dados['senha']:
             u.senha_hash = hash_password(dados['senha'])
         
         # Salvar alterações
-        salvar_usuarios()
+        salvar_usuarios(alterados=[u])
         
         # Retornar versão sem dados sensíveis
         usuario_dict = u.to_dict()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Camada de armazenamento do catálogo.
+
+Define a interface usada por app.py para carregar e salvar produtos, pedidos e usuários,
+com duas implementações:
+    - ArmazenamentoJSON: um arquivo JSON por coleção (comportamento original)
+    - ArmazenamentoSQLite: tabelas indexadas em um banco SQLite, com gravação por registro
+"""
+import os
+import sqlite3
+import logging
+import threading
+import traceback
+from contextlib import contextmanager, ExitStack
+from utils import carregar_json_com_cache, salvar_json_com_cache, limpar_cache, assinatura_arquivo, bloqueio_arquivo, ler_geracao
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+COLECOES = ('produtos', 'pedidos', 'usuarios')
+
+class Armazenamento:
+    """
+    Interface base de armazenamento.
+
+    Cada coleção ('produtos', 'pedidos', 'usuarios') é lida e gravada como uma lista de
+    dicionários no mesmo formato de to_dict()/from_dict() das classes de main.py.
+
+    Attributes:
+        suporta_por_registro (bool): True se o backend grava registros individuais
+            sem reescrever a coleção inteira
+    """
+    suporta_por_registro = False
+
+    def existe(self, colecao):
+        """Retorna True se a coleção já foi gravada alguma vez"""
+        raise NotImplementedError
+
+    def carregar(self, colecao):
+        """
+        Carrega todos os registros de uma coleção.
+
+        Returns:
+            list: Lista de dicionários, ou None se a coleção não existir ou estiver ilegível
+        """
+        raise NotImplementedError
+
+    def salvar(self, colecao, registros):
+        """
+        Substitui todos os registros de uma coleção.
+
+        Returns:
+            bool: True se a gravação foi bem-sucedida
+        """
+        raise NotImplementedError
+
+    def salvar_registros(self, colecao, registros):
+        """Insere ou atualiza apenas os registros informados (backends com suporta_por_registro)"""
+        raise NotImplementedError
+
+    def remover_registros(self, colecao, ids):
+        """Remove apenas os registros informados (backends com suporta_por_registro)"""
+        raise NotImplementedError
+
+    def assinatura(self, colecao):
+        """Valor que muda sempre que a coleção é alterada, usado para detectar alterações externas"""
+        raise NotImplementedError
+
+    def descartar_cache(self, colecao):
+        """Descarta caches internos da coleção para forçar a próxima leitura do disco"""
+        pass
+
+    def _arquivo_bloqueio(self, colecao):
+        """Arquivo usado para bloquear a coleção entre processos"""
+        raise NotImplementedError
+
+    @contextmanager
+    def bloquear(self, colecoes):
+        """
+        Bloqueia as coleções para escrita, entre processos e threads.
+        Os bloqueios são sempre obtidos na mesma ordem para evitar deadlocks.
+        """
+        with ExitStack() as pilha:
+            for arquivo in sorted({self._arquivo_bloqueio(c) for c in colecoes}):
+                pilha.enter_context(bloqueio_arquivo(arquivo))
+            yield
+
+class ArmazenamentoJSON(Armazenamento):
+    """
+    Armazena cada coleção em um arquivo JSON no formato {"<colecao>": [...]}.
+
+    Attributes:
+        arquivos (dict): Mapeamento de coleção para caminho do arquivo
+    """
+
+    def __init__(self, arquivos):
+        self.arquivos = dict(arquivos)
+
+    def existe(self, colecao):
+        return os.path.exists(self.arquivos[colecao])
+
+    def carregar(self, colecao):
+        dados = carregar_json_com_cache(self.arquivos[colecao])
+        if dados and colecao in dados:
+            return dados[colecao]
+        return None
+
+    def salvar(self, colecao, registros):
+        return salvar_json_com_cache(self.arquivos[colecao], {colecao: registros})
+
+    def assinatura(self, colecao):
+        # A geração detecta gravações de outros processos; o stat detecta edições externas
+        arquivo = self.arquivos[colecao]
+        return (ler_geracao(arquivo), assinatura_arquivo(arquivo))
+
+    def descartar_cache(self, colecao):
+        limpar_cache(self.arquivos[colecao])
+
+    def _arquivo_bloqueio(self, colecao):
+        return self.arquivos[colecao]
+
+class ArmazenamentoSQLite(Armazenamento):
+    """
+    Armazena as coleções em tabelas SQLite indexadas.
+
+    Os itens de cada pedido ficam na tabela filha pedido_itens. A tabela versoes guarda
+    um contador por coleção, incrementado a cada gravação, usado como assinatura.
+
+    Attributes:
+        arquivo (str): Caminho do banco SQLite
+        importar_de (Armazenamento): Backend de onde importar coleções que ainda não
+            existem no banco (ex.: os arquivos JSON na primeira execução)
+    """
+    suporta_por_registro = True
+
+    _COLUNAS = {
+        'produtos': ('id', 'nome', 'descricao', 'preco', 'quantidade_estoque', 'imagem_url', 'data_atualizacao'),
+        'pedidos': ('id', 'cliente_nome', 'cliente_telefone', 'cliente_endereco', 'data_pedido', 'status'),
+        'usuarios': ('id', 'nome', 'email', 'telefone', 'senha_hash', 'reset_token', 'tipo', 'data_criacao'),
+    }
+    _COLUNAS_ITENS = ('id', 'quantidade', 'nome', 'preco', 'descricao', 'imagem_url')
+
+    _ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS versoes (
+            colecao TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS produtos (
+            id TEXT PRIMARY KEY,
+            nome TEXT NOT NULL,
+            descricao TEXT,
+            preco REAL NOT NULL,
+            quantidade_estoque INTEGER NOT NULL DEFAULT 0,
+            imagem_url TEXT,
+            data_atualizacao TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos(nome);
+        CREATE TABLE IF NOT EXISTS pedidos (
+            id TEXT PRIMARY KEY,
+            cliente_nome TEXT NOT NULL,
+            cliente_telefone TEXT,
+            cliente_endereco TEXT,
+            data_pedido TEXT,
+            status TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_pedidos_status ON pedidos(status);
+        CREATE INDEX IF NOT EXISTS idx_pedidos_cliente ON pedidos(cliente_nome);
+        CREATE TABLE IF NOT EXISTS pedido_itens (
+            pedido_id TEXT NOT NULL REFERENCES pedidos(id) ON DELETE CASCADE,
+            posicao INTEGER NOT NULL,
+            produto_id TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            nome TEXT,
+            preco REAL,
+            descricao TEXT,
+            imagem_url TEXT,
+            PRIMARY KEY (pedido_id, posicao)
+        );
+        CREATE INDEX IF NOT EXISTS idx_pedido_itens_produto ON pedido_itens(produto_id);
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id TEXT PRIMARY KEY,
+            nome TEXT NOT NULL,
+            email TEXT NOT NULL,
+            telefone TEXT NOT NULL,
+            senha_hash TEXT NOT NULL,
+            reset_token TEXT,
+            tipo TEXT NOT NULL,
+            data_criacao TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_usuarios_email ON usuarios(email);
+        CREATE INDEX IF NOT EXISTS idx_usuarios_telefone ON usuarios(telefone);
+        CREATE INDEX IF NOT EXISTS idx_usuarios_reset_token ON usuarios(reset_token);
+    """
+
+    def __init__(self, arquivo, importar_de=None):
+        self.arquivo = arquivo
+        self._local = threading.local()
+        conexao = self._conexao()
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.executescript(self._ESQUEMA)
+        conexao.commit()
+        if importar_de is not None:
+            self._importar(importar_de)
+
+    def _conexao(self):
+        """Retorna a conexão SQLite da thread atual, criando-a se necessário"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.arquivo, timeout=30)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA foreign_keys=ON")
+            self._local.conexao = conexao
+        return conexao
+
+    def _importar(self, origem):
+        """Importa para o banco as coleções que ainda não existem nele"""
+        for colecao in COLECOES:
+            if self.existe(colecao):
+                continue
+            registros = origem.carregar(colecao)
+            if registros is not None:
+                self.salvar(colecao, registros)
+                logger.info(f"Importados {len(registros)} registros de {colecao} para o SQLite")
+
+    def _incrementar_versao(self, conexao, colecao):
+        conexao.execute(
+            "INSERT INTO versoes (colecao, versao) VALUES (?, 1) "
+            "ON CONFLICT(colecao) DO UPDATE SET versao = versao + 1",
+            (colecao,)
+        )
+
+    def _gravar(self, conexao, colecao, registros):
+        """Insere ou atualiza registros preservando a ordem de inserção original"""
+        colunas = self._COLUNAS[colecao]
+        atribuicoes = ', '.join(f"{c} = excluded.{c}" for c in colunas[1:])
+        sql = (f"INSERT INTO {colecao} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+               f"ON CONFLICT(id) DO UPDATE SET {atribuicoes}")
+        conexao.executemany(sql, [tuple(r.get(c) for c in colunas) for r in registros])
+
+        if colecao == 'pedidos':
+            ids = [(r['id'],) for r in registros]
+            conexao.executemany("DELETE FROM pedido_itens WHERE pedido_id = ?", ids)
+            itens = [
+                (r['id'], posicao) + tuple(item.get(c) for c in self._COLUNAS_ITENS)
+                for r in registros
+                for posicao, item in enumerate(r.get('produtos', []))
+            ]
+            conexao.executemany(
+                "INSERT INTO pedido_itens (pedido_id, posicao, produto_id, quantidade, nome, preco, descricao, imagem_url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                itens
+            )
+
+    def existe(self, colecao):
+        linha = self._conexao().execute("SELECT 1 FROM versoes WHERE colecao = ?", (colecao,)).fetchone()
+        return linha is not None
+
+    def carregar(self, colecao):
+        try:
+            if not self.existe(colecao):
+                return None
+            conexao = self._conexao()
+            registros = [dict(linha) for linha in conexao.execute(f"SELECT * FROM {colecao} ORDER BY rowid")]
+            if colecao == 'pedidos':
+                itens_por_pedido = {}
+                for linha in conexao.execute("SELECT * FROM pedido_itens ORDER BY pedido_id, posicao"):
+                    item = {'id': linha['produto_id']}
+                    item.update((c, linha[c]) for c in self._COLUNAS_ITENS[1:])
+                    itens_por_pedido.setdefault(linha['pedido_id'], []).append(item)
+                for registro in registros:
+                    registro['produtos'] = itens_por_pedido.get(registro['id'], [])
+            return registros
+        except Exception as e:
+            logger.error(f"Erro ao carregar {colecao} do SQLite: {str(e)}")
+            logger.error(traceback.format_exc())
+            return None
+
+    def salvar(self, colecao, registros):
+        conexao = self._conexao()
+        try:
+            with conexao:
+                conexao.execute(f"DELETE FROM {colecao}")
+                self._gravar(conexao, colecao, registros)
+                self._incrementar_versao(conexao, colecao)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar {colecao} no SQLite: {str(e)}")
+            logger.error(traceback.format_exc())
+            return False
+
+    def salvar_registros(self, colecao, registros):
+        conexao = self._conexao()
+        try:
+            with conexao:
+                self._gravar(conexao, colecao, registros)
+                self._incrementar_versao(conexao, colecao)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar registros de {colecao} no SQLite: {str(e)}")
+            logger.error(traceback.format_exc())
+            return False
+
+    def remover_registros(self, colecao, ids):
+        conexao = self._conexao()
+        try:
+            with conexao:
+                conexao.executemany(f"DELETE FROM {colecao} WHERE id = ?", [(i,) for i in ids])
+                self._incrementar_versao(conexao, colecao)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao remover registros de {colecao} no SQLite: {str(e)}")
+            logger.error(traceback.format_exc())
+            return False
+
+    def assinatura(self, colecao):
+        linha = self._conexao().execute("SELECT versao FROM versoes WHERE colecao = ?", (colecao,)).fetchone()
+        return linha['versao'] if linha else None
+
+    def _arquivo_bloqueio(self, colecao):
+        # Um único bloqueio para o banco inteiro
+        return self.arquivo
+
+def criar_armazenamento(tipo, arquivos, arquivo_sqlite='catalogo.db'):
+    """
+    Cria o backend de armazenamento configurado.
+
+    Args:
+        tipo (str): 'json' ou 'sqlite'
+        arquivos (dict): Arquivos JSON de cada coleção
+        arquivo_sqlite (str, optional): Caminho do banco SQLite
+
+    Returns:
+        Armazenamento: Backend de armazenamento
+
+    Raises:
+        ValueError: Se o tipo não for suportado
+    """
+    json_backend = ArmazenamentoJSON(arquivos)
+    if tipo == 'json':
+        return json_backend
+    if tipo == 'sqlite':
+        # Na primeira execução, importa os dados existentes dos arquivos JSON
+        return ArmazenamentoSQLite(arquivo_sqlite, importar_de=json_backend)
+    raise ValueError(f"Tipo de armazenamento não suportado: {tipo}")
+
+class GravadorAgrupado:
+    """
+    Agrupa gravações de coleções (group commit).
+
+    As alterações são marcadas como pendentes e gravadas por uma thread em segundo plano,
+    no máximo uma vez a cada `intervalo` segundos ou assim que uma coleção acumular
+    `max_pendentes` alterações. Alterações no mesmo registro são coalescidas.
+
+    Attributes:
+        gravar (callable): Função gravar(colecao, alterados, removidos) que persiste a coleção.
+            alterados/removidos são None quando a coleção inteira deve ser regravada.
+        intervalo (float): Intervalo máximo, em segundos, entre a alteração e a gravação
+        max_pendentes (int): Quantidade de alterações que dispara a gravação imediata
+    """
+
+    def __init__(self, gravar, intervalo, max_pendentes=100):
+        self.gravar = gravar
+        self.intervalo = intervalo
+        self.max_pendentes = max_pendentes
+        self._pendentes = {}
+        self._condicao = threading.Condition()
+        self._thread = None
+        self._parar = False
+        # Marcado quando uma coleção atinge max_pendentes; fica registrado mesmo que a
+        # thread ainda não esteja esperando, para o aviso não se perder
+        self._urgente = False
+
+    def pendente(self, colecao):
+        """Retorna True se a coleção tem alterações ainda não gravadas"""
+        return colecao in self._pendentes
+
+    def marcar(self, colecao, alterados=None, removidos=None):
+        """
+        Marca alterações de uma coleção para gravação posterior.
+
+        Args:
+            colecao (str): Nome da coleção
+            alterados (list, optional): Objetos (com atributo id) criados ou alterados
+            removidos (list, optional): IDs removidos
+        """
+        with self._condicao:
+            pendente = self._pendentes.setdefault(colecao, {'completo': False, 'alterados': {}, 'removidos': set(), 'contagem': 0})
+            if alterados is None and removidos is None:
+                pendente['completo'] = True
+            for objeto in alterados or []:
+                pendente['alterados'][objeto.id] = objeto
+                pendente['removidos'].discard(objeto.id)
+            for objeto_id in removidos or []:
+                pendente['alterados'].pop(objeto_id, None)
+                pendente['removidos'].add(objeto_id)
+            pendente['contagem'] += 1
+            self._iniciar()
+            if pendente['contagem'] >= self.max_pendentes:
+                self._urgente = True
+                self._condicao.notify()
+
+    def descarregar(self, colecoes=None):
+        """Grava imediatamente as alterações pendentes das coleções informadas (ou de todas)"""
+        with self._condicao:
+            nomes = list(self._pendentes) if colecoes is None else [c for c in colecoes if c in self._pendentes]
+            lote = {nome: self._pendentes.pop(nome) for nome in nomes}
+        for colecao, pendente in lote.items():
+            try:
+                if pendente['completo']:
+                    ok = self.gravar(colecao, None, None)
+                else:
+                    ok = self.gravar(colecao, list(pendente['alterados'].values()), list(pendente['removidos']))
+                if ok:
+                    logger.info(f"Gravação agrupada de {colecao}: {pendente['contagem']} alterações")
+                    continue
+            except Exception as e:
+                logger.error(f"Erro na gravação agrupada de {colecao}: {str(e)}")
+                logger.error(traceback.format_exc())
+            # Falhou: devolve as alterações para a próxima tentativa
+            with self._condicao:
+                atual = self._pendentes.get(colecao)
+                if atual is None:
+                    self._pendentes[colecao] = pendente
+                else:
+                    atual['completo'] = True
+
+    def parar(self):
+        """Grava tudo o que estiver pendente e encerra a thread (usado no desligamento)"""
+        with self._condicao:
+            self._parar = True
+            self._condicao.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.intervalo, 1) * 2)
+        self.descarregar()
+
+    def _iniciar(self):
+        if self._thread is None and not self._parar:
+            self._thread = threading.Thread(target=self._executar, name='gravador-agrupado', daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._parar or self._urgente, self.intervalo)
+                if self._parar:
+                    return
+                self._urgente = False
+            self.descarregar()
@@ -10,7 +10,13 @@ import hashlib
 import secrets
 import re
 import time
-from utils import hash_password, verify_password, generate_token, formatar_data, validar_email, validar_telefone
+import threading
+import bisect
+import heapq
+import base64
+import json
+from utils import hash_password, verify_password, generate_token, formatar_data, validar_email, validar_telefone, parse_data_br, normalizar_texto
+from utils import executar_bcrypt, hash_ficticio, needs_rehash, CacheCredenciais, FilaSenhasCheia, LOGIN_CACHE_SEGUNDOS
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -48,7 +54,7 @@ class Produto:
             # Incrementar o contador e usar como ID
             Produto._ultimo_id += 1
             self.id = str(Produto._ultimo_id)
-            logger.info(f"Novo produto criado com ID sequencial: {self.id}")
+            logger.debug("Novo produto criado com ID sequencial: %s", self.id)
         else:
             self.id = id
             # Atualizar o _ultimo_id se necessário para manter a sequência
@@ -56,10 +62,10 @@ class Produto:
                 id_numerico = int(id)
                 if id_numerico > Produto._ultimo_id:
                     Produto._ultimo_id = id_numerico
-                    logger.info(f"_ultimo_id atualizado para: {Produto._ultimo_id}")
+                    logger.debug("_ultimo_id atualizado para: %s", Produto._ultimo_id, extra={'amostrar': True})
             except ValueError:
                 # Se não for um ID numérico, não afeta o _ultimo_id
-                logger.warning(f"ID não numérico fornecido: {id}")
+                logger.debug("ID não numérico fornecido: %s", id, extra={'amostrar': True})
                 pass
                 
         self.nome = nome
@@ -90,7 +96,7 @@ class Produto:
             
             self.quantidade_estoque = nova_quantidade
             self.data_atualizacao = formatar_data()
-            logger.info(f"Estoque do produto {self.id} - {self.nome} atualizado para {self.quantidade_estoque}")
+            logger.info("Estoque do produto %s - %s atualizado para %s", self.id, self.nome, self.quantidade_estoque)
             return True
         except Exception as e:
             logger.error(f"Erro ao atualizar estoque do produto {self.id} - {self.nome}: {str(e)}")
@@ -146,7 +152,7 @@ class Produto:
                 data_atualizacao=dados.get('data_atualizacao')
             )
                 
-            logger.info(f"Produto carregado de dicionário: {produto.id} - {produto.nome}")
+            logger.debug("Produto carregado de dicionário: %s - %s", produto.id, produto.nome, extra={'amostrar': True})
             return produto
         except Exception as e:
             logger.error(f"Erro ao criar produto a partir de dicionário: {str(e)}")
@@ -184,7 +190,7 @@ class Pedido:
             # Incrementar o contador e usar como ID
             Pedido._ultimo_id += 1
             self.id = str(Pedido._ultimo_id)
-            logger.info(f"Novo pedido criado com ID sequencial: {self.id}")
+            logger.debug("Novo pedido criado com ID sequencial: %s", self.id)
         else:
             self.id = id
             # Atualizar o _ultimo_id se necessário para manter a sequência
@@ -192,10 +198,10 @@ class Pedido:
                 id_numerico = int(id)
                 if id_numerico > Pedido._ultimo_id:
                     Pedido._ultimo_id = id_numerico
-                    logger.info(f"_ultimo_id atualizado para: {Pedido._ultimo_id}")
+                    logger.debug("_ultimo_id atualizado para: %s", Pedido._ultimo_id, extra={'amostrar': True})
             except ValueError:
                 # Se não for um ID numérico, não afeta o _ultimo_id
-                logger.warning(f"ID não numérico fornecido: {id}")
+                logger.debug("ID não numérico fornecido: %s", id, extra={'amostrar': True})
                 pass
                 
         self.produtos = produtos
@@ -222,6 +228,25 @@ class Pedido:
             'status': self.status
         }
     
+    def valor_total(self):
+        """
+        Calcula o valor total do pedido a partir dos preços registrados nos itens.
+        
+        Returns:
+            float: Soma de preço x quantidade dos itens
+        """
+        return round(sum((item.get('preco') or 0) * (item.get('quantidade') or 0) for item in self.produtos), 2)
+    
+    def chave_data(self):
+        """
+        Retorna a data do pedido em formato ordenável (AAAAMMDDHHMMSS).
+        
+        Returns:
+            str: Data ordenável, ou string vazia se a data for inválida
+        """
+        data = parse_data_br(self.data_pedido) if self.data_pedido else None
+        return data.strftime("%Y%m%d%H%M%S") if data else ''
+    
     @classmethod
     def from_dict(cls, dados):
         """
@@ -258,7 +283,7 @@ class Pedido:
             if 'status' in dados:
                 pedido.status = dados['status']
                 
-            logger.info(f"Pedido carregado de dicionário: {pedido.id} - Cliente: {pedido.cliente_nome}")
+            logger.debug("Pedido carregado de dicionário: %s - Cliente: %s", pedido.id, pedido.cliente_nome, extra={'amostrar': True})
             return pedido
         except Exception as e:
             logger.error(f"Erro ao criar pedido a partir de dicionário: {str(e)}")
@@ -307,7 +332,7 @@ class Usuario:
             # Incrementar o contador e usar como ID
             Usuario._ultimo_id += 1
             self.id = str(Usuario._ultimo_id)
-            logger.info(f"Novo usuário criado com ID sequencial: {self.id}")
+            logger.debug("Novo usuário criado com ID sequencial: %s", self.id)
         else:
             self.id = id
             # Atualizar o _ultimo_id se necessário para manter a sequência
@@ -315,10 +340,10 @@ class Usuario:
                 id_numerico = int(id)
                 if id_numerico > Usuario._ultimo_id:
                     Usuario._ultimo_id = id_numerico
-                    logger.info(f"_ultimo_id atualizado para: {Usuario._ultimo_id}")
+                    logger.debug("_ultimo_id atualizado para: %s", Usuario._ultimo_id, extra={'amostrar': True})
             except ValueError:
                 # Se não for um ID numérico, não afeta o _ultimo_id
-                logger.warning(f"ID não numérico fornecido: {id}")
+                logger.debug("ID não numérico fornecido: %s", id, extra={'amostrar': True})
                 pass
         
         self.nome = nome
@@ -346,8 +371,11 @@ class Usuario:
             
         Returns:
             bool: True se a senha estiver correta, False caso contrário
+            
+        Raises:
+            FilaSenhasCheia: Se o pool de verificação de senhas estiver sobrecarregado
         """
-        return verify_password(senha, self.senha_hash)
+        return executar_bcrypt(verify_password, senha, self.senha_hash)
         
     def gerar_token_redefinicao(self):
         """
@@ -433,7 +461,7 @@ class Usuario:
             if 'reset_token' in dados:
                 usuario.reset_token = dados['reset_token']
                 
-            logger.info(f"Usuário carregado de dicionário: {usuario.id} - {usuario.nome}")
+            logger.debug("Usuário carregado de dicionário: %s - %s", usuario.id, usuario.nome, extra={'amostrar': True})
             return usuario
         except Exception as e:
             logger.error(f"Erro ao criar usuário a partir de dicionário: {str(e)}")
@@ -458,41 +486,332 @@ class Catalogo:
         self.produtos = []
         self.pedidos = []
         self.usuarios = []
+        
+        # Trava do catálogo para operações de estoque (seções críticas curtas)
+        self._trava = threading.RLock()
+        
+        # Índices em memória para busca O(1)
+        self._produtos_por_id = {}
+        self._pedidos_por_id = {}
+        self._usuarios_por_id = {}
+        self._usuarios_por_email = {}
+        self._usuarios_por_telefone = {}
+        self._usuarios_por_token = {}
+        
+        # Senhas verificadas recentemente (HMAC), para logins repetidos não pagarem o bcrypt
+        self._credenciais_verificadas = CacheCredenciais(ttl=LOGIN_CACHE_SEGUNDOS)
+        
+        # Índices ordenados de pedidos para consulta paginada: listas de (chave, id numérico, id)
+        self._pedidos_ordenados = {campo: [] for campo in self.CAMPOS_ORDENACAO_PEDIDOS}
+        # Os mesmos índices separados por status: status -> campo -> entradas
+        self._pedidos_por_status = {}
+        
+        # Índice invertido da busca de produtos: termo -> IDs, termos de cada produto
+        # e vocabulário ordenado para busca por prefixo
+        self._indice_busca = {}
+        self._termos_por_produto = {}
+        self._vocabulario_busca = []
+        
+        # Índices ordenados de produtos para listagem paginada e as entradas de cada produto,
+        # guardadas para remover a entrada antiga mesmo depois de o produto ter sido alterado
+        self._produtos_ordenados = {campo: [] for campo in self.CAMPOS_ORDENACAO_PRODUTOS}
+        self._entradas_produto = {}
+    
+    # Ordenações aceitas na consulta de pedidos: nome -> (campo do índice, decrescente)
+    ORDENACOES_PEDIDOS = {
+        'data-recente': ('data', True),
+        'data-antiga': ('data', False),
+        'valor-alto': ('valor', True),
+        'valor-baixo': ('valor', False),
+    }
+    CAMPOS_ORDENACAO_PEDIDOS = ('data', 'valor')
+    
+    @staticmethod
+    def _entrada_pedido(pedido, campo):
+        """Monta a entrada de um pedido no índice ordenado do campo informado."""
+        chave = pedido.chave_data() if campo == 'data' else pedido.valor_total()
+        id_numerico = int(pedido.id) if pedido.id.isdigit() else -1
+        return (chave, id_numerico, pedido.id)
+    
+    # Campos aceitos na ordenação e na projeção da listagem de produtos
+    CAMPOS_ORDENACAO_PRODUTOS = ('id', 'nome', 'preco', 'estoque', 'data_atualizacao')
+    CAMPOS_PRODUTO = ('id', 'nome', 'descricao', 'preco', 'quantidade_estoque', 'imagem_url', 'data_atualizacao')
     
-    def _atualizar_indices(self):
+    @staticmethod
+    def _entrada_produto(produto, campo):
+        """Monta a entrada de um produto no índice ordenado do campo informado."""
+        if campo == 'nome':
+            chave = normalizar_texto(produto.nome)
+        elif campo == 'preco':
+            chave = produto.preco
+        elif campo == 'estoque':
+            chave = produto.quantidade_estoque
+        elif campo == 'data_atualizacao':
+            data = parse_data_br(produto.data_atualizacao) if produto.data_atualizacao else None
+            chave = data.strftime("%Y%m%d%H%M%S") if data else ''
+        else:
+            chave = int(produto.id) if produto.id.isdigit() else -1
+        id_numerico = int(produto.id) if produto.id.isdigit() else -1
+        return (chave, id_numerico, produto.id)
+    
+    @staticmethod
+    def _tokenizar(texto):
+        """Divide um texto em termos normalizados (minúsculos e sem acentos)."""
+        return re.findall(r'\w+', normalizar_texto(texto))
+    
+    def _indexar_produto(self, produto):
+        """Adiciona um produto aos índices do catálogo."""
+        with self._trava:
+            self._produtos_por_id[produto.id] = produto
+            self._indexar_busca_produto(produto)
+            self._indexar_ordenacao_produto(produto)
+    
+    def _desindexar_produto(self, produto):
+        """Remove um produto dos índices do catálogo."""
+        with self._trava:
+            if self._produtos_por_id.get(produto.id) is produto:
+                del self._produtos_por_id[produto.id]
+                self._desindexar_busca_produto(produto.id)
+                self._desindexar_ordenacao_produto(produto.id)
+    
+    def _reindexar_produto(self, produto):
         """
-        Atualiza os índices internos do catálogo.
-        Esta função é chamada automaticamente após carregar produtos, pedidos e usuários.
+        Atualiza os índices de um produto já indexado.
+        Deve ser chamada depois de alterar nome, descrição, preço, estoque ou data de atualização.
         """
-        # Atualizar índice de ID de produtos
-        if self.produtos:
-            try:
-                ids_numericos = [int(p.id) for p in self.produtos if p.id.isdigit()]
-                if ids_numericos:
-                    Produto._ultimo_id = max(ids_numericos)
-                    logger.info(f"Índice de produtos atualizado para: {Produto._ultimo_id}")
-            except Exception as e:
-                logger.error(f"Erro ao atualizar índice de produtos: {e}")
-        
-        # Atualizar índice de ID de pedidos
-        if self.pedidos:
-            try:
-                ids_numericos = [int(p.id) for p in self.pedidos if p.id.isdigit()]
-                if ids_numericos:
-                    Pedido._ultimo_id = max(ids_numericos)
-                    logger.info(f"Índice de pedidos atualizado para: {Pedido._ultimo_id}")
-            except Exception as e:
-                logger.error(f"Erro ao atualizar índice de pedidos: {e}")
-        
-        # Atualizar índice de ID de usuários
-        if self.usuarios:
-            try:
-                ids_numericos = [int(u.id) for u in self.usuarios if u.id.isdigit()]
-                if ids_numericos:
-                    Usuario._ultimo_id = max(ids_numericos)
-                    logger.info(f"Índice de usuários atualizado para: {Usuario._ultimo_id}")
-            except Exception as e:
-                logger.error(f"Erro ao atualizar índice de usuários: {e}")
+        with self._trava:
+            if self._produtos_por_id.get(produto.id) is produto:
+                self._desindexar_busca_produto(produto.id)
+                self._indexar_busca_produto(produto)
+                self._desindexar_ordenacao_produto(produto.id)
+                self._indexar_ordenacao_produto(produto)
+    
+    def _indexar_ordenacao_produto(self, produto):
+        """Insere o produto nos índices ordenados de cada campo."""
+        entradas = {}
+        for campo, indice in self._produtos_ordenados.items():
+            entradas[campo] = self._entrada_produto(produto, campo)
+            bisect.insort(indice, entradas[campo])
+        self._entradas_produto[produto.id] = entradas
+    
+    def _desindexar_ordenacao_produto(self, produto_id):
+        """Remove dos índices ordenados as entradas registradas para o produto."""
+        for campo, entrada in self._entradas_produto.pop(produto_id, {}).items():
+            indice = self._produtos_ordenados[campo]
+            posicao = bisect.bisect_left(indice, entrada)
+            if posicao < len(indice) and indice[posicao] == entrada:
+                del indice[posicao]
+    
+    def _indexar_busca_produto(self, produto):
+        """Adiciona os termos de nome e descrição do produto ao índice invertido."""
+        termos = set(self._tokenizar(produto.nome)) | set(self._tokenizar(produto.descricao))
+        self._termos_por_produto[produto.id] = termos
+        for termo in termos:
+            ids = self._indice_busca.get(termo)
+            if ids is None:
+                ids = self._indice_busca[termo] = set()
+                bisect.insort(self._vocabulario_busca, termo)
+            ids.add(produto.id)
+    
+    def _desindexar_busca_produto(self, produto_id):
+        """Remove do índice invertido os termos registrados para o produto."""
+        for termo in self._termos_por_produto.pop(produto_id, ()):
+            ids = self._indice_busca.get(termo)
+            if ids is None:
+                continue
+            ids.discard(produto_id)
+            if not ids:
+                del self._indice_busca[termo]
+                posicao = bisect.bisect_left(self._vocabulario_busca, termo)
+                if posicao < len(self._vocabulario_busca) and self._vocabulario_busca[posicao] == termo:
+                    del self._vocabulario_busca[posicao]
+    
+    def _indexar_pedido(self, pedido):
+        """Adiciona um pedido aos índices do catálogo."""
+        with self._trava:
+            self._pedidos_por_id[pedido.id] = pedido
+            for campo, indice in self._pedidos_ordenados.items():
+                bisect.insort(indice, self._entrada_pedido(pedido, campo))
+            self._indexar_status_pedido(pedido)
+    
+    def _desindexar_pedido(self, pedido):
+        """Remove um pedido dos índices do catálogo."""
+        with self._trava:
+            if self._pedidos_por_id.get(pedido.id) is pedido:
+                del self._pedidos_por_id[pedido.id]
+                for campo, indice in self._pedidos_ordenados.items():
+                    self._remover_entrada(indice, self._entrada_pedido(pedido, campo))
+                self._desindexar_status_pedido(pedido)
+    
+    @staticmethod
+    def _remover_entrada(indice, entrada):
+        """Remove uma entrada de um índice ordenado, se presente."""
+        posicao = bisect.bisect_left(indice, entrada)
+        if posicao < len(indice) and indice[posicao] == entrada:
+            del indice[posicao]
+    
+    def _indexar_status_pedido(self, pedido):
+        """Adiciona um pedido aos índices ordenados do seu status."""
+        indices = self._pedidos_por_status.setdefault(
+            pedido.status, {campo: [] for campo in self.CAMPOS_ORDENACAO_PEDIDOS}
+        )
+        for campo, indice in indices.items():
+            bisect.insort(indice, self._entrada_pedido(pedido, campo))
+    
+    def _desindexar_status_pedido(self, pedido):
+        """Remove um pedido dos índices ordenados do seu status."""
+        for campo, indice in self._pedidos_por_status.get(pedido.status, {}).items():
+            self._remover_entrada(indice, self._entrada_pedido(pedido, campo))
+    
+    def _alterar_status_pedido(self, pedido, status):
+        """
+        Altera o status de um pedido mantendo o índice por status atualizado.
+        Toda troca de status de um pedido já indexado deve passar por aqui.
+        """
+        with self._trava:
+            indexado = self._pedidos_por_id.get(pedido.id) is pedido
+            if indexado:
+                self._desindexar_status_pedido(pedido)
+            pedido.status = status
+            if indexado:
+                self._indexar_status_pedido(pedido)
+    
+    def _indexar_usuario(self, usuario):
+        """Adiciona um usuário aos índices de ID, email, telefone e token."""
+        self._usuarios_por_id[usuario.id] = usuario
+        self._usuarios_por_email[usuario.email] = usuario
+        self._usuarios_por_telefone[usuario.telefone] = usuario
+        if usuario.reset_token:
+            self._usuarios_por_token[usuario.reset_token] = usuario
+    
+    def _desindexar_usuario(self, usuario):
+        """
+        Remove um usuário dos índices.
+        Deve ser chamada antes de alterar email, telefone ou token do usuário.
+        """
+        for indice, chave in ((self._usuarios_por_id, usuario.id),
+                              (self._usuarios_por_email, usuario.email),
+                              (self._usuarios_por_telefone, usuario.telefone),
+                              (self._usuarios_por_token, usuario.reset_token)):
+            if chave is not None and indice.get(chave) is usuario:
+                del indice[chave]
+    
+    def _obter_produto_obj(self, produto_id):
+        """Obtém o objeto Produto pelo ID usando o índice."""
+        return self._produtos_por_id.get(produto_id)
+    
+    def _obter_pedido_obj(self, pedido_id):
+        """Obtém o objeto Pedido pelo ID usando o índice."""
+        return self._pedidos_por_id.get(pedido_id)
+    
+    def _obter_usuario_obj(self, usuario_id):
+        """Obtém o objeto Usuario pelo ID usando o índice."""
+        return self._usuarios_por_id.get(usuario_id)
+    
+    @staticmethod
+    def _atualizar_ultimo_id(classe, registros, colecao):
+        """Ajusta o contador de IDs da classe ao maior ID numérico dos registros carregados."""
+        if not registros:
+            return
+        try:
+            ids_numericos = [int(r.id) for r in registros if r.id.isdigit()]
+            if ids_numericos:
+                classe._ultimo_id = max(ids_numericos)
+                logger.debug("Índice de %s atualizado para: %s", colecao, classe._ultimo_id)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar índice de {colecao}: {e}")
+    
+    def _indexar_produtos(self):
+        """Reconstrói do zero os índices de produtos (ID, busca e ordenação)."""
+        with self._trava:
+            self._produtos_por_id = {}
+            self._indice_busca = {}
+            self._termos_por_produto = {}
+            self._vocabulario_busca = []
+            for produto in self.produtos:
+                self._produtos_por_id[produto.id] = produto
+                self._indexar_busca_produto(produto)
+            # Ordenar uma única vez em vez de inserir produto a produto
+            self._entradas_produto = {
+                produto.id: {campo: self._entrada_produto(produto, campo) for campo in self.CAMPOS_ORDENACAO_PRODUTOS}
+                for produto in self._produtos_por_id.values()
+            }
+            self._produtos_ordenados = {
+                campo: sorted(entradas[campo] for entradas in self._entradas_produto.values())
+                for campo in self.CAMPOS_ORDENACAO_PRODUTOS
+            }
+        self._atualizar_ultimo_id(Produto, self.produtos, 'produtos')
+    
+    def _indexar_pedidos(self):
+        """Reconstrói do zero os índices de pedidos (ID, ordenação e status)."""
+        with self._trava:
+            self._pedidos_por_id = {}
+            for pedido in self.pedidos:
+                self._pedidos_por_id[pedido.id] = pedido
+            # Ordenar uma única vez em vez de inserir pedido a pedido
+            self._pedidos_ordenados = {
+                campo: sorted(self._entrada_pedido(p, campo) for p in self._pedidos_por_id.values())
+                for campo in self.CAMPOS_ORDENACAO_PEDIDOS
+            }
+            self._pedidos_por_status = {}
+            for campo, indice in self._pedidos_ordenados.items():
+                for entrada in indice:
+                    status = self._pedidos_por_id[entrada[2]].status
+                    indices = self._pedidos_por_status.setdefault(
+                        status, {c: [] for c in self.CAMPOS_ORDENACAO_PEDIDOS}
+                    )
+                    # O índice geral já está ordenado, então basta anexar
+                    indices[campo].append(entrada)
+        self._atualizar_ultimo_id(Pedido, self.pedidos, 'pedidos')
+    
+    def _indexar_usuarios(self):
+        """Reconstrói do zero os índices de usuários (ID, email, telefone e token)."""
+        self._usuarios_por_id = {}
+        self._usuarios_por_email = {}
+        self._usuarios_por_telefone = {}
+        self._usuarios_por_token = {}
+        for usuario in self.usuarios:
+            self._indexar_usuario(usuario)
+        self._atualizar_ultimo_id(Usuario, self.usuarios, 'usuarios')
+    
+    @staticmethod
+    def _validar_dados_produto(nome, descricao, preco, quantidade_estoque):
+        """
+        Valida os dados de um produto.
+        
+        Args:
+            nome (str): Nome do produto
+            descricao (str): Descrição do produto
+            preco: Preço (número ou texto numérico)
+            quantidade_estoque: Quantidade em estoque (número ou texto numérico)
+            
+        Returns:
+            tuple: (preço como float, quantidade em estoque como int)
+            
+        Raises:
+            ValueError: Se algum dado for inválido
+        """
+        if not nome or not isinstance(nome, str):
+            raise ValueError("Nome do produto é obrigatório e deve ser uma string")
+            
+        if not descricao or not isinstance(descricao, str):
+            raise ValueError("Descrição do produto é obrigatória e deve ser uma string")
+            
+        try:
+            preco = float(preco)
+        except (ValueError, TypeError):
+            raise ValueError("Preço do produto deve ser um número válido")
+        if preco < 0:
+            raise ValueError("Preço do produto deve ser maior ou igual a zero")
+            
+        try:
+            quantidade_estoque = int(quantidade_estoque)
+        except (ValueError, TypeError):
+            raise ValueError("Quantidade em estoque deve ser um número inteiro válido")
+        if quantidade_estoque < 0:
+            raise ValueError("Quantidade em estoque deve ser maior ou igual a zero")
+        
+        return preco, quantidade_estoque
     
     def adicionar_produto(self, nome, descricao, preco, quantidade_estoque=0, imagem_url=None):
         """
@@ -513,34 +832,11 @@ class Catalogo:
         """
         try:
             # Validações
-            if not nome or not isinstance(nome, str):
-                logger.error("Nome do produto inválido")
-                raise ValueError("Nome do produto é obrigatório e deve ser uma string")
-                
-            if not descricao or not isinstance(descricao, str):
-                logger.error("Descrição do produto inválida")
-                raise ValueError("Descrição do produto é obrigatória e deve ser uma string")
-                
-            try:
-                preco = float(preco)
-                if preco < 0:
-                    logger.error(f"Preço do produto inválido: {preco}")
-                    raise ValueError("Preço do produto deve ser maior ou igual a zero")
-            except (ValueError, TypeError):
-                logger.error(f"Erro ao converter preço do produto: {preco}")
-                raise ValueError("Preço do produto deve ser um número válido")
-                
-            try:
-                quantidade_estoque = int(quantidade_estoque)
-                if quantidade_estoque < 0:
-                    logger.error(f"Quantidade em estoque inválida: {quantidade_estoque}")
-                    raise ValueError("Quantidade em estoque deve ser maior ou igual a zero")
-            except (ValueError, TypeError):
-                logger.error(f"Erro ao converter quantidade em estoque: {quantidade_estoque}")
-                raise ValueError("Quantidade em estoque deve ser um número inteiro válido")
+            preco, quantidade_estoque = self._validar_dados_produto(nome, descricao, preco, quantidade_estoque)
             
             produto = Produto(nome, descricao, preco, quantidade_estoque, imagem_url)
             self.produtos.append(produto)
+            self._indexar_produto(produto)
             logger.info(f"Produto adicionado ao catálogo: {produto.id} - {produto.nome}")
             return produto.to_dict()
         except Exception as e:
@@ -548,6 +844,92 @@ class Catalogo:
             logger.error(traceback.format_exc())
             raise
     
+    @staticmethod
+    def _campo_importacao(registro, nome, padrao):
+        """Valor do campo no registro importado, ou o padrão se estiver ausente ou vazio."""
+        valor = registro.get(nome)
+        return padrao if valor is None or valor == '' else valor
+    
+    def importar_produtos(self, registros, max_erros=50):
+        """
+        Cria ou atualiza produtos em lote, com as mesmas validações de adicionar_produto.
+        A importação é atômica: se alguma linha for inválida, nenhum produto é alterado.
+        
+        Args:
+            registros (iterable): Dicionários com nome, descricao, preco, quantidade_estoque e
+                imagem_url. Um registro com 'id' de um produto existente atualiza esse produto
+                (campos ausentes mantêm o valor atual; se nenhum campo mudar, o produto fica
+                intacto, inclusive a data de atualização); com um 'id' desconhecido, cria o produto
+                com esse ID (o que permite importar uma exportação em outra instância); sem 'id',
+                cria um novo produto com o próximo ID.
+            max_erros (int): Quantidade de erros após a qual a validação é interrompida
+            
+        Returns:
+            tuple: (produtos criados, produtos atualizados, produtos inalterados,
+                lista de erros {'linha', 'erro'}). Se houver erros, as listas de produtos vêm vazias.
+        """
+        validos = []
+        erros = []
+        ids_no_lote = set()
+        for linha, registro in enumerate(registros, start=1):
+            try:
+                if not isinstance(registro, dict):
+                    raise ValueError("Registro deve ser um objeto com os campos do produto")
+                produto_id = str(registro.get('id') or '').strip() or None
+                existente = self._produtos_por_id.get(produto_id) if produto_id else None
+                if produto_id in ids_no_lote:
+                    raise ValueError(f"Produto com ID {produto_id} repetido na importação")
+                
+                campo = self._campo_importacao
+                dados = {
+                    'nome': campo(registro, 'nome', existente.nome if existente else None),
+                    'descricao': campo(registro, 'descricao', existente.descricao if existente else None),
+                    'preco': campo(registro, 'preco', existente.preco if existente else None),
+                    'quantidade_estoque': campo(registro, 'quantidade_estoque', existente.quantidade_estoque if existente else 0),
+                    'imagem_url': campo(registro, 'imagem_url', existente.imagem_url if existente else None),
+                }
+                dados['preco'], dados['quantidade_estoque'] = self._validar_dados_produto(
+                    dados['nome'], dados['descricao'], dados['preco'], dados['quantidade_estoque'])
+                if produto_id:
+                    ids_no_lote.add(produto_id)
+                validos.append((produto_id, existente, dados))
+            except ValueError as e:
+                erros.append({'linha': linha, 'erro': str(e)})
+                if len(erros) >= max_erros:
+                    break
+        
+        if erros:
+            logger.warning("Importação de produtos cancelada: %d linhas inválidas", len(erros))
+            return [], [], [], erros
+        
+        criados = []
+        atualizados = []
+        inalterados = []
+        agora = formatar_data()
+        with self._trava:
+            # Registros com ID primeiro, para que os IDs gerados depois não colidam com eles
+            for produto_id, existente, dados in sorted(validos, key=lambda item: item[0] is None):
+                if existente:
+                    # Reimportar os mesmos dados não toca o produto (nem a data de atualização)
+                    if all(getattr(existente, atributo) == valor for atributo, valor in dados.items()):
+                        inalterados.append(existente)
+                        continue
+                    for atributo, valor in dados.items():
+                        setattr(existente, atributo, valor)
+                    existente.data_atualizacao = agora
+                    atualizados.append(existente)
+                else:
+                    produto = Produto(id=produto_id, data_atualizacao=agora, **dados)
+                    self.produtos.append(produto)
+                    criados.append(produto)
+            # Reconstruir os índices de produtos uma vez em vez de reindexar item a item
+            if criados or atualizados:
+                self._indexar_produtos()
+        
+        logger.info("Importação de produtos: %d criados, %d atualizados, %d inalterados",
+                    len(criados), len(atualizados), len(inalterados))
+        return criados, atualizados, inalterados, []
+    
     def remover_produto(self, produto_id):
         """
         Remove um produto do catálogo pelo ID.
@@ -563,7 +945,7 @@ class Catalogo:
         """
         try:
             # Encontrar o produto pelo ID
-            produto = next((p for p in self.produtos if p.id == produto_id), None)
+            produto = self._obter_produto_obj(produto_id)
             
             if not produto:
                 logger.warning(f"Tentativa de remover produto inexistente: {produto_id}")
@@ -579,6 +961,7 @@ class Catalogo:
             
             # Remover o produto
             self.produtos.remove(produto)
+            self._desindexar_produto(produto)
             logger.info(f"Produto removido do catálogo: {produto_id} - {produto.nome}")
             return True
         except Exception as e:
@@ -603,9 +986,10 @@ class Catalogo:
         Raises:
             ValueError: Se o produto não for encontrado ou se algum valor for inválido
         """
+        produto = None
         try:
             # Encontrar o produto pelo ID
-            produto = next((p for p in self.produtos if p.id == produto_id), None)
+            produto = self._obter_produto_obj(produto_id)
             
             if not produto:
                 logger.warning(f"Tentativa de atualizar produto inexistente: {produto_id}")
@@ -617,7 +1001,7 @@ class Catalogo:
                 
             if 'descricao' in kwargs and kwargs['descricao']:
                 produto.descricao = kwargs['descricao']
-                
+            
             if 'preco' in kwargs:
                 try:
                     preco = float(kwargs['preco'])
@@ -653,6 +1037,10 @@ class Catalogo:
             logger.error(f"Erro ao atualizar produto {produto_id}: {str(e)}")
             logger.error(traceback.format_exc())
             raise
+        finally:
+            # Manter os índices coerentes mesmo se a atualização parar no meio
+            if produto:
+                self._reindexar_produto(produto)
     
     def obter_produto(self, produto_id):
         """
@@ -665,18 +1053,30 @@ class Catalogo:
             Produto: O produto encontrado ou None se não for encontrado
         """
         try:
-            produto = next((p for p in self.produtos if p.id == produto_id), None)
+            produto = self._obter_produto_obj(produto_id)
             if produto:
-                logger.info(f"Produto encontrado: {produto_id} - {produto.nome}")
+                logger.debug("Produto encontrado: %s - %s", produto_id, produto.nome)
                 return produto.to_dict()
             else:
-                logger.warning(f"Produto não encontrado: {produto_id}")
+                logger.warning("Produto não encontrado: %s", produto_id)
                 return None
         except Exception as e:
             logger.error(f"Erro ao obter produto {produto_id}: {str(e)}")
             logger.error(traceback.format_exc())
             return None
     
+    def buscar_produto(self, produto_id):
+        """
+        Obtém o objeto de um produto pelo ID usando o índice (O(1)).
+        
+        Args:
+            produto_id (str): ID do produto
+            
+        Returns:
+            Produto: O produto encontrado ou None se não for encontrado
+        """
+        return self._produtos_por_id.get(str(produto_id))
+    
     def listar_produtos(self):
         """
         Lista todos os produtos do catálogo.
@@ -686,13 +1086,138 @@ class Catalogo:
         """
         try:
             produtos_dict = [p.to_dict() for p in self.produtos]
-            logger.info(f"Listando {len(produtos_dict)} produtos")
+            logger.debug("Listando %d produtos", len(produtos_dict))
             return produtos_dict
         except Exception as e:
             logger.error(f"Erro ao listar produtos: {str(e)}")
             logger.error(traceback.format_exc())
             return []
     
+    def consultar_produtos(self, ordenacao=None, cursor=None, limite=None, campos=None):
+        """
+        Lista produtos em ordem, por páginas, usando os índices ordenados do catálogo.
+        
+        Args:
+            ordenacao (str, optional): Campo de CAMPOS_ORDENACAO_PRODUTOS, com prefixo '-' para ordem
+                decrescente (ex.: '-preco'). Se None, ordena por ID.
+            cursor (str, optional): Cursor retornado pela página anterior
+            limite (int, optional): Quantidade máxima de produtos na página. Se None, retorna todos.
+            campos (list, optional): Campos de cada produto a incluir na resposta (o ID sempre é incluído)
+            
+        Returns:
+            tuple: (lista de dicionários da página, total de produtos, cursor da próxima página ou None)
+            
+        Raises:
+            ValueError: Se a ordenação, o limite, os campos ou o cursor forem inválidos
+        """
+        ordenacao = ordenacao or 'id'
+        decrescente = ordenacao.startswith('-')
+        campo = ordenacao.lstrip('-')
+        if campo not in self.CAMPOS_ORDENACAO_PRODUTOS:
+            raise ValueError(f"Ordenação inválida. Campos válidos são: {', '.join(self.CAMPOS_ORDENACAO_PRODUTOS)}")
+        if limite is not None and limite < 1:
+            raise ValueError("Limite deve ser maior que zero")
+        if campos:
+            invalidos = [c for c in campos if c not in self.CAMPOS_PRODUTO]
+            if invalidos:
+                raise ValueError(f"Campos inválidos: {', '.join(invalidos)}")
+            campos = ['id'] + [c for c in campos if c != 'id']
+        
+        with self._trava:
+            indice = self._produtos_ordenados[campo]
+            total = len(indice)
+            if cursor:
+                ultima = self._decodificar_cursor(cursor, ordenacao)
+                try:
+                    corte = bisect.bisect_left(indice, ultima) if decrescente else bisect.bisect_right(indice, ultima)
+                except TypeError:
+                    raise ValueError("Cursor inválido")
+            else:
+                corte = total if decrescente else 0
+            
+            # Fatia da página sem percorrer nem ordenar o restante do catálogo
+            if decrescente:
+                inicio = 0 if limite is None else max(corte - limite, 0)
+                entradas = indice[inicio:corte][::-1]
+                ha_mais = inicio > 0
+            else:
+                fim = total if limite is None else min(corte + limite, total)
+                entradas = indice[corte:fim]
+                ha_mais = fim < total
+            
+            pagina = []
+            for entrada in entradas:
+                produto = self._produtos_por_id[entrada[2]].to_dict()
+                pagina.append({c: produto[c] for c in campos} if campos else produto)
+            proximo_cursor = self._codificar_cursor(entradas[-1], ordenacao) if ha_mais and entradas else None
+        
+        logger.debug("Listando página com %d de %d produtos", len(pagina), total)
+        return pagina, total, proximo_cursor
+    
+    def buscar_produtos(self, termo, cursor=None, limite=None):
+        """
+        Busca produtos por nome e descrição usando o índice invertido.
+        
+        Cada termo da busca casa com qualquer palavra que comece por ele (sem diferenciar
+        acentos e maiúsculas) e todos os termos precisam casar. Um termo igual ao ID de um
+        produto também retorna esse produto. Os resultados seguem a ordem de ID.
+        
+        Args:
+            termo (str): Texto da busca
+            cursor (str, optional): ID do último produto da página anterior
+            limite (int, optional): Quantidade máxima de produtos na página. Se None, retorna todos.
+            
+        Returns:
+            tuple: (lista de dicionários da página, total de produtos encontrados, cursor da próxima página ou None)
+        """
+        termos = self._tokenizar(termo)
+        if not termos:
+            return [], 0, None
+        
+        with self._trava:
+            encontrados = None
+            for parte in termos:
+                ids = set()
+                posicao = bisect.bisect_left(self._vocabulario_busca, parte)
+                while posicao < len(self._vocabulario_busca) and self._vocabulario_busca[posicao].startswith(parte):
+                    ids |= self._indice_busca[self._vocabulario_busca[posicao]]
+                    posicao += 1
+                encontrados = ids if encontrados is None else encontrados & ids
+                if not encontrados:
+                    break
+            
+            termo_id = termo.strip()
+            if termo_id in self._produtos_por_id:
+                encontrados.add(termo_id)
+            
+            total = len(encontrados)
+            # Mesma chave das entradas do índice ordenado por ID: (número, número, id)
+            chave = lambda produto_id: (int(produto_id) if produto_id.isdigit() else -1,) * 2 + (produto_id,)
+            indice = self._produtos_ordenados['id']
+            if limite is not None and total * 8 >= len(indice):
+                # Busca ampla: percorre o índice já ordenado a partir do cursor até completar a página
+                selecionados = []
+                posicao = bisect.bisect_right(indice, chave(cursor)) if cursor else 0
+                while posicao < len(indice) and len(selecionados) <= limite:
+                    if indice[posicao][2] in encontrados:
+                        selecionados.append(indice[posicao][2])
+                    posicao += 1
+            else:
+                # Poucos resultados: ordenar só os encontrados após o cursor (ou só os da página)
+                candidatos = [i for i in encontrados if chave(i) > chave(cursor)] if cursor else encontrados
+                if limite is None:
+                    selecionados = sorted(candidatos, key=chave)
+                else:
+                    selecionados = heapq.nsmallest(limite + 1, candidatos, key=chave)
+            
+            ha_mais = limite is not None and len(selecionados) > limite
+            ids_pagina = selecionados[:limite] if limite is not None else selecionados
+            pagina = [self._produtos_por_id[i].to_dict() for i in ids_pagina]
+            proximo_cursor = ids_pagina[-1] if ha_mais else None
+        
+        logger.debug("Busca de produtos por '%s': %d encontrados", termo, total)
+        return pagina, total, proximo_cursor
+    
     def criar_pedido(self, produtos, cliente_nome, cliente_telefone, cliente_endereco):
         """
         Cria um novo pedido e atualiza o estoque dos produtos.
@@ -727,40 +1252,42 @@ class Catalogo:
                 logger.error("Endereço do cliente inválido")
                 raise ValueError("Endereço do cliente é obrigatório e deve ser uma string")
             
-            # Verificar e atualizar estoque
+            # Somar as quantidades por produto (o mesmo produto pode aparecer em mais de um item)
+            quantidades = {}
             for item in produtos:
                 if 'id' not in item or 'quantidade' not in item:
                     logger.error("Item do pedido com formato inválido")
                     raise ValueError("Formato de produto inválido. Necessário id e quantidade")
-                    
-                produto = next((p for p in self.produtos if p.id == item['id']), None)
-                if not produto:
-                    logger.error(f"Produto com ID {item['id']} não encontrado para o pedido")
-                    raise ValueError(f"Produto com ID {item['id']} não encontrado")
-                    
-                if produto.quantidade_estoque < item['quantidade']:
-                    logger.error(f"Estoque insuficiente para o produto {produto.nome} (ID: {produto.id}). Solicitado: {item['quantidade']}, Disponível: {produto.quantidade_estoque}")
-                    raise ValueError(f"Produto {produto.nome} não possui estoque suficiente. Disponível: {produto.quantidade_estoque}")
+                try:
+                    quantidade = int(item['quantidade'])
+                except (ValueError, TypeError):
+                    raise ValueError("Quantidade do produto deve ser um número inteiro válido")
+                if quantidade <= 0:
+                    logger.error(f"Quantidade inválida para o produto {item['id']}: {quantidade}")
+                    raise ValueError("Quantidade do produto deve ser maior que zero")
+                quantidades[item['id']] = quantidades.get(item['id'], 0) + quantidade
             
-            # Criar o pedido
-            produtos_info = []
-            for item in produtos:
-                produto = next((p for p in self.produtos if p.id == item['id']), None)
-                # Armazenar todas as informações relevantes do produto no momento do pedido
-                produtos_info.append({
-                    'id': item['id'],
-                    'quantidade': item['quantidade'],
-                    'nome': produto.nome,
-                    'preco': produto.preco,
-                    'descricao': produto.descricao,
-                    'imagem_url': produto.imagem_url
-                })
+            with self._trava:
+                # Reservar todo o estoque de uma vez: ou todos os itens são baixados, ou nenhum
+                produtos_reservados = self._reservar_estoque(quantidades)
                 
-                # Atualizar estoque
-                produto.atualizar_estoque(-item['quantidade'])
-            
-            pedido = Pedido(produtos_info, cliente_nome, cliente_telefone, cliente_endereco)
-            self.pedidos.append(pedido)
+                # Criar o pedido
+                produtos_info = []
+                for item in produtos:
+                    produto = produtos_reservados[item['id']]
+                    # Armazenar todas as informações relevantes do produto no momento do pedido
+                    produtos_info.append({
+                        'id': item['id'],
+                        'quantidade': int(item['quantidade']),
+                        'nome': produto.nome,
+                        'preco': produto.preco,
+                        'descricao': produto.descricao,
+                        'imagem_url': produto.imagem_url
+                    })
+                
+                pedido = Pedido(produtos_info, cliente_nome, cliente_telefone, cliente_endereco)
+                self.pedidos.append(pedido)
+                self._indexar_pedido(pedido)
             
             logger.info(f"Pedido criado: {pedido.id} - Cliente: {cliente_nome} - Produtos: {len(produtos_info)}")
             return pedido.to_dict()
@@ -772,6 +1299,71 @@ class Catalogo:
             logger.error(traceback.format_exc())
             raise
     
+    def _reservar_estoque(self, quantidades):
+        """
+        Baixa o estoque de vários produtos de forma atômica (tudo ou nada).
+        Deve ser chamada com a trava do catálogo adquirida.
+        
+        Args:
+            quantidades (dict): Quantidade total a reservar por ID de produto
+            
+        Returns:
+            dict: Produtos reservados por ID
+            
+        Raises:
+            ValueError: Se algum produto não for encontrado ou não houver estoque suficiente
+        """
+        # Validar todos os itens antes de alterar qualquer estoque
+        produtos_reservados = {}
+        for produto_id, quantidade in quantidades.items():
+            produto = self._obter_produto_obj(produto_id)
+            if not produto:
+                logger.error(f"Produto com ID {produto_id} não encontrado para o pedido")
+                raise ValueError(f"Produto com ID {produto_id} não encontrado")
+            if produto.quantidade_estoque < quantidade:
+                logger.error(f"Estoque insuficiente para o produto {produto.nome} (ID: {produto.id}). Solicitado: {quantidade}, Disponível: {produto.quantidade_estoque}")
+                raise ValueError(f"Produto {produto.nome} não possui estoque suficiente. Disponível: {produto.quantidade_estoque}")
+            produtos_reservados[produto_id] = produto
+        
+        # Baixar o estoque, desfazendo as baixas já feitas em caso de falha
+        baixados = []
+        try:
+            for produto_id, quantidade in quantidades.items():
+                produtos_reservados[produto_id].atualizar_estoque(-quantidade)
+                baixados.append((produtos_reservados[produto_id], quantidade))
+        except Exception:
+            for produto, quantidade in baixados:
+                produto.atualizar_estoque(quantidade)
+            raise
+        finally:
+            for produto, _ in baixados:
+                self._reindexar_produto(produto)
+        return produtos_reservados
+    
+    def atualizar_estoque(self, produto_id, quantidade):
+        """
+        Adiciona ou remove estoque de um produto de forma segura entre threads.
+        
+        Args:
+            produto_id (str): ID do produto
+            quantidade (int): Quantidade a ser adicionada (positiva) ou removida (negativa)
+            
+        Returns:
+            Produto: O produto atualizado
+            
+        Raises:
+            ValueError: Se o produto não for encontrado ou o estoque ficar negativo
+        """
+        with self._trava:
+            produto = self._obter_produto_obj(produto_id)
+            if not produto:
+                raise ValueError(f"Produto com ID {produto_id} não encontrado")
+            try:
+                produto.atualizar_estoque(quantidade)
+            finally:
+                self._reindexar_produto(produto)
+            return produto
+    
     def listar_pedidos(self):
         """
         Lista todos os pedidos.
@@ -781,13 +1373,151 @@ class Catalogo:
         """
         try:
             pedidos_dict = [p.to_dict() for p in self.pedidos]
-            logger.info(f"Listando {len(pedidos_dict)} pedidos")
+            logger.debug("Listando %d pedidos", len(pedidos_dict))
             return pedidos_dict
         except Exception as e:
             logger.error(f"Erro ao listar pedidos: {str(e)}")
             logger.error(traceback.format_exc())
             return []
     
+    def consultar_pedidos(self, status=None, data_inicial=None, data_final=None, cliente=None,
+                          valor_min=None, valor_max=None, ordenacao='data-recente', cursor=None, limite=None):
+        """
+        Consulta pedidos com filtros, ordenação e paginação por cursor usando os índices ordenados.
+        
+        Args:
+            status (str, optional): Status exato do pedido
+            data_inicial (str, optional): Data inicial no formato AAAA-MM-DD (inclusiva)
+            data_final (str, optional): Data final no formato AAAA-MM-DD (inclusiva)
+            cliente (str, optional): Trecho do nome do cliente (sem diferenciar acentos e maiúsculas)
+            valor_min (float, optional): Valor total mínimo do pedido
+            valor_max (float, optional): Valor total máximo do pedido
+            ordenacao (str): Uma das chaves de ORDENACOES_PEDIDOS
+            cursor (str, optional): Cursor retornado pela página anterior
+            limite (int, optional): Quantidade máxima de pedidos na página. Se None, retorna todos.
+            
+        Returns:
+            tuple: (lista de dicionários da página, total de pedidos filtrados ou None, cursor da próxima página ou None).
+                O total é None quando só poderia ser obtido percorrendo a faixa inteira
+                (filtro de cliente ou de faixa no campo que não é o da ordenação) e a
+                consulta não chegou a percorrê-la.
+            
+        Raises:
+            ValueError: Se a ordenação, as datas, os valores ou o cursor forem inválidos
+        """
+        if ordenacao not in self.ORDENACOES_PEDIDOS:
+            raise ValueError(f"Ordenação inválida. Ordenações válidas são: {', '.join(self.ORDENACOES_PEDIDOS)}")
+        campo, decrescente = self.ORDENACOES_PEDIDOS[ordenacao]
+        if limite is not None and limite < 1:
+            raise ValueError("Limite deve ser maior que zero")
+        
+        try:
+            data_min = datetime.strptime(data_inicial, "%Y-%m-%d").strftime("%Y%m%d000000") if data_inicial else None
+            data_max = datetime.strptime(data_final, "%Y-%m-%d").strftime("%Y%m%d235959") if data_final else None
+        except ValueError:
+            raise ValueError("Datas devem estar no formato AAAA-MM-DD")
+        try:
+            valor_min = float(valor_min) if valor_min not in (None, '') else None
+            valor_max = float(valor_max) if valor_max not in (None, '') else None
+        except (ValueError, TypeError):
+            raise ValueError("Valores mínimo e máximo devem ser numéricos")
+        
+        limites = {'data': (data_min, data_max), 'valor': (valor_min, valor_max)}
+        
+        with self._trava:
+            # O status escolhe o índice e a faixa do campo ordenado é resolvida por busca binária;
+            # os demais filtros são verificados item a item
+            if status:
+                indice = self._pedidos_por_status.get(status, {}).get(campo, [])
+            else:
+                indice = self._pedidos_ordenados[campo]
+            
+            minimo, maximo = limites[campo]
+            inicio = bisect.bisect_left(indice, (minimo,)) if minimo is not None else 0
+            fim = bisect.bisect_right(indice, (maximo, float('inf'))) if maximo is not None else len(indice)
+            
+            # Posição a partir da qual começa a página (exclusiva do item do cursor)
+            if cursor:
+                ultima = self._decodificar_cursor(cursor, ordenacao)
+                try:
+                    corte = bisect.bisect_left(indice, ultima) if decrescente else bisect.bisect_right(indice, ultima)
+                except TypeError:
+                    raise ValueError("Cursor inválido")
+            else:
+                corte = fim if decrescente else inicio
+            
+            termo_cliente = normalizar_texto(cliente) if cliente else None
+            outro_campo = 'valor' if campo == 'data' else 'data'
+            outro_min, outro_max = limites[outro_campo]
+            filtrar = bool(termo_cliente or outro_min is not None or outro_max is not None)
+            
+            def corresponde(pedido):
+                if outro_min is not None or outro_max is not None:
+                    chave = self._entrada_pedido(pedido, outro_campo)[0]
+                    if outro_min is not None and chave < outro_min:
+                        return False
+                    if outro_max is not None and chave > outro_max:
+                        return False
+                if termo_cliente and termo_cliente not in normalizar_texto(pedido.cliente_nome):
+                    return False
+                return True
+            
+            # A página começa direto no corte e para no primeiro item além do limite;
+            # sem filtros item a item o total sai da própria faixa, sem percorrê-la
+            if decrescente:
+                posicoes = range(min(corte, fim) - 1, inicio - 1, -1)
+            else:
+                posicoes = range(max(corte, inicio), fim)
+            
+            pagina = []
+            proximo_cursor = None
+            for posicao in posicoes:
+                entrada = indice[posicao]
+                pedido = self._pedidos_por_id[entrada[2]]
+                if filtrar and not corresponde(pedido):
+                    continue
+                if limite is not None and len(pagina) >= limite:
+                    proximo_cursor = self._codificar_cursor(ultima_entrada, ordenacao)
+                    break
+                pagina.append(pedido.to_dict())
+                ultima_entrada = entrada
+            
+            # Com filtros item a item o total só é conhecido quando a faixa inteira coube na resposta
+            if not filtrar:
+                total = fim - inicio
+            elif cursor is None and proximo_cursor is None:
+                total = len(pagina)
+            else:
+                total = None
+        
+        logger.debug("Consulta de pedidos: %d de %s retornados", len(pagina), total)
+        return pagina, total, proximo_cursor
+    
+    @staticmethod
+    def _codificar_cursor(entrada, ordenacao):
+        """Codifica a posição do último item da página em um cursor opaco."""
+        bruto = json.dumps([ordenacao, list(entrada)], separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(bruto).decode('ascii')
+    
+    @staticmethod
+    def _decodificar_cursor(cursor, ordenacao):
+        """
+        Decodifica um cursor gerado por _codificar_cursor.
+        
+        Raises:
+            ValueError: Se o cursor for inválido ou de outra ordenação
+        """
+        try:
+            ordenacao_cursor, entrada = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            entrada = tuple(entrada)
+            if len(entrada) != 3:
+                raise ValueError
+        except Exception:
+            raise ValueError("Cursor inválido")
+        if ordenacao_cursor != ordenacao:
+            raise ValueError("Cursor não corresponde à ordenação solicitada")
+        return entrada
+    
     def obter_pedido(self, pedido_id):
         """
         Obtém um pedido pelo ID.
@@ -799,9 +1529,9 @@ class Catalogo:
             Pedido: O pedido encontrado ou None se não for encontrado
         """
         try:
-            pedido = next((p for p in self.pedidos if p.id == pedido_id), None)
+            pedido = self._obter_pedido_obj(pedido_id)
             if pedido:
-                logger.info(f"Pedido encontrado: {pedido_id} - Cliente: {pedido.cliente_nome}")
+                logger.debug("Pedido encontrado: %s - Cliente: %s", pedido_id, pedido.cliente_nome)
                 return pedido.to_dict()
             else:
                 logger.warning(f"Pedido não encontrado: {pedido_id}")
@@ -833,13 +1563,13 @@ class Catalogo:
                 raise ValueError(f"Status inválido. Status válidos são: {', '.join(status_validos)}")
             
             # Encontrar o pedido pelo ID
-            pedido = next((p for p in self.pedidos if p.id == pedido_id), None)
+            pedido = self._obter_pedido_obj(pedido_id)
             if not pedido:
                 logger.warning(f"Tentativa de atualizar status de pedido inexistente: {pedido_id}")
                 raise ValueError(f"Pedido com ID {pedido_id} não encontrado")
             
             # Atualizar status
-            pedido.status = novo_status
+            self._alterar_status_pedido(pedido, novo_status)
             logger.info(f"Status do pedido {pedido_id} atualizado para: {novo_status}")
             
             return pedido.to_dict()
@@ -874,15 +1604,15 @@ class Catalogo:
                 raise ValueError("Email inválido")
                 
             # Verificar se email ou telefone já existem
-            for usuario in self.usuarios:
-                if usuario.email == email:
-                    raise ValueError("Email já cadastrado")
-                if usuario.telefone == telefone:
-                    raise ValueError("Telefone já cadastrado")
+            if email in self._usuarios_por_email:
+                raise ValueError("Email já cadastrado")
+            if telefone in self._usuarios_por_telefone:
+                raise ValueError("Telefone já cadastrado")
             
             # Criar novo usuário
             novo_usuario = Usuario(nome=nome, email=email, telefone=telefone, senha=senha, tipo=tipo)
             self.usuarios.append(novo_usuario)
+            self._indexar_usuario(novo_usuario)
             
             logger.info(f"Novo usuário adicionado: {novo_usuario.id} - {novo_usuario.nome} ({novo_usuario.tipo})")
             return novo_usuario.to_dict()
@@ -902,20 +1632,12 @@ class Catalogo:
             Usuario: O usuário encontrado ou None
         """
         try:
-            logger.info(f"Tentando obter usuário por ID: {usuario_id}")
-            logger.info(f"Total de usuários no catálogo: {len(self.usuarios)}")
-            
-            usuarios_ids = [u.id for u in self.usuarios]
-            logger.info(f"IDs de usuários disponíveis: {usuarios_ids}")
-            
-            usuario = next((u for u in self.usuarios if u.id == usuario_id), None)
+            usuario = self._obter_usuario_obj(usuario_id)
             if usuario:
-                logger.info(f"Usuário encontrado: {usuario_id} - {usuario.nome} (tipo: {usuario.tipo})")
-                usuario_dict = usuario.to_dict()
-                logger.info(f"Retornando dicionário do usuário: {usuario_dict}")
-                return usuario_dict
+                logger.debug("Usuário encontrado: %s - %s (tipo: %s)", usuario_id, usuario.nome, usuario.tipo)
+                return usuario.to_dict()
             else:
-                logger.warning(f"Usuário não encontrado: {usuario_id}")
+                logger.warning("Usuário não encontrado: %s", usuario_id)
                 return None
         except Exception as e:
             logger.error(f"Erro ao buscar usuário por ID {usuario_id}: {str(e)}")
@@ -933,9 +1655,9 @@ class Catalogo:
             Usuario: O usuário encontrado ou None
         """
         try:
-            usuario = next((u for u in self.usuarios if u.email == email), None)
+            usuario = self._usuarios_por_email.get(email)
             if usuario:
-                logger.info(f"Usuário encontrado por email: {email}")
+                logger.debug("Usuário encontrado por email: %s", email)
                 return usuario.to_dict()
             else:
                 logger.warning(f"Usuário não encontrado por email: {email}")
@@ -956,9 +1678,9 @@ class Catalogo:
             Usuario: O usuário encontrado ou None
         """
         try:
-            usuario = next((u for u in self.usuarios if u.telefone == telefone), None)
+            usuario = self._usuarios_por_telefone.get(telefone)
             if usuario:
-                logger.info(f"Usuário encontrado por telefone: {telefone}")
+                logger.debug("Usuário encontrado por telefone: %s", telefone)
                 return usuario.to_dict()
             else:
                 logger.warning(f"Usuário não encontrado por telefone: {telefone}")
@@ -1001,41 +1723,80 @@ class Catalogo:
             Usuario: O usuário encontrado ou None
         """
         try:
-            usuario = next((u for u in self.usuarios if u.reset_token == token), None)
-            if usuario:
-                logger.info(f"Usuário encontrado por token: {token}")
+            usuario = self._usuarios_por_token.get(token) if token else None
+            if usuario and usuario.reset_token == token:
+                logger.debug("Usuário %s encontrado por token de redefinição", usuario.id)
                 return usuario.to_dict()
             else:
-                logger.warning(f"Usuário não encontrado por token: {token}")
+                logger.warning("Usuário não encontrado por token de redefinição")
                 return None
         except Exception as e:
             logger.error(f"Erro ao buscar usuário por token: {str(e)}")
             logger.error(traceback.format_exc())
             return None
             
-    def autenticar_usuario(self, credencial, senha):
+    def autenticar_usuario(self, credencial, senha, ao_atualizar_hash=None):
         """
         Autentica um usuário com email/telefone e senha.
+        Se o hash armazenado usar um custo do bcrypt diferente do configurado, ele é regerado
+        com a senha informada.
         
         Args:
             credencial (str): Email ou telefone do usuário
             senha (str): Senha em texto puro
+            ao_atualizar_hash (callable, optional): Chamada com (usuario, hash_antigo) quando o hash
+                for regerado, para que a alteração seja persistida
             
         Returns:
             Usuario: O usuário autenticado ou None
+            
+        Raises:
+            FilaSenhasCheia: Se o pool de verificação de senhas estiver sobrecarregado
         """
         try:
-            usuario = next((u for u in self.usuarios if (u.email == credencial or u.telefone == credencial)), None)
-            if usuario and usuario.verificar_senha(senha):
+            usuario = self._usuarios_por_email.get(credencial) or self._usuarios_por_telefone.get(credencial)
+            if not usuario:
+                # Mesmo custo de um usuário existente, para não revelar quais credenciais existem
+                executar_bcrypt(verify_password, senha, hash_ficticio())
+            elif (self._credenciais_verificadas.contem(senha, usuario.senha_hash)
+                  or usuario.verificar_senha(senha)):
+                if needs_rehash(usuario.senha_hash):
+                    self._atualizar_hash_senha(usuario, senha, ao_atualizar_hash)
+                self._credenciais_verificadas.adicionar(senha, usuario.senha_hash)
                 logger.info(f"Usuário {usuario.id} - {usuario.nome} autenticado com sucesso")
                 return usuario.to_dict()
             logger.warning(f"Falha na autenticação para credencial: {credencial}")
             return None
+        except FilaSenhasCheia:
+            raise
         except Exception as e:
             logger.error(f"Erro ao autenticar usuário: {str(e)}")
             logger.error(traceback.format_exc())
             return None
         
+    def _atualizar_hash_senha(self, usuario, senha, ao_atualizar_hash=None):
+        """
+        Regera o hash da senha com o custo atual do bcrypt. Falhas não impedem o login.
+        
+        Args:
+            usuario (Usuario): Usuário recém-autenticado
+            senha (str): Senha em texto puro, já verificada
+            ao_atualizar_hash (callable, optional): Chamada com (usuario, hash_antigo) após a troca
+        """
+        hash_antigo = usuario.senha_hash
+        try:
+            usuario.senha_hash = executar_bcrypt(hash_password, senha)
+            logger.info(f"Hash de senha do usuário {usuario.id} regerado com o custo atual do bcrypt")
+            if ao_atualizar_hash:
+                ao_atualizar_hash(usuario, hash_antigo)
+        except FilaSenhasCheia:
+            usuario.senha_hash = hash_antigo
+            logger.warning(f"Regeração do hash do usuário {usuario.id} adiada: fila de senhas cheia")
+        except Exception as e:
+            usuario.senha_hash = hash_antigo
+            logger.error(f"Erro ao regerar hash de senha do usuário {usuario.id}: {str(e)}")
+            logger.error(traceback.format_exc())
+        
     def listar_usuarios(self, apenas_funcionarios=False):
         """
         Lista todos os usuários.
@@ -1055,7 +1816,7 @@ class Catalogo:
                 usuarios = [u.to_dict() for u in self.usuarios if u.tipo == "funcionario"]
             else:
                 usuarios = [u.to_dict() for u in self.usuarios]
-            logger.info(f"Listando {len(usuarios)} usuários")
+            logger.debug("Listando %d usuários", len(usuarios))
             
             # Garantir que todos os usuários tenham suas informações completas
             for u in usuarios:
@@ -1085,13 +1846,14 @@ class Catalogo:
             bool: True se a exclusão foi bem-sucedida, False caso contrário
         """
         try:
-            usuario = next((u for u in self.usuarios if u.id == usuario_id), None)
+            usuario = self._obter_usuario_obj(usuario_id)
             if usuario:
                 # Verificar se é o único gerente
                 if usuario.tipo == "gerente" and len([u for u in self.usuarios if u.tipo == "gerente"]) <= 1:
                     raise ValueError("Não é possível excluir o único gerente do sistema")
                 
                 self.usuarios.remove(usuario)
+                self._desindexar_usuario(usuario)
                 logger.info(f"Usuário excluído: {usuario_id}")
                 return True
             logger.warning(f"Usuário não encontrado para exclusão: {usuario_id}")
@@ -12,6 +12,9 @@ import logging
 import hashlib
 import bcrypt
 import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from utils import BCRYPT_CUSTO, escrever_arquivo_atomico, anexar_jsonl, ler_jsonl
 
 # Configurar logging
 logging.basicConfig(
@@ -27,11 +30,19 @@ logger = logging.getLogger(__name__)
 # Definir caminho do arquivo de usuários
 USUARIOS_FILE = 'usuarios.json'
 
+# Senhas para teste de migração por usuário
+# Isso permite verificar e migrar mesmo sem conhecer as senhas reais
+SENHAS_TESTE = {
+    "admin@vortex.com": "admin123",  # Senha do admin padrão
+    # Adicione outras senhas conhecidas para usuários específicos
+}
+SENHA_PADRAO = "Vortex@2025"
+
 def hash_password(password):
     """Gera um hash seguro para a senha usando bcrypt"""
     if isinstance(password, str):
         password = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_CUSTO)
     hashed = bcrypt.hashpw(password, salt)
     return hashed.decode('utf-8')
 
@@ -64,12 +75,7 @@ def migrar_senhas():
         
         logger.info(f"Total de {total_usuarios} usuários encontrados para migração.")
         
-        # Senhas para teste de migração por usuário
-        # Isso permite verificar e migrar mesmo sem conhecer as senhas reais
-        senhas_teste = {
-            "admin@vortex.com": "admin123",  # Senha do admin padrão
-            # Adicione outras senhas conhecidas para usuários específicos
-        }
+        senhas_teste = SENHAS_TESTE
         
         # Processar cada usuário
         for usuario in dados['usuarios']:
@@ -118,6 +124,112 @@ def migrar_senhas():
         logger.error(traceback.format_exc())
         return False
 
+def _escolher_senha(usuario):
+    """Retorna a senha a ser convertida para bcrypt: a senha de teste, se conferir, ou a senha padrão"""
+    email = usuario.get('email')
+    senha_teste = SENHAS_TESTE.get(email)
+    if senha_teste and verificar_senha_antiga(senha_teste, usuario['senha_hash']):
+        return senha_teste
+    return SENHA_PADRAO
+
+def _gerar_hashes(tarefas):
+    """Gera os hashes bcrypt de um lote [(chave, hash antigo, senha)] (executado nos processos filhos)"""
+    return [(chave, hash_antigo, hash_password(senha)) for chave, hash_antigo, senha in tarefas]
+
+def migrar_senhas_lote(processos=None, tamanho_lote=200, arquivo=None):
+    """
+    Migra as senhas em lote, distribuindo o bcrypt entre vários processos.
+    
+    Cada lote concluído é registrado em um arquivo de progresso (<arquivo>.migracao) antes de
+    seguir adiante. Se a migração for interrompida, basta executá-la novamente: os hashes já
+    gerados são reaproveitados. O arquivo de usuários só é substituído no final, com uma
+    gravação atômica, e o arquivo de progresso é então removido.
+    
+    Args:
+        processos (int, optional): Número de processos. Padrão é o número de núcleos.
+        tamanho_lote (int, optional): Usuários por lote enviado a um processo
+        arquivo (str, optional): Arquivo de usuários. Padrão é USUARIOS_FILE.
+        
+    Returns:
+        bool: True se a migração foi concluída
+    """
+    arquivo = arquivo or USUARIOS_FILE
+    progresso = f"{arquivo}.migracao"
+    logger.info("Iniciando migração de senhas em lote...")
+    
+    if not os.path.exists(arquivo):
+        logger.error(f"Arquivo {arquivo} não encontrado!")
+        return False
+    
+    try:
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        
+        if 'usuarios' not in dados:
+            logger.error("Formato de arquivo inválido: chave 'usuarios' não encontrada!")
+            return False
+        
+        def chave(usuario):
+            return usuario.get('id') or usuario.get('email')
+        
+        # Hashes gerados em execuções anteriores, válidos enquanto o hash antigo não mudar
+        concluidos = {}
+        for registro in ler_jsonl(progresso):
+            for item_chave, hash_antigo, novo_hash in registro.get('hashes', []):
+                concluidos[item_chave] = (hash_antigo, novo_hash)
+        if concluidos:
+            logger.info(f"Retomando migração: {len(concluidos)} hashes já gerados em {progresso}")
+        if os.path.exists(progresso):
+            # Uma queda pode ter deixado a última linha incompleta: os novos lotes começam em linha nova
+            with open(progresso, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+        
+        pendentes = []
+        for usuario in dados['usuarios']:
+            # Qualquer variante do bcrypt ($2a$, $2b$, $2y$) já está migrada, não apenas $2b$
+            if usuario['senha_hash'].startswith('$2'):
+                continue
+            anterior = concluidos.get(chave(usuario))
+            if anterior and anterior[0] == usuario['senha_hash']:
+                continue
+            pendentes.append((chave(usuario), usuario['senha_hash'], _escolher_senha(usuario)))
+        
+        total_usuarios = len(dados['usuarios'])
+        logger.info(f"Total de {total_usuarios} usuários; {len(pendentes)} senhas a converter.")
+        
+        lotes = [pendentes[i:i + tamanho_lote] for i in range(0, len(pendentes), tamanho_lote)]
+        if lotes:
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                for numero, resultado in enumerate(executor.map(_gerar_hashes, lotes), 1):
+                    anexar_jsonl(progresso, {'hashes': resultado})
+                    for item_chave, hash_antigo, novo_hash in resultado:
+                        concluidos[item_chave] = (hash_antigo, novo_hash)
+                    logger.info(f"Lote {numero}/{len(lotes)} concluído")
+        
+        usuarios_migrados = 0
+        for usuario in dados['usuarios']:
+            anterior = concluidos.get(chave(usuario))
+            if anterior and anterior[0] == usuario['senha_hash']:
+                usuario['senha_hash'] = anterior[1]
+                usuarios_migrados += 1
+        
+        escrever_arquivo_atomico(arquivo, json.dumps(dados, ensure_ascii=False, indent=2), fsync=True)
+        if os.path.exists(progresso):
+            os.remove(progresso)
+        
+        logger.info(f"Migração concluída! {usuarios_migrados} de {total_usuarios} usuários migrados.")
+        return True
+    
+    except Exception as e:
+        logger.error(f"Erro durante a migração: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return False
+
 def fazer_backup():
     """Cria um backup do arquivo de usuários antes da migração"""
     if os.path.exists(USUARIOS_FILE):
@@ -136,6 +248,13 @@ def fazer_backup():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migração de senhas para bcrypt")
+    parser.add_argument('--lote', action='store_true',
+                        help="usa vários processos e permite retomar uma migração interrompida")
+    parser.add_argument('--processos', type=int, default=None, help="número de processos (padrão: núcleos)")
+    parser.add_argument('--tamanho-lote', type=int, default=200, help="usuários por lote")
+    args = parser.parse_args()
+    
     print("Migração de Senhas - Vortex Catálogo")
     print("===================================")
     print("Este script irá migrar as senhas dos usuários para um formato mais seguro.")
@@ -160,7 +279,11 @@ if __name__ == "__main__":
     
     # Executar migração
     print("\nIniciando migração de senhas...")
-    if migrar_senhas():
+    if args.lote:
+        sucesso = migrar_senhas_lote(args.processos, args.tamanho_lote)
+    else:
+        sucesso = migrar_senhas()
+    if sucesso:
         print("\nMigração concluída com sucesso!")
         print("Todos os usuários podem fazer login com 'Vortex@2025' caso suas senhas não tenham sido migradas corretamente.")
     else:
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sessões guardadas no servidor.
+
+O cookie leva apenas um identificador aleatório; os dados da sessão ficam em um armazém:
+    - ArmazemSessoesMemoria: LRU em memória com expiração (um único processo)
+    - ArmazemSessoesSQLite: tabela SQLite indexada, compartilhada entre vários workers
+Diferente dos cookies assinados do Flask, sessões no servidor podem ser revogadas
+(ex.: todas as sessões de um usuário excluído).
+"""
+import time
+import secrets
+import sqlite3
+import logging
+import threading
+import itertools
+from collections import OrderedDict
+from flask.sessions import SessionInterface, SessionMixin
+from flask.json.tag import TaggedJSONSerializer
+from werkzeug.datastructures import CallbackDict
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+class ArmazemSessoes:
+    """
+    Interface comum dos armazéns de sessões.
+    Os dados chegam já serializados (texto); cada sessão guarda o ID do usuário para revogação.
+    """
+
+    def carregar(self, sid):
+        """Retorna os dados da sessão, ou None se não existir ou tiver expirado"""
+        raise NotImplementedError
+
+    def salvar(self, sid, usuario_id, dados, ttl):
+        """Grava a sessão, válida por ttl segundos"""
+        raise NotImplementedError
+
+    def remover(self, sid):
+        """Remove a sessão, se existir"""
+        raise NotImplementedError
+
+    def revogar_usuario(self, usuario_id):
+        """Remove todas as sessões do usuário e retorna quantas foram removidas"""
+        raise NotImplementedError
+
+class ArmazemSessoesMemoria(ArmazemSessoes):
+    """
+    Sessões em memória, descartando as usadas há mais tempo quando passam de max_itens.
+
+    Attributes:
+        max_itens (int): Número máximo de sessões mantidas
+    """
+
+    def __init__(self, max_itens=10000):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()  # sid -> (expira_em, usuario_id, dados)
+        self._por_usuario = {}       # usuario_id -> {sid}
+        self._trava = threading.Lock()
+
+    def _descartar(self, sid):
+        item = self._itens.pop(sid, None)
+        if item and item[1] is not None:
+            sids = self._por_usuario.get(item[1])
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._por_usuario[item[1]]
+
+    def carregar(self, sid):
+        with self._trava:
+            item = self._itens.get(sid)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                self._descartar(sid)
+                return None
+            self._itens.move_to_end(sid)
+            return item[2]
+
+    def salvar(self, sid, usuario_id, dados, ttl):
+        with self._trava:
+            self._descartar(sid)
+            self._itens[sid] = (time.monotonic() + ttl, usuario_id, dados)
+            if usuario_id is not None:
+                self._por_usuario.setdefault(usuario_id, set()).add(sid)
+            while len(self._itens) > self.max_itens:
+                self._descartar(next(iter(self._itens)))
+
+    def remover(self, sid):
+        with self._trava:
+            self._descartar(sid)
+
+    def revogar_usuario(self, usuario_id):
+        with self._trava:
+            sids = list(self._por_usuario.get(usuario_id, ()))
+            for sid in sids:
+                self._descartar(sid)
+            return len(sids)
+
+class ArmazemSessoesSQLite(ArmazemSessoes):
+    """
+    Sessões em uma tabela SQLite, visíveis para todos os processos que usam o mesmo arquivo.
+    As sessões expiradas são apagadas periodicamente durante as gravações.
+
+    Attributes:
+        arquivo (str): Caminho do banco SQLite
+    """
+
+    LIMPAR_A_CADA = 200  # gravações entre duas limpezas de sessões expiradas
+
+    _ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS sessoes (
+            sid TEXT PRIMARY KEY,
+            usuario_id TEXT,
+            expira_em REAL NOT NULL,
+            dados TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessoes_usuario ON sessoes(usuario_id);
+        CREATE INDEX IF NOT EXISTS idx_sessoes_expira_em ON sessoes(expira_em);
+    """
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self._local = threading.local()
+        self._gravacoes = itertools.count(1)  # next() é atômico entre threads
+        conexao = self._conexao()
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.executescript(self._ESQUEMA)
+        conexao.commit()
+
+    def _conexao(self):
+        """Retorna a conexão SQLite da thread atual, criando-a se necessário"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.arquivo, timeout=30)
+            self._local.conexao = conexao
+        return conexao
+
+    def carregar(self, sid):
+        linha = self._conexao().execute(
+            "SELECT dados FROM sessoes WHERE sid = ? AND expira_em > ?", (sid, time.time())
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def salvar(self, sid, usuario_id, dados, ttl):
+        agora = time.time()
+        with self._conexao() as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO sessoes (sid, usuario_id, expira_em, dados) VALUES (?, ?, ?, ?)",
+                (sid, usuario_id, agora + ttl, dados)
+            )
+            if next(self._gravacoes) % self.LIMPAR_A_CADA == 0:
+                conexao.execute("DELETE FROM sessoes WHERE expira_em <= ?", (agora,))
+
+    def remover(self, sid):
+        with self._conexao() as conexao:
+            conexao.execute("DELETE FROM sessoes WHERE sid = ?", (sid,))
+
+    def revogar_usuario(self, usuario_id):
+        with self._conexao() as conexao:
+            return conexao.execute("DELETE FROM sessoes WHERE usuario_id = ?", (usuario_id,)).rowcount
+
+class SessaoServidor(CallbackDict, SessionMixin):
+    """
+    Sessão cujos dados ficam no servidor.
+
+    Attributes:
+        sid (str): Identificador da sessão (None enquanto não for gravada)
+        usuario_original (str): ID do usuário quando a sessão foi aberta
+        gravada_em (float): Momento (time.time) da última gravação no armazém
+    """
+
+    def __init__(self, dados=None, sid=None, nova=False, gravada_em=0.0):
+        def ao_alterar(sessao):
+            sessao.modified = True
+        super().__init__(dados, ao_alterar)
+        self.sid = sid
+        self.gravada_em = gravada_em
+        self.new = nova
+        self.modified = False
+        self.usuario_original = self.get('usuario_id')
+
+class InterfaceSessaoServidor(SessionInterface):
+    """
+    Interface de sessão do Flask que guarda os dados em um ArmazemSessoes.
+    A sessão é gravada quando alterada; ao trocar de usuário (login), recebe um novo ID.
+    Com SESSION_REFRESH_EACH_REQUEST (padrão do Flask), sessões permanentes têm expiração
+    deslizante: a validade e o cookie são renovados no acesso, no máximo uma vez a cada
+    INTERVALO_RENOVACAO segundos, para não gravar no armazém a cada requisição.
+    """
+
+    serializador = TaggedJSONSerializer()
+    INTERVALO_RENOVACAO = 60
+
+    def __init__(self, armazem):
+        self.armazem = armazem
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            dados = self.armazem.carregar(sid)
+            if dados is not None:
+                try:
+                    dados = self.serializador.loads(dados)
+                    gravada_em = dados.pop('_gravada_em', 0.0)
+                    return SessaoServidor(dados, sid, gravada_em=gravada_em)
+                except ValueError:
+                    logger.warning("Sessão com dados inválidos descartada")
+        return SessaoServidor(nova=True)
+
+    def save_session(self, app, session, response):
+        nome = self.get_cookie_name(app)
+        dominio = self.get_cookie_domain(app)
+        caminho = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and session.sid:
+                self.armazem.remover(session.sid)
+                response.delete_cookie(nome, domain=dominio, path=caminho)
+            return
+        agora = time.time()
+        renovar = self.should_set_cookie(app, session) and agora - session.gravada_em >= self.INTERVALO_RENOVACAO
+        if not session.modified and not renovar:
+            return
+
+        # Novo ID ao trocar de usuário, para que um ID anterior ao login não dê acesso à conta
+        if session.sid and session.get('usuario_id') != session.usuario_original:
+            self.armazem.remover(session.sid)
+            session.sid = None
+        session.sid = session.sid or secrets.token_urlsafe(32)
+        session.usuario_original = session.get('usuario_id')
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        session.gravada_em = agora
+        dados = self.serializador.dumps(dict(session, _gravada_em=agora))
+        self.armazem.salvar(session.sid, session.get('usuario_id'), dados, ttl)
+        response.set_cookie(
+            nome,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=dominio,
+            path=caminho,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+def criar_armazem_sessoes(tipo, sqlite_file='sessoes.db', max_itens=10000):
+    """
+    Cria o armazém de sessões conforme o tipo configurado.
+
+    Args:
+        tipo (str): 'cookie' (sessões assinadas do Flask, sem armazém), 'memoria' ou 'sqlite'
+        sqlite_file (str): Caminho do banco SQLite (apenas para 'sqlite')
+        max_itens (int): Número máximo de sessões em memória (apenas para 'memoria')
+
+    Returns:
+        ArmazemSessoes: O armazém, ou None para sessões em cookie
+    """
+    tipo = (tipo or 'cookie').lower()
+    if tipo == 'cookie':
+        return None
+    if tipo == 'memoria':
+        logger.info(f"Sessões no servidor em memória (até {max_itens} sessões)")
+        return ArmazemSessoesMemoria(max_itens)
+    if tipo == 'sqlite':
+        logger.info(f"Sessões no servidor em SQLite: {sqlite_file}")
+        return ArmazemSessoesSQLite(sqlite_file)
+    raise ValueError(f"Tipo de sessão não suportado: {tipo}")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fixtures compartilhadas dos testes.
+
+O app carrega produtos, pedidos e usuários do diretório atual ao ser importado, então os
+testes rodam sobre uma cópia dos arquivos de dados em um diretório temporário.
+"""
+import os
+import sys
+import shutil
+import importlib
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+ARQUIVOS_DADOS = ['produtos.json', 'pedidos.json']
+
+ADMIN = {'credencial': 'admin@vortex.com', 'senha': 'admin@2025'}
+
+# Definido antes de qualquer import do app ou de utils, que leem o ambiente ao serem importados.
+# Sem usuarios.json o app cria o gerente padrão (ADMIN) com este custo de bcrypt.
+os.environ.update({
+    'BCRYPT_CUSTO': '4',
+    'SESSOES': 'memoria',
+    'LOGIN_LIMITE_IP': '100000',
+    'LOGIN_LIMITE_CREDENCIAL': '100000',
+})
+
+@pytest.fixture(scope='session')
+def modulo_app(tmp_path_factory):
+    """Importa o app dentro de um diretório temporário com uma cópia dos dados"""
+    diretorio = tmp_path_factory.mktemp('dados')
+    for nome in ARQUIVOS_DADOS:
+        shutil.copy(os.path.join(RAIZ, nome), diretorio / nome)
+    os.chdir(diretorio)
+    return importlib.import_module('app')
+
+@pytest.fixture
+def cliente(modulo_app):
+    """Cliente de teste sem login"""
+    return modulo_app.app.test_client()
+
+@pytest.fixture
+def cliente_admin(modulo_app):
+    """Cliente de teste autenticado como o gerente padrão"""
+    cliente = modulo_app.app.test_client()
+    resposta = cliente.post('/login', data=ADMIN)
+    assert resposta.status_code == 302
+    return cliente
+
+@pytest.fixture
+def produto_com_estoque(modulo_app, cliente_admin):
+    """Cria um produto com estoque suficiente para os pedidos de um teste"""
+    resposta = cliente_admin.post('/api/produtos', json={
+        'nome': 'Produto de teste', 'descricao': 'Criado pelos testes',
+        'preco': 10.0, 'quantidade_estoque': 1000
+    })
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()['id']
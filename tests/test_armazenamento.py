@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes dos backends de armazenamento JSON e SQLite"""
+import os
+import sys
+import json
+import shutil
+import subprocess
+import pytest
+from armazenamento import ArmazenamentoSQLite, criar_armazenamento
+from conftest import RAIZ, ARQUIVOS_DADOS
+
+PRODUTOS = [
+    {'id': '1', 'nome': 'Caneta', 'descricao': 'Azul', 'preco': 2.5, 'quantidade_estoque': 10,
+     'imagem_url': None, 'data_atualizacao': '01/01/2025 10:00:00'},
+    {'id': '2', 'nome': 'Caderno', 'descricao': '', 'preco': 15.0, 'quantidade_estoque': 0,
+     'imagem_url': 'x.png', 'data_atualizacao': None},
+]
+
+def pedido(pedido_id, *itens):
+    return {
+        'id': pedido_id, 'cliente_nome': 'Ana', 'cliente_telefone': '11', 'cliente_endereco': 'rua',
+        'data_pedido': '01/01/2025 10:00:00', 'status': 'Pendente',
+        'produtos': [{'id': produto_id, 'quantidade': quantidade, 'nome': 'P', 'preco': 1.0,
+                      'descricao': 'd', 'imagem_url': None} for produto_id, quantidade in itens]
+    }
+
+@pytest.fixture
+def banco(tmp_path):
+    return str(tmp_path / 'catalogo.db')
+
+def test_sqlite_salvar_e_carregar(banco):
+    armazenamento = ArmazenamentoSQLite(banco)
+    assert not armazenamento.existe('produtos')
+    assert armazenamento.carregar('produtos') is None
+
+    assert armazenamento.salvar('produtos', PRODUTOS)
+    assert armazenamento.carregar('produtos') == PRODUTOS
+    pedidos = [pedido('10', ('1', 2), ('2', 1)), pedido('11')]
+    assert armazenamento.salvar('pedidos', pedidos)
+    assert armazenamento.carregar('pedidos') == pedidos
+
+    # Gravação por registro: atualiza um e insere outro, mantendo a ordem de inserção
+    alterado = dict(PRODUTOS[0], preco=3.0)
+    novo = dict(PRODUTOS[1], id='3', nome='Lápis')
+    assert armazenamento.salvar_registros('produtos', [alterado, novo])
+    assert armazenamento.carregar('produtos') == [alterado, PRODUTOS[1], novo]
+    assert armazenamento.remover_registros('produtos', ['2'])
+    assert [p['id'] for p in armazenamento.carregar('produtos')] == ['1', '3']
+
+def test_sqlite_itens_do_pedido_acompanham_o_pedido(banco):
+    armazenamento = ArmazenamentoSQLite(banco)
+    armazenamento.salvar('pedidos', [pedido('10', ('1', 2), ('2', 1)), pedido('11', ('1', 1))])
+
+    def itens():
+        return armazenamento._conexao().execute(
+            "SELECT pedido_id, produto_id FROM pedido_itens ORDER BY pedido_id, posicao").fetchall()
+
+    # Regravar um pedido substitui os seus itens
+    armazenamento.salvar_registros('pedidos', [pedido('10', ('2', 5))])
+    assert [tuple(i) for i in itens()] == [('10', '2'), ('11', '1')]
+    assert armazenamento.carregar('pedidos')[0]['produtos'][0]['quantidade'] == 5
+
+    # Remover o pedido remove os itens em cascata
+    armazenamento.remover_registros('pedidos', ['10'])
+    assert [tuple(i) for i in itens()] == [('11', '1')]
+    armazenamento.salvar('pedidos', [])
+    assert itens() == []
+
+def test_sqlite_versao_vista_por_outra_instancia(banco):
+    primeira = ArmazenamentoSQLite(banco)
+    segunda = ArmazenamentoSQLite(banco)
+    primeira.salvar('produtos', PRODUTOS)
+    versao = segunda.assinatura('produtos')
+    assert versao is not None
+
+    primeira.salvar_registros('produtos', [dict(PRODUTOS[0], preco=9.0)])
+    assert segunda.assinatura('produtos') != versao
+    assert segunda.carregar('produtos')[0]['preco'] == 9.0
+    versao = segunda.assinatura('produtos')
+    primeira.remover_registros('produtos', ['2'])
+    assert segunda.assinatura('produtos') != versao
+    # Coleções diferentes têm versões independentes
+    assert segunda.assinatura('pedidos') is None
+
+def test_sqlite_importa_os_arquivos_json_na_primeira_execucao(tmp_path, banco):
+    arquivos = {colecao: str(tmp_path / f'{colecao}.json') for colecao in ('produtos', 'pedidos', 'usuarios')}
+    with open(arquivos['produtos'], 'w', encoding='utf-8') as arquivo:
+        json.dump({'produtos': PRODUTOS}, arquivo)
+
+    armazenamento = criar_armazenamento('sqlite', arquivos, banco)
+    assert armazenamento.carregar('produtos') == PRODUTOS
+    assert not armazenamento.existe('pedidos')
+    # Na segunda execução o banco prevalece sobre os arquivos JSON
+    with open(arquivos['produtos'], 'w', encoding='utf-8') as arquivo:
+        json.dump({'produtos': []}, arquivo)
+    assert criar_armazenamento('sqlite', arquivos, banco).carregar('produtos') == PRODUTOS
+
+    with pytest.raises(ValueError):
+        criar_armazenamento('xml', arquivos)
+
+ROTEIRO_ESCRITA = """
+import app
+cliente = app.app.test_client()
+resposta = cliente.post('/login', data={'credencial': 'admin@vortex.com', 'senha': 'admin@2025'})
+assert resposta.status_code == 302
+resposta = cliente.post('/api/produtos', json={'nome': 'Do SQLite', 'descricao': 'd', 'preco': 4.0,
+                                               'quantidade_estoque': 7})
+produto_id = resposta.get_json()['id']
+resposta = cliente.post('/api/pedidos', json={'produtos': [{'id': produto_id, 'quantidade': 2}],
+                                              'cliente_nome': 'Ana', 'cliente_telefone': '11',
+                                              'cliente_endereco': 'rua'})
+assert resposta.status_code == 200, resposta.get_json()
+print(produto_id, resposta.get_json()['id'])
+"""
+
+ROTEIRO_LEITURA = """
+import sys
+import app
+produto_id, pedido_id = sys.argv[1:]
+produto = app.catalogo._obter_produto_obj(produto_id)
+assert produto.quantidade_estoque == 5, produto.to_dict()
+pedido = app.catalogo._obter_pedido_obj(pedido_id).to_dict()
+assert pedido['produtos'][0]['id'] == produto_id and pedido['produtos'][0]['quantidade'] == 2, pedido
+print('ok')
+"""
+
+def test_app_com_armazenamento_sqlite(tmp_path):
+    for nome in ARQUIVOS_DADOS:
+        shutil.copy(os.path.join(RAIZ, nome), tmp_path / nome)
+    ambiente = dict(os.environ, ARMAZENAMENTO='sqlite', SQLITE_FILE=str(tmp_path / 'catalogo.db'),
+                    PYTHONPATH=RAIZ)
+
+    def executar(roteiro, *args):
+        processo = subprocess.run([sys.executable, '-c', roteiro, *args], cwd=tmp_path, env=ambiente,
+                                  capture_output=True, text=True, timeout=120)
+        assert processo.returncode == 0, processo.stderr[-2000:]
+        return processo.stdout.split()
+
+    produto_id, pedido_id = executar(ROTEIRO_ESCRITA)
+    # Um novo processo lê do banco o que o primeiro gravou
+    assert executar(ROTEIRO_LEITURA, produto_id, pedido_id) == ['ok']
+    assert not os.path.exists(tmp_path / 'pedidos.journal.jsonl')
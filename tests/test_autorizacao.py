@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da verificação do usuário da sessão a cada requisição"""
+
+def criar_gerente(modulo_app, cliente_admin, email, telefone):
+    """Cria um gerente e retorna o seu ID e um cliente logado com ele"""
+    resposta = cliente_admin.post('/api/usuarios', json={
+        'nome': 'Gabriel Lima', 'email': email, 'telefone': telefone, 'senha': 'gerente1', 'tipo': 'gerente'
+    })
+    assert resposta.status_code == 201, resposta.get_json()
+    cliente = modulo_app.app.test_client()
+    assert cliente.post('/login', data={'credencial': email, 'senha': 'gerente1'}).status_code == 302
+    assert cliente.get('/api/usuarios').status_code == 200
+    return resposta.get_json()['id'], cliente
+
+def test_gerente_rebaixado_perde_acesso_na_proxima_requisicao(modulo_app, cliente_admin):
+    usuario_id, cliente = criar_gerente(modulo_app, cliente_admin, 'gabriel@vortex.com', '(11) 97777-0001')
+    resposta = cliente_admin.put(f'/api/usuarios/{usuario_id}', json={
+        'nome': 'Gabriel Lima', 'email': 'gabriel@vortex.com', 'telefone': '(11) 97777-0001', 'tipo': 'funcionario'
+    })
+    assert resposta.status_code == 200, resposta.get_json()
+
+    resposta = cliente.get('/api/usuarios')
+    assert resposta.status_code == 302
+    with cliente.session_transaction() as sessao:
+        assert sessao['usuario_tipo'] == 'funcionario'
+
+def test_rebaixamento_feito_por_outro_processo(modulo_app, cliente_admin):
+    usuario_id, cliente = criar_gerente(modulo_app, cliente_admin, 'gabriel2@vortex.com', '(11) 97777-0002')
+    # Simula a gravação de outro worker: o armazenamento muda e a memória deste processo não
+    registros = modulo_app.armazenamento.carregar('usuarios')
+    for registro in registros:
+        if registro['id'] == usuario_id:
+            registro['tipo'] = 'funcionario'
+    modulo_app.armazenamento.salvar('usuarios', registros)
+
+    assert cliente.get('/api/usuarios').status_code == 302
+
+def test_usuario_excluido_perde_acesso(modulo_app, cliente_admin):
+    usuario_id, cliente = criar_gerente(modulo_app, cliente_admin, 'gabriel3@vortex.com', '(11) 97777-0003')
+    assert cliente_admin.delete(f'/api/usuarios/{usuario_id}').status_code == 200
+    assert cliente.get('/api/usuarios').status_code == 302
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da invalidação do cache de respostas por tags"""
+import pytest
+from flask import jsonify
+
+@pytest.fixture
+def rotas_em_cache(modulo_app):
+    """Duas funções de produto e uma de pedidos em cache com tags, contando as execuções"""
+    execucoes = []
+
+    def criar(nome, tags):
+        def rota(registro_id):
+            execucoes.append((nome, registro_id))
+            return jsonify({'id': registro_id})
+        rota.__name__ = nome
+        return modulo_app.em_cache(chave=lambda registro_id: f'teste_{nome}_{registro_id}', tags=tags)(rota)
+
+    rotas = {
+        'produto': criar('produto', lambda registro_id: ['produtos', f'produtos:{registro_id}']),
+        'pedido': criar('pedido', lambda registro_id: ['pedidos', f'pedidos:{registro_id}']),
+    }
+
+    def chamar(tipo, registro_id):
+        with modulo_app.app.test_request_context():
+            return rotas[tipo](registro_id=registro_id).get_json()
+
+    return chamar, execucoes
+
+def test_entradas_ficam_em_cache(rotas_em_cache):
+    chamar, execucoes = rotas_em_cache
+    assert chamar('produto', 'a') == {'id': 'a'}
+    assert chamar('produto', 'a') == {'id': 'a'}
+    assert execucoes == [('produto', 'a')]
+
+def test_alterar_um_produto_invalida_apenas_a_sua_entrada(modulo_app, cliente_admin, rotas_em_cache):
+    chamar, execucoes = rotas_em_cache
+    produto = cliente_admin.post('/api/produtos', json={
+        'nome': 'Com tag', 'descricao': 'd', 'preco': 1.0, 'quantidade_estoque': 1
+    }).get_json()['id']
+    for tipo, registro_id in (('produto', produto), ('produto', 'outro'), ('pedido', '1')):
+        chamar(tipo, registro_id)
+    del execucoes[:]
+
+    assert cliente_admin.put(f'/api/produtos/{produto}', json={'preco': 2.0}).status_code == 200
+    for tipo, registro_id in (('produto', produto), ('produto', 'outro'), ('pedido', '1')):
+        chamar(tipo, registro_id)
+    assert execucoes == [('produto', produto)]
+
+def test_gravacao_completa_de_produtos_nao_invalida_pedidos(modulo_app, rotas_em_cache):
+    chamar, execucoes = rotas_em_cache
+    for tipo, registro_id in (('produto', 'x'), ('produto', 'y'), ('pedido', '2')):
+        chamar(tipo, registro_id)
+    del execucoes[:]
+
+    modulo_app._invalidar_cache_colecao('produtos')
+    for tipo, registro_id in (('produto', 'x'), ('produto', 'y'), ('pedido', '2')):
+        chamar(tipo, registro_id)
+    assert execucoes == [('produto', 'x'), ('produto', 'y')]
+
+    modulo_app.invalidar_tags('pedidos')
+    chamar('pedido', '2')
+    chamar('produto', 'x')
+    assert execucoes[2:] == [('pedido', '2')]
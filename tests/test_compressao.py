@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da compressão das respostas conforme o Accept-Encoding"""
+import gzip
+import json
+import pytest
+
+@pytest.fixture
+def lista_grande(modulo_app, cliente_admin, monkeypatch):
+    """Garante que a lista de produtos passe do tamanho mínimo de compressão"""
+    monkeypatch.setattr(modulo_app, 'brotli', None)
+    while len(cliente_admin.get('/api/produtos').get_data()) < modulo_app.COMPRESSAO_MINIMO:
+        cliente_admin.post('/api/produtos', json={
+            'nome': 'Produto para compressão', 'descricao': 'x' * 200, 'preco': 1.0, 'quantidade_estoque': 1
+        })
+
+def test_comprime_com_gzip_quando_aceito(cliente, lista_grande):
+    original = cliente.get('/api/produtos')
+    resposta = cliente.get('/api/produtos', headers={'Accept-Encoding': 'gzip'})
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resposta.headers['Vary']
+    assert json.loads(gzip.decompress(resposta.get_data())) == original.get_json()
+    # A ETag forte do conteúdo original passa a ser fraca na versão comprimida
+    if original.headers.get('ETag', '').startswith('"'):
+        assert resposta.headers['ETag'] == 'W/' + original.headers['ETag']
+
+def test_sem_accept_encoding_nao_comprime(cliente, lista_grande):
+    for cabecalhos in ({}, {'Accept-Encoding': 'identity'}, {'Accept-Encoding': 'gzip;q=0'}):
+        resposta = cliente.get('/api/produtos', headers=cabecalhos)
+        assert 'Content-Encoding' not in resposta.headers
+        resposta.get_json()
+        # O Vary também vai na resposta sem compressão, para que caches não a sirvam a quem aceita gzip
+        assert 'Accept-Encoding' in resposta.headers['Vary']
+
+def test_corpo_pequeno_nao_e_comprimido(modulo_app, cliente_admin):
+    produto = cliente_admin.post('/api/produtos', json={
+        'nome': 'Pequeno', 'descricao': 'd', 'preco': 1.0, 'quantidade_estoque': 1
+    }).get_json()['id']
+    resposta = cliente_admin.get(f'/api/produtos/{produto}', headers={'Accept-Encoding': 'gzip'})
+    assert len(resposta.get_data()) < modulo_app.COMPRESSAO_MINIMO
+    assert 'Content-Encoding' not in resposta.headers
+    assert resposta.get_json()['id'] == produto
+
+def test_tipos_nao_comprimiveis_ficam_intactos(modulo_app):
+    with modulo_app.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        resposta = modulo_app.app.response_class(b'\x89PNG' * 1000, mimetype='image/png')
+        resposta = modulo_app.comprimir_resposta(resposta)
+    assert 'Content-Encoding' not in resposta.headers and 'Vary' not in resposta.headers
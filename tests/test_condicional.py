@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes das requisições condicionais (ETag / Last-Modified e 304) nas APIs de leitura"""
+import pytest
+
+def criar_produto(cliente):
+    return cliente.post('/api/produtos', json={
+        'nome': 'Produto condicional', 'descricao': 'd', 'preco': 1.0, 'quantidade_estoque': 100
+    })
+
+@pytest.mark.parametrize('url', ['/api/produtos', '/api/pedidos'])
+def test_colecao_responde_304_com_etag_atual(cliente, url):
+    resposta = cliente.get(url)
+    etag = resposta.headers['ETag']
+    assert resposta.status_code == 200
+    assert etag.startswith('W/')
+    assert resposta.headers['Cache-Control'] == 'no-cache'
+    modificado_em = resposta.headers['Last-Modified']
+
+    resposta = cliente.get(url, headers={'If-None-Match': etag})
+    assert resposta.status_code == 304 and resposta.data == b''
+    assert resposta.headers['ETag'] == etag
+    # A versão é da coleção: vale para qualquer página, filtro ou codificação
+    assert cliente.get(url + '?limite=1', headers={'If-None-Match': etag}).status_code == 304
+    assert cliente.get(url, headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'}).status_code == 304
+    assert cliente.get(url, headers={'If-None-Match': 'W/"outra"'}).status_code == 200
+
+    assert cliente.get(url, headers={'If-Modified-Since': modificado_em}).status_code == 304
+
+def test_alteracao_muda_a_etag_da_colecao(cliente, cliente_admin, produto_com_estoque):
+    etags = {url: cliente.get(url).headers['ETag'] for url in ('/api/produtos', '/api/pedidos')}
+
+    assert criar_produto(cliente_admin).status_code == 201
+    resposta = cliente.get('/api/produtos', headers={'If-None-Match': etags['/api/produtos']})
+    assert resposta.status_code == 200 and resposta.headers['ETag'] != etags['/api/produtos']
+
+    resposta = cliente_admin.post('/api/pedidos', json={
+        'produtos': [{'id': produto_com_estoque, 'quantidade': 1}],
+        'cliente_nome': 'a', 'cliente_telefone': '11', 'cliente_endereco': 'r'
+    })
+    assert resposta.status_code == 200
+    resposta = cliente.get('/api/pedidos', headers={'If-None-Match': etags['/api/pedidos']})
+    assert resposta.status_code == 200 and resposta.headers['ETag'] != etags['/api/pedidos']
+
+def test_304_da_colecao_nao_executa_a_consulta(modulo_app, cliente, monkeypatch):
+    etag = cliente.get('/api/pedidos').headers['ETag']
+
+    def falhar(*args, **kwargs):
+        raise AssertionError('a consulta não deveria ser executada')
+    monkeypatch.setattr(modulo_app.catalogo, 'consultar_pedidos', falhar)
+    assert cliente.get('/api/pedidos?limite=5', headers={'If-None-Match': etag}).status_code == 304
+
+def test_produto_responde_304_e_muda_ao_alterar(cliente, cliente_admin):
+    produto_id = criar_produto(cliente_admin).get_json()['id']
+    url = f'/api/produtos/{produto_id}'
+
+    resposta = cliente.get(url)
+    etag = resposta.headers['ETag']
+    assert resposta.status_code == 200 and not etag.startswith('W/')
+    resposta = cliente.get(url, headers={'If-None-Match': etag})
+    assert resposta.status_code == 304 and resposta.data == b''
+
+    assert cliente_admin.put(url, json={'preco': 2.5}).status_code == 200
+    resposta = cliente.get(url, headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.get_json()['preco'] == 2.5 and resposta.headers['ETag'] != etag
+
+def test_produto_inexistente_nao_e_condicional(cliente):
+    resposta = cliente.get('/api/produtos/inexistente', headers={'If-None-Match': '*'})
+    assert resposta.status_code == 404
+    assert 'ETag' not in resposta.headers
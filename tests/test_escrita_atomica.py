@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da gravação atômica de arquivos e da política de fsync"""
+import os
+import pytest
+import utils
+from utils import escrever_arquivo_atomico
+
+def test_grava_e_substitui_preservando_permissoes(tmp_path):
+    arquivo = tmp_path / 'dados.json'
+    escrever_arquivo_atomico(str(arquivo), '{"a": 1}')
+    assert arquivo.read_text(encoding='utf-8') == '{"a": 1}'
+
+    os.chmod(arquivo, 0o640)
+    escrever_arquivo_atomico(str(arquivo), 'ção')
+    assert arquivo.read_text(encoding='utf-8') == 'ção'
+    assert os.stat(arquivo).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ['dados.json']
+
+def test_falha_no_meio_da_gravacao_mantem_o_original(tmp_path, monkeypatch):
+    arquivo = tmp_path / 'dados.json'
+    arquivo.write_text('original', encoding='utf-8')
+
+    def falhar(fd):
+        raise OSError('disco cheio')
+    monkeypatch.setattr(os, 'fsync', falhar)
+    with pytest.raises(OSError, match='disco cheio'):
+        escrever_arquivo_atomico(str(arquivo), 'novo conteúdo', fsync='always')
+    assert arquivo.read_text(encoding='utf-8') == 'original'
+    assert os.listdir(tmp_path) == ['dados.json']
+
+def test_falha_ao_renomear_nao_deixa_temporario(tmp_path, monkeypatch):
+    arquivo = tmp_path / 'dados.json'
+    arquivo.write_text('original', encoding='utf-8')
+
+    def falhar(origem, destino):
+        raise KeyboardInterrupt()
+    monkeypatch.setattr(os, 'replace', falhar)
+    with pytest.raises(KeyboardInterrupt):
+        escrever_arquivo_atomico(str(arquivo), 'novo conteúdo', fsync='never')
+    assert arquivo.read_text(encoding='utf-8') == 'original'
+    assert os.listdir(tmp_path) == ['dados.json']
+
+def test_politica_de_fsync(tmp_path, monkeypatch):
+    chamadas = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, 'fsync', lambda fd: (chamadas.append(fd), fsync(fd)))
+    arquivo = str(tmp_path / 'dados.json')
+
+    escrever_arquivo_atomico(arquivo, 'a', fsync='never')
+    assert chamadas == []
+    escrever_arquivo_atomico(arquivo, 'b', fsync='always')
+    assert len(chamadas) == 2  # arquivo e diretório
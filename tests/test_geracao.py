@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes do bloqueio entre processos e do número de geração dos arquivos de dados"""
+import multiprocessing
+from utils import bloqueio_arquivo, incrementar_geracao, ler_geracao
+
+INCREMENTOS = 300
+
+def incrementar_varias_vezes(arquivo, vezes):
+    for _ in range(vezes):
+        incrementar_geracao(arquivo)
+
+def test_dois_processos_nao_perdem_incrementos(tmp_path):
+    arquivo = str(tmp_path / 'produtos.json')
+    contexto = multiprocessing.get_context('spawn')
+    processos = [contexto.Process(target=incrementar_varias_vezes, args=(arquivo, INCREMENTOS)) for _ in range(2)]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(120)
+        assert processo.exitcode == 0
+    assert ler_geracao(arquivo) == 2 * INCREMENTOS
+
+def test_incremento_dentro_do_bloqueio_nao_espera(tmp_path):
+    arquivo = str(tmp_path / 'pedidos.json')
+    assert ler_geracao(arquivo) == 0
+    with bloqueio_arquivo(arquivo):
+        assert incrementar_geracao(arquivo) == 1
+        assert incrementar_geracao(arquivo) == 2
+    assert ler_geracao(arquivo) == 2
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da gravação agrupada (group commit) de coleções"""
+import threading
+from types import SimpleNamespace
+from armazenamento import GravadorAgrupado
+
+class Gravacoes:
+    """Registra as chamadas de gravação; falha nas primeiras `falhas` chamadas"""
+    def __init__(self, falhas=0):
+        self.chamadas = []
+        self.falhas = falhas
+        self.gravou = threading.Event()
+
+    def __call__(self, colecao, alterados, removidos):
+        self.chamadas.append((colecao, None if alterados is None else sorted(o.id for o in alterados),
+                              None if removidos is None else sorted(removidos)))
+        self.gravou.set()
+        if self.falhas:
+            self.falhas -= 1
+            return False
+        return True
+
+def registro(registro_id):
+    return SimpleNamespace(id=registro_id)
+
+def test_marcar_e_descarregar_grava_uma_vez_coalescendo():
+    gravacoes = Gravacoes()
+    gravador = GravadorAgrupado(gravacoes, intervalo=3600)
+    gravador.marcar('produtos', [registro('1'), registro('2')])
+    gravador.marcar('produtos', [registro('1')])
+    gravador.marcar('produtos', removidos=['2'])
+    gravador.marcar('pedidos', [registro('9')])
+    assert gravador.pendente('produtos') and gravacoes.chamadas == []
+
+    gravador.descarregar(['produtos'])
+    assert gravacoes.chamadas == [('produtos', ['1'], ['2'])]
+    assert not gravador.pendente('produtos') and gravador.pendente('pedidos')
+
+    gravador.descarregar(['produtos'])
+    gravador.parar()
+    gravador.parar()
+    assert gravacoes.chamadas == [('produtos', ['1'], ['2']), ('pedidos', ['9'], [])]
+
+def test_parar_grava_pendentes_uma_vez():
+    gravacoes = Gravacoes()
+    gravador = GravadorAgrupado(gravacoes, intervalo=3600)
+    gravador.marcar('produtos', [registro('1')])
+    gravador.marcar('produtos')  # gravação completa prevalece
+    gravador.parar()
+    assert gravacoes.chamadas == [('produtos', None, None)]
+    gravador.descarregar()
+    assert len(gravacoes.chamadas) == 1
+
+def test_falha_devolve_as_alteracoes_para_a_proxima_tentativa():
+    gravacoes = Gravacoes(falhas=1)
+    gravador = GravadorAgrupado(gravacoes, intervalo=3600)
+    gravador.marcar('produtos', [registro('1')])
+    gravador.descarregar()
+    assert gravador.pendente('produtos')
+    gravador.descarregar()
+    assert gravacoes.chamadas == [('produtos', ['1'], []), ('produtos', ['1'], [])]
+    assert not gravador.pendente('produtos')
+    gravador.parar()
+
+def test_thread_grava_ao_atingir_max_pendentes():
+    gravacoes = Gravacoes()
+    gravador = GravadorAgrupado(gravacoes, intervalo=3600, max_pendentes=3)
+    for i in range(3):
+        gravador.marcar('produtos', [registro(str(i))])
+    assert gravacoes.gravou.wait(5)
+    gravador.parar()
+    assert gravacoes.chamadas == [('produtos', ['0', '1', '2'], [])]
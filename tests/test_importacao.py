@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da importação e exportação de produtos em lote (CSV e JSONL)"""
+import io
+import csv
+import json
+
+def importar(cliente, texto, **kwargs):
+    return cliente.post('/api/produtos/importar', data=texto.encode('utf-8'), **kwargs)
+
+def test_importacao_exige_gerente(cliente):
+    resposta = importar(cliente, '{"nome": "x"}\n', content_type='application/x-ndjson')
+    assert resposta.status_code in (302, 401, 403)
+
+def test_importar_jsonl_cria_produtos_com_um_salvamento(modulo_app, cliente_admin, monkeypatch):
+    salvamentos = []
+    salvar = modulo_app.salvar_produtos
+    monkeypatch.setattr(modulo_app, 'salvar_produtos', lambda **k: (salvamentos.append(k), salvar(**k))[1])
+    total = len(modulo_app.catalogo.produtos)
+
+    linhas = '\n'.join(json.dumps({'nome': f'Lote {i}', 'descricao': 'd', 'preco': i, 'quantidade_estoque': i})
+                       for i in range(50))
+    resposta = importar(cliente_admin, linhas, content_type='application/x-ndjson')
+    assert resposta.get_json() == {'criados': 50, 'atualizados': 0, 'inalterados': 0}
+    assert len(salvamentos) == 1
+    assert len(modulo_app.catalogo.produtos) == total + 50
+    assert modulo_app.catalogo.buscar_produtos('lote 49')[0][0]['nome'] == 'Lote 49'
+
+def test_linha_invalida_cancela_toda_a_importacao(modulo_app, cliente_admin):
+    total = len(modulo_app.catalogo.produtos)
+    texto = ('{"nome": "ok", "descricao": "d", "preco": 1}\n'
+             '{"nome": "x", "descricao": "d", "preco": -1}\n'
+             'não é json\n')
+    resposta = importar(cliente_admin, texto + '\n', query_string={'formato': 'jsonl'})
+    assert resposta.status_code == 400
+    assert [erro['linha'] for erro in resposta.get_json()['erros']] == [2, 3]
+    assert len(modulo_app.catalogo.produtos) == total
+
+def test_importar_csv_com_bom_atualiza_e_cria(modulo_app, cliente_admin):
+    existente = modulo_app.catalogo.produtos[0]
+    texto = ('﻿id,nome,descricao,preco,quantidade_estoque\n'
+             f'{existente.id},,,9.5,\n'
+             ',Novo pelo CSV,"Descrição, com vírgula",3,4\n'
+             'importado-1,Com ID novo,d,2,1\n')
+    resposta = cliente_admin.post('/api/produtos/importar', content_type='multipart/form-data',
+                                  data={'arquivo': (io.BytesIO(texto.encode('utf-8')), 'produtos.csv')})
+    assert resposta.get_json() == {'criados': 2, 'atualizados': 1, 'inalterados': 0}
+
+    atualizado = modulo_app.catalogo.buscar_produto(existente.id)
+    assert atualizado.preco == 9.5 and atualizado.nome  # colunas vazias mantêm o valor atual
+    assert modulo_app.catalogo.buscar_produto('importado-1').nome == 'Com ID novo'
+    novo = modulo_app.catalogo.buscar_produtos('novo pelo csv')[0][0]
+    assert novo['descricao'] == 'Descrição, com vírgula'
+
+def test_exportacao_importada_reproduz_o_catalogo(modulo_app, cliente_admin):
+    exportado = cliente_admin.get('/api/produtos/exportar?formato=csv').data
+    linhas = list(csv.DictReader(io.StringIO(exportado.decode('utf-8'))))
+    assert len(linhas) == len(modulo_app.catalogo.produtos)
+
+    catalogo = modulo_app.catalogo
+    with catalogo._trava:
+        originais = catalogo.produtos
+        catalogo.produtos = []
+        catalogo._indexar_produtos()
+    try:
+        resposta = importar(cliente_admin, exportado.decode('utf-8'), query_string={'formato': 'csv'})
+        assert resposta.get_json() == {'criados': len(linhas), 'atualizados': 0, 'inalterados': 0}
+        assert sorted(p.id for p in catalogo.produtos) == sorted(l['id'] for l in linhas)
+        for original in originais:
+            importado = catalogo.buscar_produto(original.id)
+            assert (importado.nome, importado.preco, importado.quantidade_estoque) == \
+                (original.nome, original.preco, original.quantidade_estoque)
+    finally:
+        with catalogo._trava:
+            catalogo.produtos = originais
+            catalogo._indexar_produtos()
+        modulo_app.salvar_produtos()
+
+def test_reimportar_exportacao_nao_toca_produtos_inalterados(modulo_app, cliente_admin, monkeypatch):
+    catalogo = modulo_app.catalogo
+    alterado = catalogo.produtos[0]
+    datas = {p.id: p.data_atualizacao for p in catalogo.produtos}
+    linhas = cliente_admin.get('/api/produtos/exportar?formato=jsonl').data.decode('utf-8').splitlines()
+    registros = [json.loads(l) for l in linhas]
+    registros[0]['preco'] = alterado.preco + 1
+
+    salvamentos = []
+    salvar = modulo_app.salvar_produtos
+    monkeypatch.setattr(modulo_app, 'salvar_produtos', lambda **k: (salvamentos.append(k), salvar(**k))[1])
+    texto = '\n'.join(json.dumps(r) for r in registros)
+    resposta = importar(cliente_admin, texto, content_type='application/x-ndjson')
+    assert resposta.get_json() == {'criados': 0, 'atualizados': 1, 'inalterados': len(registros) - 1}
+    # Só o produto alterado é gravado e ganha nova data de atualização
+    assert [p.id for p in salvamentos[0]['alterados']] == [alterado.id]
+    assert all(p.data_atualizacao == datas[p.id] for p in catalogo.produtos if p is not alterado)
+
+    # Reimportar o mesmo arquivo não altera nada, nem a ETag
+    etag = cliente_admin.get(f'/api/produtos/{alterado.id}').headers['ETag']
+    resposta = importar(cliente_admin, texto, content_type='application/x-ndjson')
+    assert resposta.get_json() == {'criados': 0, 'atualizados': 0, 'inalterados': len(registros)}
+    assert len(salvamentos) == 1
+    assert cliente_admin.get(f'/api/produtos/{alterado.id}').headers['ETag'] == etag
+
+def test_exportar_jsonl_e_formato_invalido(modulo_app, cliente_admin):
+    linhas = cliente_admin.get('/api/produtos/exportar?formato=jsonl').data.decode('utf-8').splitlines()
+    assert [json.loads(l)['id'] for l in linhas] == [p.id for p in modulo_app.catalogo.produtos]
+    assert cliente_admin.get('/api/produtos/exportar?formato=xml').status_code == 400
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da reindexação do catálogo ao recarregar uma coleção"""
+
+def indices(catalogo):
+    return {
+        'produtos': (catalogo._produtos_por_id, catalogo._produtos_ordenados, catalogo._indice_busca),
+        'pedidos': (catalogo._pedidos_por_id, catalogo._pedidos_ordenados),
+        'usuarios': (catalogo._usuarios_por_id, catalogo._usuarios_por_email),
+    }
+
+def test_recarregar_uma_colecao_reindexa_apenas_ela(modulo_app):
+    catalogo = modulo_app.catalogo
+    for colecao, carregar in (('produtos', modulo_app.carregar_produtos),
+                              ('pedidos', modulo_app.carregar_pedidos),
+                              ('usuarios', modulo_app.carregar_usuarios)):
+        antes = indices(catalogo)
+        assert carregar()
+        depois = indices(catalogo)
+        for outra, objetos in antes.items():
+            mesmos = all(a is d for a, d in zip(objetos, depois[outra]))
+            assert mesmos == (outra != colecao), (colecao, outra)
+
+def test_indices_reconstruidos_refletem_as_listas(modulo_app, cliente_admin, produto_com_estoque):
+    catalogo = modulo_app.catalogo
+    assert modulo_app.carregar_produtos() and modulo_app.carregar_pedidos() and modulo_app.carregar_usuarios()
+    assert set(catalogo._produtos_por_id) == {p.id for p in catalogo.produtos}
+    assert catalogo.buscar_produto(produto_com_estoque).nome == 'Produto de teste'
+    assert all(len(entradas) == len(catalogo.produtos) for entradas in catalogo._produtos_ordenados.values())
+    assert set(catalogo._pedidos_por_id) == {p.id for p in catalogo.pedidos}
+    assert all(len(entradas) == len(catalogo.pedidos) for entradas in catalogo._pedidos_ordenados.values())
+    assert catalogo._usuarios_por_email['admin@vortex.com'].nome == 'Administrador'
+    # Os contadores de ID continuam depois do maior ID carregado
+    maior = max(int(p.id) for p in catalogo.produtos if p.id.isdigit())
+    assert modulo_app.Produto._ultimo_id >= maior
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes do journal de eventos de pedidos: reaplicação ao carregar e compactação"""
+import json
+import pytest
+from utils import ler_jsonl
+
+@pytest.fixture
+def journal_vazio(modulo_app, monkeypatch):
+    """Começa de um snapshot completo, com o journal vazio e sem compactação automática"""
+    assert modulo_app._journal_ativo()
+    monkeypatch.setattr(modulo_app, 'JOURNAL_COMPACTAR_A_CADA', 1000)
+    assert modulo_app.salvar_pedidos()
+    assert ler_jsonl(modulo_app.PEDIDOS_JOURNAL_FILE) == []
+    return modulo_app.PEDIDOS_JOURNAL_FILE
+
+def criar_pedido(cliente, produto_id, quantidade=1):
+    resposta = cliente.post('/api/pedidos', json={
+        'produtos': [{'id': produto_id, 'quantidade': quantidade}],
+        'cliente_nome': 'Cliente do journal', 'cliente_telefone': '11', 'cliente_endereco': 'rua'
+    })
+    assert resposta.status_code == 200, resposta.get_json()
+    return resposta.get_json()['id']
+
+def pedidos_em_memoria(modulo_app):
+    return sorted((p.to_dict() for p in modulo_app.catalogo.pedidos), key=lambda p: p['id'])
+
+def ids_no_snapshot(modulo_app):
+    return {p['id'] for p in modulo_app.armazenamento.carregar('pedidos')}
+
+def test_eventos_vao_para_o_journal_e_sao_reaplicados(modulo_app, cliente_admin, produto_com_estoque, journal_vazio):
+    primeiro = criar_pedido(cliente_admin, produto_com_estoque)
+    segundo = criar_pedido(cliente_admin, produto_com_estoque, 2)
+    for pedido_id in (primeiro, segundo):
+        assert cliente_admin.put(f'/api/pedidos/{pedido_id}/status').status_code == 200
+    # Só pedidos concluídos podem ser excluídos
+    assert cliente_admin.delete(f'/api/pedidos/{segundo}').status_code == 200
+
+    eventos = ler_jsonl(journal_vazio)
+    assert [e['op'] for e in eventos] == ['criar', 'criar', 'status', 'status', 'excluir']
+    # O snapshot não foi regravado: os pedidos novos só existem no journal
+    assert primeiro not in ids_no_snapshot(modulo_app)
+
+    # Simula um reinício: snapshot + journal reproduzem o estado em memória
+    esperado = pedidos_em_memoria(modulo_app)
+    assert modulo_app.carregar_pedidos()
+    assert pedidos_em_memoria(modulo_app) == esperado
+    assert modulo_app.catalogo._obter_pedido_obj(primeiro).status == 'Concluído'
+    assert modulo_app.catalogo._obter_pedido_obj(segundo) is None
+    assert modulo_app._eventos_journal_pendentes == 5
+
+def test_reaplicar_evento_repetido_e_idempotente(modulo_app, cliente_admin, produto_com_estoque, journal_vazio):
+    pedido_id = criar_pedido(cliente_admin, produto_com_estoque)
+    with open(journal_vazio, 'r', encoding='utf-8') as arquivo:
+        linha = arquivo.readline()
+    # Repete o evento de criação e acrescenta uma última linha truncada (queda durante a escrita)
+    with open(journal_vazio, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(linha)
+        arquivo.write(linha[:len(linha) // 2])
+
+    assert modulo_app.carregar_pedidos()
+    ids = [p.id for p in modulo_app.catalogo.pedidos]
+    assert ids.count(pedido_id) == 1
+    assert len(modulo_app.catalogo._pedidos_por_id) == len(ids)
+
+def test_compactacao_grava_snapshot_e_esvazia_journal(modulo_app, cliente_admin, produto_com_estoque,
+                                                      journal_vazio, monkeypatch):
+    monkeypatch.setattr(modulo_app, 'JOURNAL_COMPACTAR_A_CADA', 3)
+    criados = [criar_pedido(cliente_admin, produto_com_estoque) for _ in range(2)]
+    assert len(ler_jsonl(journal_vazio)) == 2
+    assert not set(criados) & ids_no_snapshot(modulo_app)
+
+    criados.append(criar_pedido(cliente_admin, produto_com_estoque))
+    assert ler_jsonl(journal_vazio) == []
+    assert modulo_app._eventos_journal_pendentes == 0
+    assert set(criados) <= ids_no_snapshot(modulo_app)
+
+    esperado = pedidos_em_memoria(modulo_app)
+    assert modulo_app.carregar_pedidos()
+    assert pedidos_em_memoria(modulo_app) == esperado
+
+def test_evento_desconhecido_e_ignorado(modulo_app, journal_vazio):
+    esperado = pedidos_em_memoria(modulo_app)
+    with open(journal_vazio, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(json.dumps({'op': 'inexistente', 'id': 'x'}) + '\n')
+    assert modulo_app.carregar_pedidos()
+    assert pedidos_em_memoria(modulo_app) == esperado
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes do limite de tentativas de login"""
+import pytest
+from conftest import ADMIN
+from utils import CacheCredenciais
+
+@pytest.fixture
+def limite_credencial(modulo_app, monkeypatch):
+    """Permite 2 tentativas por credencial e conta as verificações de senha"""
+    monkeypatch.setattr(modulo_app, 'limitador_login_credencial', modulo_app.LimitadorTaxa(2, 300))
+    verificacoes = []
+    autenticar = modulo_app.catalogo.autenticar_usuario
+    monkeypatch.setattr(modulo_app.catalogo, 'autenticar_usuario',
+                        lambda *args, **kwargs: (verificacoes.append(args[0]), autenticar(*args, **kwargs))[1])
+    return verificacoes
+
+def test_limitador_recarrega_ao_longo_da_janela(modulo_app, monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr('time.monotonic', lambda: agora[0])
+    limitador = modulo_app.LimitadorTaxa(2, 60)
+    assert limitador.consumir('a') == 0 and limitador.consumir('a') == 0
+    assert limitador.consumir('a') == pytest.approx(30)
+    assert limitador.consumir('b') == 0  # chaves independentes
+
+    agora[0] += 30
+    assert limitador.consumir('a') == 0
+    limitador.liberar('a')
+    assert limitador.consumir('a') == 0 and limitador.consumir('a') == 0
+
+def test_limitador_descarta_chaves_antigas(modulo_app):
+    limitador = modulo_app.LimitadorTaxa(1, 60, max_chaves=2)
+    for chave in ('a', 'b', 'c'):
+        assert limitador.consumir(chave) == 0
+    # 'a' foi descartada e volta com todas as tentativas
+    assert limitador.consumir('a') == 0
+    assert limitador.consumir('c') > 0
+
+def test_excesso_de_tentativas_responde_429_sem_bcrypt(cliente, limite_credencial):
+    dados = {'credencial': 'ADMIN@vortex.com ', 'senha': 'errada'}
+    for _ in range(2):
+        assert cliente.post('/login', data=dados).status_code == 200
+    resposta = cliente.post('/login', data=dados)
+    assert resposta.status_code == 429
+    assert int(resposta.headers['Retry-After']) >= 1
+    assert len(limite_credencial) == 2
+    # A chave é a credencial normalizada: a senha certa também fica bloqueada
+    assert cliente.post('/login', data=ADMIN).status_code == 429
+
+def test_login_bem_sucedido_libera_a_credencial(modulo_app, limite_credencial):
+    cliente = modulo_app.app.test_client()
+    assert cliente.post('/login', data={**ADMIN, 'senha': 'errada'}).status_code == 200
+    assert cliente.post('/login', data=ADMIN).status_code == 302
+    cliente.get('/logout')
+    for _ in range(2):
+        assert cliente.post('/login', data={**ADMIN, 'senha': 'errada'}).status_code == 200
+
+def test_fila_de_senhas_cheia_responde_503(modulo_app, cliente, monkeypatch):
+    def cheia(*args, **kwargs):
+        raise modulo_app.FilaSenhasCheia()
+    monkeypatch.setattr(modulo_app.catalogo, 'autenticar_usuario', cheia)
+    resposta = cliente.post('/login', data=ADMIN)
+    assert resposta.status_code == 503 and resposta.headers['Retry-After'] == '1'
+
+def test_cache_de_senhas_desativado_por_padrao(modulo_app, monkeypatch):
+    verificacoes = []
+    verificar = modulo_app.Usuario.verificar_senha
+    monkeypatch.setattr(modulo_app.Usuario, 'verificar_senha',
+                        lambda self, senha: (verificacoes.append(self.id), verificar(self, senha))[1])
+    assert modulo_app.catalogo._credenciais_verificadas.ttl == 0
+
+    def logar():
+        cliente = modulo_app.app.test_client()
+        assert cliente.post('/login', data=ADMIN).status_code == 302
+    logar()
+    logar()
+    assert len(verificacoes) == 2
+
+    # Ligado (LOGIN_CACHE_SEGUNDOS), o segundo login com a mesma senha dispensa o bcrypt
+    monkeypatch.setattr(modulo_app.catalogo, '_credenciais_verificadas', CacheCredenciais(ttl=60))
+    logar()
+    logar()
+    assert len(verificacoes) == 3
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da amostragem de logs repetitivos"""
+import logging
+import threading
+from utils import FiltroAmostragem
+
+def registro(mensagem, amostrar=True):
+    item = logging.LogRecord('main', logging.DEBUG, __file__, 1, mensagem, None, None)
+    if amostrar:
+        item.amostrar = True
+    return item
+
+def test_amostragem_por_mensagem():
+    filtro = FiltroAmostragem(a_cada=3)
+    assert [filtro.filter(registro('a')) for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert filtro.filter(registro('b'))
+    assert all(filtro.filter(registro('a', amostrar=False)) for _ in range(5))
+
+def test_amostragem_exata_com_varias_threads():
+    filtro = FiltroAmostragem(a_cada=10)
+    aprovados = []
+    barreira = threading.Barrier(8)
+
+    def registrar():
+        barreira.wait()
+        aprovados.append(sum(filtro.filter(registro('item carregado')) for _ in range(5000)))
+    threads = [threading.Thread(target=registrar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(aprovados) == 8 * 5000 // 10
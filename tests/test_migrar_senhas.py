@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da migração de senhas em lote (retomável)"""
+import os
+import json
+import hashlib
+import importlib
+import pytest
+
+def hash_antigo(senha, salt):
+    return salt + hashlib.sha256(salt.encode() + senha.encode()).hexdigest()
+
+@pytest.fixture
+def migrar_senhas(tmp_path, monkeypatch):
+    """Importa o script no diretório temporário (ele cria o log no diretório atual)"""
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('migrar_senhas')
+
+@pytest.fixture
+def arquivo_usuarios(tmp_path):
+    usuarios = [
+        {'id': str(i), 'email': f'u{i}@vortex.com', 'senha_hash': hash_antigo('qualquer', f'{i:032d}')}
+        for i in range(1, 5)
+    ]
+    usuarios.append({'id': '5', 'email': 'bcrypt@vortex.com', 'senha_hash': '$2b$04$jaMigrado'})
+    arquivo = tmp_path / 'usuarios.json'
+    arquivo.write_text(json.dumps({'usuarios': usuarios}), encoding='utf-8')
+    return arquivo
+
+@pytest.fixture
+def lotes_gerados(migrar_senhas, monkeypatch):
+    """Substitui o pool de processos por um executor local que registra os lotes enviados"""
+    lotes = []
+
+    class ExecutorLocal:
+        def __init__(self, max_workers=None):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *excecao):
+            return False
+
+        def map(self, funcao, entradas):
+            for lote in entradas:
+                lotes.append([tarefa[0] for tarefa in lote])
+                yield funcao(lote)
+
+    monkeypatch.setattr(migrar_senhas, 'ProcessPoolExecutor', ExecutorLocal)
+    return lotes
+
+def test_migracao_interrompida_retoma_sem_gerar_hash_de_novo(migrar_senhas, arquivo_usuarios, lotes_gerados,
+                                                            monkeypatch):
+    original = arquivo_usuarios.read_text(encoding='utf-8')
+    progresso = f'{arquivo_usuarios}.migracao'
+
+    # Interrompe depois de dois lotes registrados no arquivo de progresso
+    anexar_jsonl = migrar_senhas.anexar_jsonl
+    anexados = []
+
+    def interromper(arquivo, registro):
+        if len(anexados) == 2:
+            raise KeyboardInterrupt()
+        anexados.append(registro)
+        anexar_jsonl(arquivo, registro)
+    monkeypatch.setattr(migrar_senhas, 'anexar_jsonl', interromper)
+    with pytest.raises(KeyboardInterrupt):
+        migrar_senhas.migrar_senhas_lote(processos=1, tamanho_lote=1, arquivo=str(arquivo_usuarios))
+    assert arquivo_usuarios.read_text(encoding='utf-8') == original
+    gerados = {chave: novo for registro in anexados for chave, _, novo in registro['hashes']}
+    assert sorted(gerados) == ['1', '2']
+
+    monkeypatch.setattr(migrar_senhas, 'anexar_jsonl', anexar_jsonl)
+    del lotes_gerados[:]
+    assert migrar_senhas.migrar_senhas_lote(processos=1, tamanho_lote=1, arquivo=str(arquivo_usuarios))
+    # Apenas os usuários que faltavam foram enviados ao bcrypt
+    assert lotes_gerados == [['3'], ['4']]
+
+    usuarios = {u['id']: u['senha_hash'] for u in json.loads(arquivo_usuarios.read_text(encoding='utf-8'))['usuarios']}
+    assert usuarios['1'] == gerados['1'] and usuarios['2'] == gerados['2']
+    assert all(h.startswith('$2b$') for h in usuarios.values())
+    assert usuarios['5'] == '$2b$04$jaMigrado'
+    assert not os.path.exists(progresso)
+
+def test_hash_antigo_alterado_depois_da_interrupcao_e_gerado_de_novo(migrar_senhas, arquivo_usuarios,
+                                                                    lotes_gerados):
+    progresso = f'{arquivo_usuarios}.migracao'
+    dados = json.loads(arquivo_usuarios.read_text(encoding='utf-8'))
+    # Progresso de uma execução anterior, com uma última linha cortada pela queda
+    with open(progresso, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(json.dumps({'hashes': [['1', dados['usuarios'][0]['senha_hash'], '$2b$04$doProgresso'],
+                                             ['2', 'hash que mudou depois', '$2b$04$obsoleto']]}) + '\n')
+        arquivo.write('{"hashes": [["3"')
+
+    assert migrar_senhas.migrar_senhas_lote(processos=1, tamanho_lote=10, arquivo=str(arquivo_usuarios))
+    assert lotes_gerados == [['2', '3', '4']]
+    usuarios = {u['id']: u['senha_hash'] for u in json.loads(arquivo_usuarios.read_text(encoding='utf-8'))['usuarios']}
+    assert usuarios['1'] == '$2b$04$doProgresso'
+    assert usuarios['2'] != '$2b$04$obsoleto'
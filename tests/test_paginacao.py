@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da paginação por cursor de pedidos, produtos e da busca de produtos"""
+import random
+import pytest
+from main import Pedido
+
+STATUS = ['Pendente', 'Concluído']
+CLIENTES = ['José', 'Joao', 'Maria', 'Ana']
+
+@pytest.fixture
+def pedidos_gerados(modulo_app):
+    """Substitui os pedidos em memória por 120 pedidos determinísticos"""
+    catalogo = modulo_app.catalogo
+    sorteio = random.Random(42)
+    with catalogo._trava:
+        originais = catalogo.pedidos
+        catalogo.pedidos = []
+        catalogo._indexar_pedidos()
+        for i in range(1, 121):
+            pedido = Pedido(
+                [{'id': '1', 'quantidade': sorteio.randint(1, 5), 'preco': float(i % 7)}],
+                sorteio.choice(CLIENTES), '11', 'rua', id=str(i)
+            )
+            pedido.data_pedido = f"{(i % 28) + 1:02d}/01/2025 10:00:00"
+            pedido.status = STATUS[i % 3 == 0]
+            catalogo.pedidos.append(pedido)
+            catalogo._indexar_pedido(pedido)
+    modulo_app._registrar_assinatura('pedidos')
+    yield catalogo.pedidos
+    with catalogo._trava:
+        catalogo.pedidos = originais
+        catalogo._indexar_pedidos()
+    modulo_app._registrar_assinatura('pedidos')
+
+def percorrer(cliente, url):
+    """Segue X-Proximo-Cursor até a última página e retorna todos os itens"""
+    itens = []
+    totais = set()
+    cursor = None
+    while True:
+        separador = '&' if '?' in url else '?'
+        resposta = cliente.get(url + (f'{separador}cursor={cursor}' if cursor else ''))
+        assert resposta.status_code == 200, resposta.get_json()
+        itens += resposta.get_json()
+        if 'X-Total-Count' in resposta.headers:
+            totais.add(int(resposta.headers['X-Total-Count']))
+        cursor = resposta.headers.get('X-Proximo-Cursor')
+        if not cursor:
+            break
+    # O total pode ser omitido (filtros sem índice), mas quando vem é o mesmo em todas as páginas
+    assert totais <= {len(itens)}
+    return itens
+
+def ids_esperados(pedidos, filtro, chave, decrescente):
+    return [p.id for p in sorted(filter(filtro, pedidos), key=chave, reverse=decrescente)]
+
+def test_pedidos_sem_filtro_percorre_todas_as_paginas(cliente, pedidos_gerados):
+    for ordenacao, chave, decrescente in [
+        ('data-recente', lambda p: (p.chave_data(), int(p.id)), True),
+        ('data-antiga', lambda p: (p.chave_data(), int(p.id)), False),
+        ('valor-alto', lambda p: (p.valor_total(), int(p.id)), True),
+        ('valor-baixo', lambda p: (p.valor_total(), int(p.id)), False),
+    ]:
+        itens = percorrer(cliente, f'/api/pedidos?limite=9&ordenacao={ordenacao}')
+        assert [p['id'] for p in itens] == ids_esperados(pedidos_gerados, None, chave, decrescente)
+
+def test_pedidos_com_filtros(cliente, pedidos_gerados):
+    itens = percorrer(cliente, '/api/pedidos?limite=7&ordenacao=valor-alto&status=Pendente&cliente=jose')
+    esperado = ids_esperados(
+        pedidos_gerados, lambda p: p.status == 'Pendente' and p.cliente_nome == 'José',
+        lambda p: (p.valor_total(), int(p.id)), True
+    )
+    assert esperado and [p['id'] for p in itens] == esperado
+
+    itens = percorrer(cliente, '/api/pedidos?limite=10&ordenacao=data-antiga'
+                               '&data_inicial=2025-01-05&data_final=2025-01-10&valor_min=3')
+    esperado = ids_esperados(
+        pedidos_gerados, lambda p: '20250105' <= p.chave_data()[:8] <= '20250110' and p.valor_total() >= 3,
+        lambda p: (p.chave_data(), int(p.id)), False
+    )
+    assert esperado and [p['id'] for p in itens] == esperado
+
+def test_total_com_filtros(cliente, pedidos_gerados):
+    # Status e faixa do campo ordenado saem dos índices: total exato em todas as páginas
+    concluidos = sum(1 for p in pedidos_gerados if p.status == 'Concluído')
+    resposta = cliente.get('/api/pedidos?limite=5&status=Concluído')
+    assert resposta.headers['X-Total-Count'] == str(concluidos)
+    segunda = cliente.get(f"/api/pedidos?limite=5&status=Concluído&cursor={resposta.headers['X-Proximo-Cursor']}")
+    assert segunda.headers['X-Total-Count'] == str(concluidos)
+
+    # Filtro verificado item a item: sem total enquanto houver mais páginas
+    resposta = cliente.get('/api/pedidos?limite=5&cliente=maria')
+    assert 'X-Total-Count' not in resposta.headers and resposta.headers['X-Proximo-Cursor']
+    marias = sum(1 for p in pedidos_gerados if p.cliente_nome == 'Maria')
+    resposta = cliente.get('/api/pedidos?cliente=maria')
+    assert resposta.headers['X-Total-Count'] == str(marias)
+
+def test_indice_por_status_acompanha_alteracoes(modulo_app, cliente, pedidos_gerados):
+    catalogo = modulo_app.catalogo
+    pendente = next(p for p in pedidos_gerados if p.status == 'Pendente')
+    catalogo.atualizar_status_pedido(pendente.id, 'Concluído')
+    modulo_app._aplicar_evento_pedido({'op': 'status', 'id': pendente.id, 'status': 'Pendente'})
+    modulo_app._aplicar_evento_pedido({'op': 'status', 'id': pendente.id, 'status': 'Concluído'})
+
+    for status in ('Pendente', 'Concluído'):
+        itens = percorrer(cliente, f'/api/pedidos?limite=8&ordenacao=valor-baixo&status={status}')
+        esperado = ids_esperados(pedidos_gerados, lambda p: p.status == status,
+                                 lambda p: (p.valor_total(), int(p.id)), False)
+        assert [p['id'] for p in itens] == esperado
+    assert pendente.id in esperado
+
+    # A reconstrução completa chega aos mesmos índices
+    antes = {s: {c: list(i) for c, i in indices.items()} for s, indices in catalogo._pedidos_por_status.items()}
+    catalogo._indexar_pedidos()
+    assert catalogo._pedidos_por_status == antes
+
+def test_pedidos_sem_limite_e_parametros_invalidos(cliente, pedidos_gerados):
+    assert len(cliente.get('/api/pedidos').get_json()) == 120
+    assert cliente.get('/api/pedidos?cursor=zzz').status_code == 400
+    assert cliente.get('/api/pedidos?ordenacao=x').status_code == 400
+    assert cliente.get('/api/pedidos?limite=abc').status_code == 400
+
+def test_pedidos_pagina_segue_remocao_entre_paginas(modulo_app, cliente, pedidos_gerados):
+    primeira = cliente.get('/api/pedidos?limite=10&ordenacao=data-antiga')
+    cursor = primeira.headers['X-Proximo-Cursor']
+    vistos = [p['id'] for p in primeira.get_json()]
+
+    # Remove um pedido já visto e um ainda não visto: o cursor continua do ponto certo
+    catalogo = modulo_app.catalogo
+    restantes = ids_esperados(pedidos_gerados, None, lambda p: (p.chave_data(), int(p.id)), False)[10:]
+    with catalogo._trava:
+        for pedido_id in (vistos[0], restantes[0]):
+            pedido = catalogo._obter_pedido_obj(pedido_id)
+            catalogo.pedidos.remove(pedido)
+            catalogo._desindexar_pedido(pedido)
+    assert all(len(indice) == 118 for indice in catalogo._pedidos_ordenados.values())
+
+    segunda = cliente.get(f'/api/pedidos?limite=10&ordenacao=data-antiga&cursor={cursor}')
+    assert [p['id'] for p in segunda.get_json()] == restantes[1:11]
+
+def test_produtos_paginas_concatenadas_igualam_listagem_completa(cliente, cliente_admin):
+    for i in range(15):
+        cliente_admin.post('/api/produtos', json={
+            'nome': f'Paginado {i}', 'descricao': 'd', 'preco': float(i % 4), 'quantidade_estoque': i
+        })
+    for ordenacao, campo in [('preco', 'preco'), ('-preco', 'preco'), ('nome', None), ('-estoque', 'quantidade_estoque')]:
+        completa = cliente.get(f'/api/produtos?ordenacao={ordenacao}').get_json()
+        if campo:
+            valores = [p[campo] for p in completa]
+            assert valores == sorted(valores, reverse=ordenacao.startswith('-'))
+        paginas = percorrer(cliente, f'/api/produtos?ordenacao={ordenacao}&limite=4')
+        assert [p['id'] for p in paginas] == [p['id'] for p in completa]
+
+    assert cliente.get('/api/produtos?ordenacao=inexistente').status_code == 400
+    assert cliente.get('/api/produtos?ordenacao=preco&cursor=zzz').status_code == 400
+    pagina = cliente.get('/api/produtos?limite=2&campos=nome').get_json()
+    assert all(set(p) == {'id', 'nome'} for p in pagina)
+
+def test_busca_paginada(cliente, cliente_admin):
+    for i in range(12):
+        cliente_admin.post('/api/produtos', json={
+            'nome': f'Cadeira ergonômica {i}', 'descricao': 'escritório', 'preco': 1.0, 'quantidade_estoque': 1
+        })
+    # Busca ampla (percorre o índice ordenado) e restrita (ordena só os encontrados)
+    for termo, minimo in [('cadeira ergonomica', 12), ('ergonomica 1', 3)]:
+        completa = cliente.get(f'/api/produtos/busca?q={termo}').get_json()
+        assert len(completa) >= minimo
+        paginas = percorrer(cliente, f'/api/produtos/busca?q={termo}&limite=2')
+        assert [p['id'] for p in paginas] == [p['id'] for p in completa]
+        ultimo = completa[-1]['id']
+        assert cliente.get(f'/api/produtos/busca?q={termo}&limite=2&cursor={ultimo}').get_json() == []
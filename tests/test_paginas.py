@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes do cache das páginas renderizadas"""
+import pytest
+from conftest import ADMIN
+
+@pytest.fixture
+def renderizacoes(modulo_app, monkeypatch):
+    """Limpa o cache de páginas e conta as renderizações de template"""
+    modulo_app._cache_paginas.clear()
+    contagem = []
+    render_template = modulo_app.render_template
+
+    def contar(template, **contexto):
+        contagem.append(template)
+        return render_template(template, **contexto)
+    monkeypatch.setattr(modulo_app, 'render_template', contar)
+    return contagem
+
+def test_pagina_renderizada_uma_vez_por_usuario(cliente, renderizacoes):
+    anonima = cliente.get('/')
+    assert anonima.status_code == 200
+    assert anonima.headers['Cache-Control'] == 'private, no-cache'
+    assert cliente.get('/').get_data() == anonima.get_data()
+    assert renderizacoes == ['index.html']
+
+    # O navegador revalida com a ETag e recebe 304
+    resposta = cliente.get('/', headers={'If-None-Match': anonima.headers['ETag']})
+    assert resposta.status_code == 304
+    assert renderizacoes == ['index.html']
+
+def test_login_e_logout_trocam_a_pagina(cliente, renderizacoes):
+    anonima = cliente.get('/')
+    assert b'Administrador' not in anonima.get_data()
+
+    assert cliente.post('/login', data=ADMIN).status_code == 302
+    logada = cliente.get('/')
+    assert b'Administrador' in logada.get_data()
+    assert logada.headers['ETag'] != anonima.headers['ETag']
+    # A ETag da página anônima não vale para o usuário logado
+    assert cliente.get('/', headers={'If-None-Match': anonima.headers['ETag']}).status_code == 200
+
+    cliente.get('/logout')
+    depois = cliente.get('/')
+    assert b'Administrador' not in depois.get_data()
+    assert depois.headers['ETag'] == anonima.headers['ETag']
+    assert renderizacoes.count('index.html') == 2
+
+def test_paginas_de_usuarios_diferentes_nao_se_misturam(modulo_app, cliente_admin, cliente, renderizacoes):
+    logada = cliente_admin.get('/')
+    anonima = cliente.get('/')
+    assert logada.get_data() != anonima.get_data()
+    assert len(modulo_app._cache_paginas) == 2
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da reserva de estoque na criação de pedidos (tudo ou nada)"""
+import pytest
+
+def criar_produtos(cliente_admin, *estoques):
+    ids = []
+    for i, estoque in enumerate(estoques):
+        resposta = cliente_admin.post('/api/produtos', json={
+            'nome': f'Reserva {i}', 'descricao': 'd', 'preco': 5.0, 'quantidade_estoque': estoque
+        })
+        assert resposta.status_code == 201, resposta.get_json()
+        ids.append(resposta.get_json()['id'])
+    return ids
+
+def estoques(modulo_app, ids):
+    return [modulo_app.catalogo._obter_produto_obj(i).quantidade_estoque for i in ids]
+
+def corpo_pedido(itens):
+    return {
+        'produtos': [{'id': i, 'quantidade': q} for i, q in itens],
+        'cliente_nome': 'Cliente', 'cliente_telefone': '11', 'cliente_endereco': 'rua'
+    }
+
+def test_segundo_item_sem_estoque_nao_baixa_o_primeiro(modulo_app, cliente_admin):
+    primeiro, segundo = criar_produtos(cliente_admin, 10, 1)
+    pedidos = len(modulo_app.catalogo.pedidos)
+
+    with pytest.raises(ValueError, match='estoque suficiente'):
+        modulo_app.catalogo.criar_pedido([{'id': primeiro, 'quantidade': 3}, {'id': segundo, 'quantidade': 2}],
+                                         'Cliente', '11', 'rua')
+    assert estoques(modulo_app, [primeiro, segundo]) == [10, 1]
+
+    resposta = cliente_admin.post('/api/pedidos', json=corpo_pedido([(primeiro, 3), (segundo, 2)]))
+    assert resposta.status_code == 400
+    assert 'estoque suficiente' in resposta.get_json()['erro']
+    assert estoques(modulo_app, [primeiro, segundo]) == [10, 1]
+    assert len(modulo_app.catalogo.pedidos) == pedidos
+
+def test_segundo_item_inexistente_nao_baixa_o_primeiro(modulo_app, cliente_admin):
+    primeiro, = criar_produtos(cliente_admin, 10)
+    pedidos = len(modulo_app.catalogo.pedidos)
+
+    with pytest.raises(ValueError, match='não encontrado'):
+        modulo_app.catalogo.criar_pedido([{'id': primeiro, 'quantidade': 3}, {'id': 'inexistente', 'quantidade': 1}],
+                                         'Cliente', '11', 'rua')
+
+    resposta = cliente_admin.post('/api/pedidos', json=corpo_pedido([(primeiro, 3), ('inexistente', 1)]))
+    assert resposta.status_code == 400
+    assert 'não encontrado' in resposta.get_json()['erro']
+    assert estoques(modulo_app, [primeiro]) == [10]
+    assert len(modulo_app.catalogo.pedidos) == pedidos
+
+def test_item_repetido_soma_as_quantidades(modulo_app, cliente_admin):
+    produto, = criar_produtos(cliente_admin, 5)
+    # 3 + 3 passa do estoque, embora cada item isolado caiba
+    resposta = cliente_admin.post('/api/pedidos', json=corpo_pedido([(produto, 3), (produto, 3)]))
+    assert resposta.status_code == 400
+    assert estoques(modulo_app, [produto]) == [5]
+
+    resposta = cliente_admin.post('/api/pedidos', json=corpo_pedido([(produto, 2), (produto, 3)]))
+    assert resposta.status_code == 200
+    assert estoques(modulo_app, [produto]) == [0]
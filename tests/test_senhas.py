@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes da regeração do hash de senha com o custo configurado do bcrypt e do histograma de latência"""
+import json
+import utils
+from utils import custo_hash
+
+def criar_usuario(cliente_admin, email, telefone):
+    resposta = cliente_admin.post('/api/usuarios', json={
+        'nome': 'Carla Souza', 'email': email, 'telefone': telefone, 'senha': 'senha123', 'tipo': 'funcionario'
+    })
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()['id']
+
+def hash_gravado(modulo_app, usuario_id):
+    modulo_app.armazenamento.descartar_cache('usuarios')
+    registros = modulo_app.armazenamento.carregar('usuarios')
+    return next(u['senha_hash'] for u in registros if u['id'] == usuario_id)
+
+def test_login_regera_hash_com_custo_menor(modulo_app, cliente_admin, monkeypatch):
+    usuario_id = criar_usuario(cliente_admin, 'carla@vortex.com', '(11) 98888-0001')
+    hash_antigo = hash_gravado(modulo_app, usuario_id)
+    assert custo_hash(hash_antigo) == 4
+
+    monkeypatch.setattr(utils, 'BCRYPT_CUSTO', 5)
+    cliente = modulo_app.app.test_client()
+    assert cliente.post('/login', data={'credencial': 'carla@vortex.com', 'senha': 'senha123'}).status_code == 302
+
+    novo_hash = modulo_app.catalogo._obter_usuario_obj(usuario_id).senha_hash
+    assert custo_hash(novo_hash) == 5
+    assert utils.verify_password('senha123', novo_hash)
+    assert hash_gravado(modulo_app, usuario_id) == novo_hash
+
+    # Com o custo já atualizado, um novo login não regera o hash
+    cliente.get('/logout')
+    assert cliente.post('/login', data={'credencial': 'carla@vortex.com', 'senha': 'senha123'}).status_code == 302
+    assert modulo_app.catalogo._obter_usuario_obj(usuario_id).senha_hash == novo_hash
+
+def test_senha_errada_nao_regera_hash(modulo_app, cliente_admin, monkeypatch):
+    usuario_id = criar_usuario(cliente_admin, 'carla2@vortex.com', '(11) 98888-0002')
+    hash_antigo = hash_gravado(modulo_app, usuario_id)
+
+    monkeypatch.setattr(utils, 'BCRYPT_CUSTO', 5)
+    cliente = modulo_app.app.test_client()
+    assert cliente.post('/login', data={'credencial': 'carla2@vortex.com', 'senha': 'errada1'}).status_code == 200
+    assert modulo_app.catalogo._obter_usuario_obj(usuario_id).senha_hash == hash_antigo
+    assert hash_gravado(modulo_app, usuario_id) == hash_antigo
+
+def test_histograma_de_latencia_grava_sem_fsync(tmp_path, monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(utils, 'FSYNC_POLITICA', 'always')
+    monkeypatch.setattr(utils.os, 'fsync', chamadas.append)
+    arquivo = tmp_path / 'latencia-{pid}.json'
+    histograma = utils.HistogramaLatencia(str(arquivo), intervalo=2)
+    histograma.registrar('verificar', 0.004)
+    histograma.registrar('verificar', 0.2)
+
+    gravado = tmp_path / f'latencia-{utils.os.getpid()}.json'
+    resumo = json.loads(gravado.read_text(encoding='utf-8'))
+    assert resumo['verificar']['contagem'] == 2 and resumo['verificar']['p50_ms'] == 5
+    # O histograma é apenas diagnóstico: não paga fsync nem com a política global 'always'
+    assert chamadas == []
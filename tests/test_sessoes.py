@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testes das sessões no servidor: armazéns, troca de ID no login, revogação e renovação"""
+import pytest
+from sessoes import ArmazemSessoesMemoria, ArmazemSessoesSQLite, criar_armazem_sessoes
+from conftest import ADMIN
+
+@pytest.fixture(params=['memoria', 'sqlite'])
+def armazem(request, tmp_path):
+    if request.param == 'memoria':
+        return ArmazemSessoesMemoria(max_itens=3)
+    return ArmazemSessoesSQLite(str(tmp_path / 'sessoes.db'))
+
+def test_armazem_salvar_carregar_remover(armazem):
+    armazem.salvar('a', 'u1', '{"x": 1}', 60)
+    assert armazem.carregar('a') == '{"x": 1}'
+    armazem.salvar('a', 'u1', '{"x": 2}', 60)
+    assert armazem.carregar('a') == '{"x": 2}'
+    armazem.remover('a')
+    assert armazem.carregar('a') is None
+    armazem.remover('a')  # remover de novo não é erro
+
+def test_armazem_sessao_expirada_nao_carrega(armazem):
+    armazem.salvar('a', 'u1', '{}', -1)
+    assert armazem.carregar('a') is None
+
+def test_armazem_revoga_todas_as_sessoes_do_usuario(armazem):
+    armazem.salvar('a', 'u1', '{}', 60)
+    armazem.salvar('b', 'u1', '{}', 60)
+    armazem.salvar('c', 'u2', '{}', 60)
+    assert armazem.revogar_usuario('u1') == 2
+    assert armazem.carregar('a') is None and armazem.carregar('b') is None
+    assert armazem.carregar('c') == '{}'
+    assert armazem.revogar_usuario('u1') == 0
+
+def test_armazem_memoria_descarta_a_menos_usada():
+    armazem = ArmazemSessoesMemoria(max_itens=2)
+    armazem.salvar('a', 'u1', '{}', 60)
+    armazem.salvar('b', 'u1', '{}', 60)
+    armazem.carregar('a')
+    armazem.salvar('c', 'u1', '{}', 60)
+    assert armazem.carregar('b') is None
+    assert armazem.carregar('a') == '{}' and armazem.carregar('c') == '{}'
+    # A sessão descartada também sai do índice por usuário
+    assert armazem.revogar_usuario('u1') == 2
+
+def test_armazem_sqlite_limpa_expiradas_periodicamente(tmp_path, monkeypatch):
+    armazem = ArmazemSessoesSQLite(str(tmp_path / 'sessoes.db'))
+    monkeypatch.setattr(armazem, 'LIMPAR_A_CADA', 3)
+    armazem.salvar('velha', None, '{}', -1)
+    armazem.salvar('a', None, '{}', 60)
+
+    def linhas():
+        return armazem._conexao().execute("SELECT COUNT(*) FROM sessoes").fetchone()[0]
+    assert linhas() == 2
+    armazem.salvar('b', None, '{}', 60)
+    assert linhas() == 2
+
+def test_criar_armazem_sessoes(tmp_path):
+    assert criar_armazem_sessoes('cookie') is None
+    assert isinstance(criar_armazem_sessoes('memoria'), ArmazemSessoesMemoria)
+    assert isinstance(criar_armazem_sessoes('sqlite', str(tmp_path / 's.db')), ArmazemSessoesSQLite)
+    with pytest.raises(ValueError):
+        criar_armazem_sessoes('redis')
+
+def sid(modulo_app, cliente):
+    cookie = cliente.get_cookie(modulo_app.app.config['SESSION_COOKIE_NAME'])
+    return cookie.value if cookie else None
+
+@pytest.fixture
+def gerente(modulo_app):
+    """Cria um gerente descartável e o remove ao final do teste, se ainda existir"""
+    usuario = modulo_app.catalogo.adicionar_usuario(
+        'Gerente temporário', 'temporario@vortex.com', '11988887777', 'Senha@123', 'gerente'
+    )
+    modulo_app.salvar_usuarios()
+    yield {'id': usuario['id'], 'credencial': 'temporario@vortex.com', 'senha': 'Senha@123'}
+    if modulo_app._get_usuario_object(usuario['id']):
+        modulo_app.catalogo.excluir_usuario(usuario['id'])
+        modulo_app.salvar_usuarios()
+
+def test_cookie_leva_apenas_o_id(modulo_app, cliente):
+    assert isinstance(modulo_app.app.session_interface, modulo_app.InterfaceSessaoServidor)
+    assert cliente.post('/login', data=ADMIN).status_code == 302
+    valor = sid(modulo_app, cliente)
+    assert valor and len(valor) < 60
+    assert modulo_app.armazem_sessoes.carregar(valor) is not None
+
+def test_login_gera_novo_id_e_invalida_o_anterior(modulo_app, cliente):
+    with cliente.session_transaction() as sessao:
+        sessao['preferencia'] = 'x'
+    anterior = sid(modulo_app, cliente)
+    assert modulo_app.armazem_sessoes.carregar(anterior) is not None
+
+    assert cliente.post('/login', data=ADMIN).status_code == 302
+    atual = sid(modulo_app, cliente)
+    assert atual != anterior
+    assert modulo_app.armazem_sessoes.carregar(anterior) is None
+    # Os dados da sessão anônima seguem para a nova sessão
+    with cliente.session_transaction() as sessao:
+        assert sessao['preferencia'] == 'x'
+
+def test_id_anterior_ao_login_nao_da_acesso(modulo_app, cliente):
+    with cliente.session_transaction() as sessao:
+        sessao['preferencia'] = 'x'
+    anterior = sid(modulo_app, cliente)
+    cliente.post('/login', data=ADMIN)
+
+    atacante = modulo_app.app.test_client()
+    atacante.set_cookie(modulo_app.app.config['SESSION_COOKIE_NAME'], anterior)
+    assert atacante.get('/api/usuarios').status_code == 302
+
+def test_excluir_usuario_revoga_sessoes(modulo_app, cliente_admin, gerente):
+    sessoes = [modulo_app.app.test_client() for _ in range(2)]
+    for cliente in sessoes:
+        assert cliente.post('/login', data=gerente).status_code == 302
+        assert cliente.get('/api/usuarios').status_code == 200
+
+    assert cliente_admin.delete(f"/api/usuarios/{gerente['id']}").status_code == 200
+    for cliente in sessoes:
+        resposta = cliente.get('/api/usuarios')
+        assert resposta.status_code == 302 and '/login' in resposta.headers['Location']
+    assert cliente_admin.get('/api/usuarios').status_code == 200
+
+def test_logout_remove_a_sessao(modulo_app, cliente_admin):
+    valor = sid(modulo_app, cliente_admin)
+    resposta = cliente_admin.get('/logout')
+    assert 'Set-Cookie' in resposta.headers
+    assert modulo_app.armazem_sessoes.carregar(valor) is None
+    assert cliente_admin.get('/api/usuarios').status_code == 302
+
+def test_sessao_sem_alteracao_renova_validade_no_intervalo(modulo_app, cliente_admin, monkeypatch):
+    interface = modulo_app.app.session_interface
+    # Acessada logo após a gravação: nada é regravado
+    assert 'Set-Cookie' not in cliente_admin.get('/api/usuarios').headers
+
+    monkeypatch.setattr(interface, 'INTERVALO_RENOVACAO', 0)
+    salvas = []
+    salvar = modulo_app.armazem_sessoes.salvar
+    monkeypatch.setattr(modulo_app.armazem_sessoes, 'salvar', lambda *args: (salvas.append(args), salvar(*args)))
+    resposta = cliente_admin.get('/api/usuarios')
+    assert 'Set-Cookie' in resposta.headers and len(salvas) == 1
+    # O ID não muda ao renovar e a sessão continua válida
+    assert salvas[0][0] == sid(modulo_app, cliente_admin)
+    assert cliente_admin.get('/api/usuarios').status_code == 200
+
+    monkeypatch.setitem(modulo_app.app.config, 'SESSION_REFRESH_EACH_REQUEST', False)
+    salvas.clear()
+    assert 'Set-Cookie' not in cliente_admin.get('/api/usuarios').headers
+    assert salvas == []
@@ -5,34 +5,224 @@ import logging
 import bcrypt
 import secrets
 import re
-from logging.handlers import RotatingFileHandler
+import time
+import unicodedata
+import tempfile
+import threading
+import queue
+import atexit
+import hmac
+import hashlib
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows: apenas bloqueio entre threads do mesmo processo
+    fcntl = None
+
+# Configuração de logging via ambiente:
+#   LOG_ASSINCRONO - 1 grava os logs em uma thread separada (QueueHandler/QueueListener); desativado por
+#                    padrão, pois numa queda abrupta do processo os registros ainda na fila se perdem
+#   LOG_NIVEIS     - níveis por módulo, ex.: "app=WARNING,main=DEBUG,armazenamento=INFO"
+#   LOG_AMOSTRAGEM - registra apenas 1 a cada N mensagens marcadas com extra={'amostrar': True}
+LOG_ASSINCRONO = os.getenv('LOG_ASSINCRONO', '0') == '1'
+LOG_AMOSTRAGEM = max(1, int(os.getenv('LOG_AMOSTRAGEM', '100')))
+
+class FiltroAmostragem(logging.Filter):
+    """
+    Filtro que deixa passar apenas 1 a cada N registros repetitivos (ex.: um por item carregado).
+    Só afeta registros marcados com extra={'amostrar': True}; a contagem é feita por mensagem.
+    """
+    def __init__(self, a_cada=LOG_AMOSTRAGEM):
+        super().__init__()
+        self.a_cada = a_cada
+        self._contagem = {}
+
+    def filter(self, record):
+        if not getattr(record, 'amostrar', False):
+            return True
+        chave = (record.name, record.msg)
+        # Um contador por mensagem: setdefault e next() são atômicos, então threads que registram
+        # ao mesmo tempo não repetem nem perdem contagens
+        contador = self._contagem.get(chave)
+        if contador is None:
+            contador = self._contagem.setdefault(chave, itertools.count())
+        return next(contador) % self.a_cada == 0
+
+def configurar_niveis_log(niveis=None):
+    """
+    Aplica níveis de log por módulo.
+    
+    Args:
+        niveis (str, optional): Lista "modulo=NIVEL" separada por vírgulas. Padrão é LOG_NIVEIS do ambiente.
+    """
+    niveis = niveis if niveis is not None else os.getenv('LOG_NIVEIS', '')
+    for item in niveis.split(','):
+        if '=' not in item:
+            continue
+        nome, nivel = (parte.strip() for parte in item.split('=', 1))
+        try:
+            logging.getLogger(nome).setLevel(nivel.upper())
+        except ValueError:
+            logging.getLogger(__name__).warning(f"LOG_NIVEIS: nível inválido ignorado: {item.strip()}")
+
+class HandlerFilaLog(QueueHandler):
+    """
+    QueueHandler que enfileira o registro sem formatá-lo.
+    O QueueHandler padrão monta a mensagem (e o traceback) na thread que registrou o log;
+    aqui isso fica para os handlers da thread do QueueListener. Os argumentos da mensagem
+    são formatados depois, então não devem ser alterados após a chamada de log.
+    """
+    def prepare(self, record):
+        return record
+
 # Configura logger com rotação de arquivo
-def setup_logger(name, log_file, level=logging.INFO, max_size=10*1024*1024, backup_count=5):
-    """Configura um logger com rotação de arquivo para evitar arquivos de log enormes"""
+def setup_logger(name, log_file, level=logging.INFO, max_size=10*1024*1024, backup_count=5, assincrono=None):
+    """
+    Configura um logger com rotação de arquivo para evitar arquivos de log enormes.
+    No modo assíncrono, os handlers de arquivo e console rodam em uma thread própria,
+    fora da thread que atende a requisição.
+    """
     handler = RotatingFileHandler(log_file, maxBytes=max_size, backupCount=backup_count, encoding='utf-8')
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     handler.setFormatter(formatter)
     
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    logger.addHandler(handler)
-    
     # Adiciona handler para console
     console = logging.StreamHandler()
     console.setFormatter(formatter)
-    logger.addHandler(console)
     
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    
+    if LOG_ASSINCRONO if assincrono is None else assincrono:
+        fila = queue.Queue(-1)
+        ouvinte = QueueListener(fila, handler, console, respect_handler_level=True)
+        ouvinte.start()
+        # Esvazia a fila ao encerrar o processo
+        atexit.register(ouvinte.stop)
+        destinos = [HandlerFilaLog(fila)]
+    else:
+        destinos = [handler, console]
+    
+    for destino in destinos:
+        destino.addFilter(FiltroAmostragem())
+        logger.addHandler(destino)
+    
+    configurar_niveis_log()
     return logger
 
+# Custo do bcrypt via ambiente:
+#   BCRYPT_CUSTO                - fator de trabalho (log2 das iterações) dos novos hashes; hashes com
+#                                 outro custo são regravados no próximo login bem-sucedido
+#   BCRYPT_HISTOGRAMA           - arquivo onde gravar o histograma de latência do bcrypt (desativado se vazio);
+#                                 '{pid}' no nome é trocado pelo PID, para cada worker gravar o seu
+#   BCRYPT_HISTOGRAMA_INTERVALO - grava o histograma a cada N operações
+BCRYPT_CUSTO = min(31, max(4, int(os.getenv('BCRYPT_CUSTO', '12'))))
+BCRYPT_HISTOGRAMA = os.getenv('BCRYPT_HISTOGRAMA', '')
+BCRYPT_HISTOGRAMA_INTERVALO = max(1, int(os.getenv('BCRYPT_HISTOGRAMA_INTERVALO', '50')))
+
+class HistogramaLatencia:
+    """
+    Histograma de latência por operação em faixas fixas de milissegundos.
+    Os percentis são estimados pelo limite superior da faixa em que caem.
+    """
+    
+    FAIXAS_MS = (5, 10, 25, 50, 100, 200, 300, 500, 750, 1000, 2000, 5000)
+    
+    def __init__(self, arquivo=None, intervalo=50):
+        self.arquivo = arquivo
+        self.intervalo = intervalo
+        self._operacoes = {}
+        self._registros = 0
+        self._trava = threading.Lock()
+    
+    def registrar(self, operacao, segundos):
+        """Registra a duração de uma operação e grava o arquivo a cada `intervalo` registros."""
+        ms = segundos * 1000
+        indice = next((i for i, limite in enumerate(self.FAIXAS_MS) if ms <= limite), len(self.FAIXAS_MS))
+        with self._trava:
+            dados = self._operacoes.get(operacao)
+            if dados is None:
+                dados = self._operacoes[operacao] = {'contagem': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                     'faixas': [0] * (len(self.FAIXAS_MS) + 1)}
+            dados['contagem'] += 1
+            dados['total_ms'] += ms
+            dados['max_ms'] = max(dados['max_ms'], ms)
+            dados['faixas'][indice] += 1
+            self._registros += 1
+            gravar = self.arquivo and self._registros % self.intervalo == 0
+        if gravar:
+            self.gravar()
+    
+    def _percentil(self, dados, fracao):
+        alvo = dados['contagem'] * fracao
+        acumulado = 0
+        for limite, quantidade in zip(self.FAIXAS_MS + (None,), dados['faixas']):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return limite if limite is not None else round(dados['max_ms'], 1)
+        return round(dados['max_ms'], 1)
+    
+    def resumo(self):
+        """
+        Resume o histograma.
+        
+        Returns:
+            dict: Por operação, contagem, média, máximo, p50/p95/p99 e contagem por faixa ("<=N ms")
+        """
+        with self._trava:
+            operacoes = {nome: dict(dados, faixas=list(dados['faixas'])) for nome, dados in self._operacoes.items()}
+        rotulos = [f'<={limite}ms' for limite in self.FAIXAS_MS] + [f'>{self.FAIXAS_MS[-1]}ms']
+        return {
+            nome: {
+                'contagem': dados['contagem'],
+                'media_ms': round(dados['total_ms'] / dados['contagem'], 1),
+                'max_ms': round(dados['max_ms'], 1),
+                'p50_ms': self._percentil(dados, 0.50),
+                'p95_ms': self._percentil(dados, 0.95),
+                'p99_ms': self._percentil(dados, 0.99),
+                'faixas': dict(zip(rotulos, dados['faixas'])),
+            }
+            for nome, dados in operacoes.items()
+        }
+    
+    def gravar(self):
+        """Grava o resumo no arquivo configurado."""
+        import json
+        if not self.arquivo or not self._registros:
+            return
+        try:
+            escrever_arquivo_atomico(self.arquivo.replace('{pid}', str(os.getpid())), json.dumps(self.resumo(), indent=2), fsync='never')
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Não foi possível gravar o histograma de latência: {e}")
+
+histograma_bcrypt = HistogramaLatencia(BCRYPT_HISTOGRAMA or None, BCRYPT_HISTOGRAMA_INTERVALO)
+atexit.register(histograma_bcrypt.gravar)
+
+def custo_hash(hashed):
+    """Retorna o custo (fator de trabalho) de um hash bcrypt, ou None se o formato não for reconhecido."""
+    if isinstance(hashed, bytes):
+        hashed = hashed.decode('utf-8', 'replace')
+    partes = (hashed or '').split('$')
+    if len(partes) < 4 or not partes[2].isdigit():
+        return None
+    return int(partes[2])
+
 # Funções de hash seguras para senhas
-def hash_password(password):
-    """Gera um hash seguro para a senha usando bcrypt"""
+def hash_password(password, custo=None):
+    """Gera um hash seguro para a senha usando bcrypt com o custo BCRYPT_CUSTO"""
     if isinstance(password, str):
         password = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    custo = custo or BCRYPT_CUSTO
+    inicio = time.perf_counter()
+    salt = bcrypt.gensalt(rounds=custo)
     hashed = bcrypt.hashpw(password, salt)
+    histograma_bcrypt.registrar(f'hash:{custo}', time.perf_counter() - inicio)
     return hashed.decode('utf-8')
 
 def verify_password(password, hashed):
@@ -41,7 +231,156 @@ def verify_password(password, hashed):
         password = password.encode('utf-8')
     if isinstance(hashed, str):
         hashed = hashed.encode('utf-8')
-    return bcrypt.checkpw(password, hashed)
+    inicio = time.perf_counter()
+    resultado = bcrypt.checkpw(password, hashed)
+    histograma_bcrypt.registrar(f'verify:{custo_hash(hashed)}', time.perf_counter() - inicio)
+    return resultado
+
+def needs_rehash(hashed, custo=None):
+    """Indica se o hash deve ser regerado por usar um custo diferente de BCRYPT_CUSTO"""
+    return custo_hash(hashed) != (custo or BCRYPT_CUSTO)
+
+# Verificações de senha via ambiente:
+#   BCRYPT_WORKERS     - threads dedicadas ao bcrypt; limita quantos núcleos os logins podem ocupar
+#   BCRYPT_FILA_MAXIMA - verificações aguardando uma thread livre antes de recusar novos logins
+BCRYPT_WORKERS = max(1, int(os.getenv('BCRYPT_WORKERS', str(max(1, (os.cpu_count() or 2) // 2)))))
+BCRYPT_FILA_MAXIMA = max(0, int(os.getenv('BCRYPT_FILA_MAXIMA', '32')))
+#   LOGIN_CACHE_SEGUNDOS - por quanto tempo uma senha já verificada dispensa o bcrypt (0, o padrão, desativa;
+#                          ligado, o processo guarda em memória um HMAC de cada senha verificada recentemente)
+LOGIN_CACHE_SEGUNDOS = int(os.getenv('LOGIN_CACHE_SEGUNDOS', '0'))
+
+class FilaSenhasCheia(RuntimeError):
+    """Há verificações de senha demais em andamento; a requisição deve ser recusada."""
+
+_executor_senhas = None
+_trava_executor_senhas = threading.Lock()
+_vagas_senhas = threading.BoundedSemaphore(BCRYPT_WORKERS + BCRYPT_FILA_MAXIMA)
+_hash_ficticio = None
+_trava_hash_ficticio = threading.Lock()
+
+def executar_bcrypt(funcao, *args):
+    """
+    Executa uma operação do bcrypt no pool de threads dedicado e aguarda o resultado.
+    O bcrypt libera o GIL, então o pool limita o uso de CPU sem bloquear as demais requisições.
+    
+    Raises:
+        FilaSenhasCheia: Se já houver BCRYPT_WORKERS + BCRYPT_FILA_MAXIMA operações pendentes
+    """
+    global _executor_senhas
+    if not _vagas_senhas.acquire(blocking=False):
+        raise FilaSenhasCheia("Muitas verificações de senha em andamento")
+    try:
+        with _trava_executor_senhas:
+            if _executor_senhas is None:
+                _executor_senhas = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+        futuro = _executor_senhas.submit(funcao, *args)
+    except Exception:
+        _vagas_senhas.release()
+        raise
+    futuro.add_done_callback(lambda _: _vagas_senhas.release())
+    return futuro.result()
+
+def hash_ficticio():
+    """
+    Hash bcrypt de uma senha aleatória, usado para verificar credenciais de usuários
+    inexistentes com o mesmo custo de um usuário real (evita descobrir contas pelo tempo de resposta).
+    É gerado uma única vez, no pool do bcrypt; chamadas concorrentes aguardam a primeira.
+    
+    Raises:
+        FilaSenhasCheia: Se o pool estiver sobrecarregado na primeira chamada
+    """
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        with _trava_hash_ficticio:
+            if _hash_ficticio is None:
+                _hash_ficticio = executar_bcrypt(hash_password, secrets.token_urlsafe(16))
+    return _hash_ficticio
+
+class LimitadorTaxa:
+    """
+    Limitador por chave no formato token bucket: cada chave tem até `capacidade` tentativas,
+    recarregadas continuamente ao longo de `janela` segundos. Guarda no máximo `max_chaves`
+    chaves, descartando as usadas há mais tempo.
+    """
+    
+    def __init__(self, capacidade, janela, max_chaves=10000):
+        self.capacidade = float(capacidade)
+        self.taxa = self.capacidade / float(janela) if janela else float('inf')
+        self.max_chaves = max_chaves
+        self._baldes = OrderedDict()
+        self._trava = threading.Lock()
+    
+    def consumir(self, chave):
+        """
+        Consome uma tentativa da chave.
+        
+        Returns:
+            float: 0 se a tentativa foi permitida; caso contrário, segundos até a próxima tentativa
+        """
+        if self.capacidade <= 0:
+            return 0.0
+        agora = time.monotonic()
+        with self._trava:
+            fichas, atualizado_em = self._baldes.pop(chave, (self.capacidade, agora))
+            fichas = min(self.capacidade, fichas + (agora - atualizado_em) * self.taxa)
+            if fichas >= 1:
+                fichas -= 1
+                espera = 0.0
+            else:
+                espera = (1 - fichas) / self.taxa
+            self._baldes[chave] = (fichas, agora)
+            while len(self._baldes) > self.max_chaves:
+                self._baldes.popitem(last=False)
+            return espera
+    
+    def liberar(self, chave):
+        """Restaura todas as tentativas da chave (ex.: após um login bem-sucedido)."""
+        with self._trava:
+            self._baldes.pop(chave, None)
+
+class CacheCredenciais:
+    """
+    Lembra por `ttl` segundos as combinações usuário/senha já verificadas pelo bcrypt.
+    Guarda apenas um HMAC da senha com uma chave aleatória do processo, e o hash armazenado
+    faz parte da chave: ao trocar a senha, as entradas antigas deixam de valer.
+    """
+    
+    def __init__(self, ttl=300, max_itens=1024):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._chave = secrets.token_bytes(32)
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+    
+    def _digest(self, senha, senha_hash):
+        mensagem = f'{senha_hash}\0{senha}'.encode('utf-8')
+        return hmac.new(self._chave, mensagem, hashlib.sha256).digest()
+    
+    def contem(self, senha, senha_hash):
+        """Indica se a senha já foi verificada para este hash dentro do TTL."""
+        if self.ttl <= 0:
+            return False
+        digest = self._digest(senha, senha_hash)
+        with self._trava:
+            expira_em = self._itens.get(digest)
+            if expira_em is None:
+                return False
+            if expira_em < time.monotonic():
+                del self._itens[digest]
+                return False
+            self._itens.move_to_end(digest)
+            return True
+    
+    def adicionar(self, senha, senha_hash):
+        """Registra uma verificação bem-sucedida."""
+        if self.ttl <= 0:
+            return
+        digest = self._digest(senha, senha_hash)
+        with self._trava:
+            self._itens[digest] = time.monotonic() + self.ttl
+            self._itens.move_to_end(digest)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
 
 def generate_token():
     """Gera um token seguro para redefinição de senha"""
@@ -60,6 +399,13 @@ def validar_telefone(telefone):
     # Verifica se tem pelo menos 2 dígitos (aceitando qualquer formato)
     return len(numero) >= 2
 
+def normalizar_texto(texto):
+    """Normaliza texto para comparação: minúsculas e sem acentos"""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFD', str(texto).lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
 # Funções para formatar datas
 def formatar_data(dt=None):
     """Formata data em formato brasileiro (dd/mm/aaaa HH:MM:SS)"""
@@ -74,6 +420,174 @@ def parse_data_br(data_str):
     except ValueError:
         return None
 
+# Política de fsync das gravações em disco:
+#   always  - fsync a cada gravação (padrão, mais seguro)
+#   batched - no máximo um fsync por arquivo a cada FSYNC_INTERVALO segundos; gravações dentro do
+#             intervalo recebem um fsync adiado para o fim dele, então nenhuma fica sem sincronizar
+#   never   - deixa a sincronização a cargo do sistema operacional
+FSYNC_POLITICA = os.getenv('FSYNC_POLITICA', 'always')
+FSYNC_INTERVALO = float(os.getenv('FSYNC_INTERVALO', '1.0'))
+_ultimo_fsync = {}
+_fsync_adiados = {}
+_fsync_trava = threading.Lock()
+
+def _deve_sincronizar(arquivo, politica=None):
+    """
+    Decide, segundo a política de fsync, se esta gravação deve chamar fsync.
+    Na política 'batched', uma gravação que não pode sincronizar agora agenda um fsync adiado.
+    """
+    politica = politica or FSYNC_POLITICA
+    if politica == 'never':
+        return False
+    if politica == 'batched':
+        agora = time.monotonic()
+        with _fsync_trava:
+            decorrido = agora - _ultimo_fsync.get(arquivo, float('-inf'))
+            if decorrido < FSYNC_INTERVALO:
+                if arquivo not in _fsync_adiados:
+                    temporizador = threading.Timer(FSYNC_INTERVALO - decorrido, _executar_fsync_adiado, args=(arquivo,))
+                    temporizador.daemon = True
+                    _fsync_adiados[arquivo] = temporizador
+                    temporizador.start()
+                return False
+            _ultimo_fsync[arquivo] = agora
+    return True
+
+def _executar_fsync_adiado(arquivo):
+    """Sincroniza o arquivo (e o diretório, por causa das renomeações) no fim do intervalo de fsync"""
+    with _fsync_trava:
+        _fsync_adiados.pop(arquivo, None)
+        _ultimo_fsync[arquivo] = time.monotonic()
+    try:
+        fd = os.open(arquivo, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+    _sincronizar_diretorio(os.path.dirname(os.path.abspath(arquivo)))
+
+def _executar_fsyncs_pendentes():
+    """Executa imediatamente os fsyncs adiados (ao encerrar o processo)"""
+    with _fsync_trava:
+        pendentes = list(_fsync_adiados.items())
+    for arquivo, temporizador in pendentes:
+        temporizador.cancel()
+        _executar_fsync_adiado(arquivo)
+
+atexit.register(_executar_fsyncs_pendentes)
+
+def _sincronizar_diretorio(diretorio):
+    """Garante que a renomeação de um arquivo no diretório foi persistida (apenas POSIX)"""
+    try:
+        fd = os.open(diretorio, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def escrever_arquivo_atomico(arquivo, conteudo, fsync=None):
+    """
+    Grava o conteúdo em um arquivo temporário no mesmo diretório e o renomeia sobre o destino.
+    Leitores nunca veem um arquivo parcialmente escrito, mesmo se o processo cair no meio da gravação.
+    
+    Args:
+        arquivo (str): Caminho do arquivo de destino
+        conteudo (str): Texto a ser gravado
+        fsync (str, optional): Política de fsync ('always', 'batched' ou 'never'). Padrão é FSYNC_POLITICA.
+    """
+    diretorio = os.path.dirname(os.path.abspath(arquivo))
+    sincronizar = _deve_sincronizar(arquivo, fsync)
+    fd, temporario = tempfile.mkstemp(prefix=f".{os.path.basename(arquivo)}.", suffix='.tmp', dir=diretorio)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+            f.flush()
+            if sincronizar:
+                os.fsync(f.fileno())
+        # Preservar as permissões do arquivo original
+        if os.path.exists(arquivo):
+            os.chmod(temporario, os.stat(arquivo).st_mode & 0o7777)
+        os.replace(temporario, arquivo)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+    if sincronizar:
+        _sincronizar_diretorio(diretorio)
+
+# Bloqueio entre processos e contador de geração dos arquivos de dados.
+# Ambos usam o arquivo auxiliar "<arquivo>.lock": o bloqueio é feito com fcntl.flock sobre ele
+# e seu conteúdo é o número de geração, incrementado a cada gravação do arquivo de dados.
+_bloqueios_threads = {}
+_bloqueios_threads_lock = threading.Lock()
+_bloqueios_estado = threading.local()
+
+@contextmanager
+def bloqueio_arquivo(arquivo):
+    """
+    Bloqueio exclusivo sobre um arquivo de dados, válido entre processos e entre threads.
+    É reentrante na mesma thread.
+    """
+    caminho = arquivo + '.lock'
+    with _bloqueios_threads_lock:
+        trava = _bloqueios_threads.setdefault(caminho, threading.RLock())
+    with trava:
+        profundidade = getattr(_bloqueios_estado, 'profundidade', None)
+        if profundidade is None:
+            profundidade = _bloqueios_estado.profundidade = {}
+        if profundidade.get(caminho):
+            profundidade[caminho] += 1
+            try:
+                yield
+            finally:
+                profundidade[caminho] -= 1
+            return
+        with open(caminho, 'a+', encoding='utf-8') as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            profundidade[caminho] = 1
+            try:
+                yield
+            finally:
+                profundidade[caminho] = 0
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def ler_geracao(arquivo):
+    """Retorna o número de geração do arquivo de dados (0 se nunca foi gravado)"""
+    try:
+        with open(arquivo + '.lock', 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def incrementar_geracao(arquivo):
+    """
+    Incrementa o número de geração do arquivo de dados.
+    A leitura e a escrita acontecem sob bloqueio_arquivo (reentrante, então quem já tem o bloqueio
+    não espera), para que dois processos não percam um incremento.
+    O número é regravado no lugar, com largura fixa e sem truncar o arquivo: um leitor concorrente
+    vê o valor antigo ou o novo, nunca um arquivo vazio. O arquivo não pode ser substituído por
+    renomeação, pois é também o alvo do flock de bloqueio_arquivo.
+    """
+    with bloqueio_arquivo(arquivo):
+        geracao = ler_geracao(arquivo) + 1
+        fd = os.open(arquivo + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, f'{geracao:020d}'.encode('ascii'))
+        finally:
+            os.close(fd)
+    return geracao
+
 # Funções para carregar e salvar dados (cache de arquivos)
 _cache = {}
 
@@ -109,8 +623,8 @@ def salvar_json_com_cache(arquivo, dados):
     import time
     
     try:
-        with open(arquivo, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, ensure_ascii=False, indent=2)
+        escrever_arquivo_atomico(arquivo, json.dumps(dados, ensure_ascii=False, indent=2))
+        incrementar_geracao(arquivo)
             
         # Atualiza o cache
         _cache[arquivo] = {
@@ -122,6 +636,55 @@ def salvar_json_com_cache(arquivo, dados):
         logging.error(f"Erro ao salvar arquivo {arquivo}: {str(e)}")
         return False
 
+# Funções para journals append-only (JSON Lines)
+def anexar_jsonl(arquivo, registro):
+    """Anexa um registro ao final de um arquivo JSONL, sem reescrever o conteúdo existente"""
+    import json
+    
+    linha = json.dumps(registro, ensure_ascii=False)
+    with open(arquivo, 'a', encoding='utf-8') as f:
+        f.write(linha + '\n')
+        f.flush()
+        if _deve_sincronizar(arquivo):
+            os.fsync(f.fileno())
+
+def ler_jsonl(arquivo):
+    """
+    Lê os registros de um arquivo JSONL.
+    Linhas inválidas (ex.: última linha truncada por uma queda) são ignoradas.
+    """
+    import json
+    
+    registros = []
+    if not os.path.exists(arquivo):
+        return registros
+    with open(arquivo, 'r', encoding='utf-8') as f:
+        for numero, linha in enumerate(f, 1):
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                logging.warning(f"Linha {numero} inválida ignorada no arquivo {arquivo}")
+    return registros
+
+def truncar_arquivo(arquivo):
+    """Esvazia um arquivo, criando-o se não existir"""
+    with open(arquivo, 'w', encoding='utf-8'):
+        pass
+
+def assinatura_arquivo(arquivo):
+    """
+    Retorna uma assinatura (inode, mtime, tamanho) do arquivo, ou None se ele não existir.
+    Permite detectar alterações no arquivo sem precisar lê-lo.
+    """
+    try:
+        st = os.stat(arquivo)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
 # Função para limpar o cache
 def limpar_cache(arquivo=None):
     """Limpa o cache para um arquivo específico ou todo o cache"""